@@ -0,0 +1,219 @@
+# Description: Benchmarks the AdaptiveHashMap against both fixed engines on a workload whose mix changes in
+#              phases: loading the keys, reads that mostly hit, churn that replaces keys while looking up
+#              missing ones, and reads again. Reports the time of each phase, the bytes per key held at its end
+#              and the engine the adaptive map ended the phase on. The default seeded hash spreads keys evenly;
+#              hash_function_2 clusters these keys so badly that open addressing loses every phase.
+#              Chaining is the fastest engine in every phase, so the adaptive map can only pay off in the
+#              trade between time and memory its EnginePolicy optimizes. The cost column scores each engine by
+#              that objective: the mean over the phases of time and memory_weight times memory, both relative
+#              to the chaining map, which scores 1. With the default EnginePolicy the adaptive map does not
+#              beat chaining: it is no faster in any phase and only breaks even on the cost (0.98). It beats
+#              both fixed engines once memory_weight is about 3; at 0 it only adds the facade's overhead.
+#              --calibrate fits the engine costs of DEFAULT_COSTS instead.
+#
+# Usage:       python benchmarks/bench_adaptive.py [--size N] [--operations N] [--repeat N] [--hash H]
+#                                                  [--memory-weight W] [--calibrate]
+
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hash_map_adaptive
+import hash_map_oa
+import hash_map_sc
+from a6_include import hash_function_1, hash_function_2
+from hash_map_defense import SeededHash
+
+
+PHASES = ("load", "read", "churn", "read again")
+
+HASH_FUNCTIONS = {
+    "1": hash_function_1,
+    "2": hash_function_2,
+    "seeded": SeededHash(261),
+}
+
+ENGINES = {
+    "sc": hash_map_sc.HashMap,
+    "oa": hash_map_oa.HashMap,
+    "adaptive": hash_map_adaptive.AdaptiveHashMap,
+}
+
+
+def make_phases(size: int, operations: int, seed: int = 0) -> list:
+    """
+    Returns the phases as lists of (method name, key) calls, generated up front so every engine runs the same
+    stream.
+    """
+    rng = random.Random(seed)
+    live = ['key' + str(i) for i in range(size)]
+    load = [('put', key) for key in live]
+    read = []
+    for _ in range(operations):
+        if rng.random() < 0.95:
+            read.append(('get', live[rng.randrange(size)]))
+        else:
+            read.append(('get', 'missing' + str(rng.randrange(size))))
+
+    churn = []
+    next_key = size
+    for _ in range(operations // 3):
+        victim = rng.randrange(size)
+        churn.append(('remove', live[victim]))
+        live[victim] = 'key' + str(next_key)
+        next_key += 1
+        churn.append(('put', live[victim]))
+        churn.append(('get', 'missing' + str(next_key)))
+
+    read_again = [('get', live[rng.randrange(size)]) for _ in range(operations)]
+    return [load, read, churn, read_again]
+
+
+def run(factory: callable, function: callable, phases: list, traced: bool) -> tuple:
+    """
+    Runs every phase on a new map and returns (seconds per phase, bytes per key per phase, engine per phase).
+    With traced, the seconds include the overhead of tracemalloc and only the bytes are meaningful.
+    """
+    if traced:
+        tracemalloc.start()
+    start_bytes = tracemalloc.get_traced_memory()[0] if traced else 0
+    hash_map = factory(11, function)
+    seconds, sizes, engines = [], [], []
+    for calls in phases:
+        start = time.perf_counter()
+        for name, key in calls:
+            if name == 'get':
+                hash_map.get(key)
+            elif name == 'put':
+                hash_map.put(key, 1)
+            else:
+                hash_map.remove(key)
+        seconds.append(time.perf_counter() - start)
+        if traced:
+            sizes.append((tracemalloc.get_traced_memory()[0] - start_bytes) / hash_map.get_size())
+        engines.append(hash_map.get_engine() if hasattr(hash_map, 'get_engine') else '')
+    if traced:
+        tracemalloc.stop()
+    return seconds, sizes, engines
+
+
+def mean_probes(stats) -> float:
+    """Returns the mean probe length recorded by a HashMapStats."""
+    total = sum(stats.hits.values()) + sum(stats.misses.values())
+    return sum(probes * count for histogram in stats.probe_lengths.values()
+               for probes, count in histogram.items()) / total
+
+
+def calibration_points(engine: str, function: callable, size: int, lookups: int, repeat: int) -> list:
+    """
+    Returns (mean probes, microseconds) per get() for maps of the given engine at several loads, tombstone
+    counts and hit ratios. The probe lengths are recorded in a separate run with statistics enabled, so they
+    don't slow down the timed run.
+    """
+    factory, policy = hash_map_adaptive.ENGINES[engine]
+    max_load = policy.max_load
+    rng = random.Random(0)
+    points = []
+    for load in (max_load / 4, max_load / 2, 3 * max_load / 4, 0.99 * max_load):
+        for churned in ((0, size // 2, size) if engine == 'oa' else (0,)):
+            hash_map = factory(11, function)
+            hash_map.resize_table(int(size / load))
+            keys = ['key' + str(i) for i in range(size)]
+            for key in keys:
+                hash_map.put(key, 1)
+            # replacing keys leaves tombstones in an open addressing table
+            for i in range(churned):
+                hash_map.remove(keys[i])
+                keys[i] = 'new' + str(i)
+                hash_map.put(keys[i], 1)
+            for hit_ratio in (1.0, 0.5, 0.0):
+                calls = [keys[rng.randrange(size)] if rng.random() < hit_ratio else 'missing' + str(i)
+                         for i in range(lookups)]
+                get = hash_map.get
+                best = float("inf")
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    for key in calls:
+                        get(key)
+                    best = min(best, time.perf_counter() - start)
+                stats = hash_map.enable_stats()
+                for key in calls:
+                    get(key)
+                hash_map.disable_stats()
+                points.append((mean_probes(stats), best / lookups * 1e6))
+    return points
+
+
+def fit_costs(points: list) -> tuple:
+    """
+    Returns the least squares fit (microseconds per operation, microseconds per probe) of
+    microseconds = per operation + per probe * probes.
+    """
+    count = len(points)
+    mean_x = sum(x for x, _ in points) / count
+    mean_y = sum(y for _, y in points) / count
+    slope = (sum((x - mean_x) * (y - mean_y) for x, y in points)
+             / sum((x - mean_x) ** 2 for x, _ in points))
+    return mean_y - slope * mean_x, slope
+
+
+def calibrate(function: callable, size: int, lookups: int, repeat: int) -> None:
+    """
+    Prints the cost points of both engines and the DEFAULT_COSTS they fit.
+    """
+    for engine in hash_map_adaptive.ENGINES:
+        points = calibration_points(engine, function, size, lookups, repeat)
+        per_operation, per_probe = fit_costs(points)
+        cells = "  ".join(f"{x:.2f}:{y:.2f}" for x, y in sorted(points))
+        print(f"{engine}  probes:us  {cells}")
+        current = hash_map_adaptive.DEFAULT_COSTS[engine]
+        print(f"{engine}  fit  ({per_operation:.2f}, {per_probe:.2f})  current {current}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="AdaptiveHashMap mixed workload benchmark")
+    parser.add_argument("--size", type=int, default=20000)
+    parser.add_argument("--operations", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--hash", choices=list(HASH_FUNCTIONS), default="seeded")
+    parser.add_argument("--memory-weight", type=float, default=hash_map_adaptive.DEFAULT_ENGINE_POLICY.memory_weight,
+                        help="memory_weight of the adaptive map's EnginePolicy and of the cost column")
+    parser.add_argument("--calibrate", action="store_true",
+                        help="fit the engine costs of hash_map_adaptive.DEFAULT_COSTS instead")
+    args = parser.parse_args()
+
+    if args.calibrate:
+        calibrate(HASH_FUNCTIONS[args.hash], args.size, args.operations // 10, args.repeat)
+        return
+
+    phases = make_phases(args.size, args.operations)
+    function = HASH_FUNCTIONS[args.hash]
+    weight = args.memory_weight
+    policy = hash_map_adaptive.EnginePolicy(memory_weight=weight)
+    engines = dict(ENGINES)
+    engines["adaptive"] = lambda capacity, function: ENGINES["adaptive"](capacity, function, policy=policy)
+    print(f"{args.size:,} keys, {args.operations:,} operations per phase; seconds, bytes per key")
+    print(f"{'engine':<9}" + "".join(f"{phase:>20}" for phase in PHASES) + f"{'total s':>10}{'cost':>7}")
+    gc.disable()
+    baseline = None
+    for name, factory in engines.items():
+        runs = [run(factory, function, phases, False) for _ in range(args.repeat)]
+        seconds = [min(result[0][i] for result in runs) for i in range(len(PHASES))]
+        _, sizes, engines = run(factory, function, phases, True)
+        if baseline is None:
+            baseline = seconds, sizes
+        cost = sum((s / base_s + weight * b / base_b) / (1 + weight)
+                   for s, b, base_s, base_b in zip(seconds, sizes, *baseline)) / len(PHASES)
+        cells = "".join(f"{s:>8.2f} s {b:>5.0f} B {e:>3}" for s, b, e in zip(seconds, sizes, engines))
+        print(f"{name:<9}{cells}{sum(seconds):>10.2f}{cost:>7.2f}")
+        gc.collect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# Description: Benchmarks get() and contains_key() throughput of both HashMaps with and without a Bloom filter
+#              for lookup streams with different shares of hits, and reports the filter's false-positive rate.
+#
+# Usage:       python benchmarks/bench_bloom_filter.py [--size N] [--lookups N] [--repeat N]
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hash_map_oa
+import hash_map_sc
+from a6_include import hash_function_2
+
+
+def lookups(size: int, count: int, hit_rate: float) -> list:
+    """
+    Returns count keys, hit_rate of which are among the size keys 'key0' ... that the maps hold.
+    """
+    rng = random.Random(0)
+    return ['key' + str(rng.randrange(size) if rng.random() < hit_rate else size + rng.randrange(10 * size))
+            for _ in range(count)]
+
+
+def time_lookups(hash_map, keys: list) -> float:
+    """Returns the seconds taken to get and contains_key every key."""
+    start = time.perf_counter()
+    for key in keys:
+        hash_map.get(key)
+        hash_map.contains_key(key)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bloom filter HashMap benchmark")
+    parser.add_argument("--size", type=int, default=20000)
+    parser.add_argument("--lookups", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'map':<4} {'hits':>5} {'plain ops/s':>12} {'filter ops/s':>13} {'speedup':>8} {'fp rate':>8}")
+    for name, map_class in (("SC", hash_map_sc.HashMap), ("OA", hash_map_oa.HashMap)):
+        plain = map_class(11, hash_function_2)
+        filtered = map_class(11, hash_function_2)
+        for i in range(args.size):
+            plain.put('key' + str(i), i)
+            filtered.put('key' + str(i), i)
+        bloom = filtered.enable_filter()
+        for hit_rate in (0.0, 0.1, 0.5, 0.9):
+            keys = lookups(args.size, args.lookups, hit_rate)
+            # alternate the two maps so that machine noise affects both alike
+            before, after = [], []
+            for _ in range(args.repeat):
+                before.append(time_lookups(plain, keys))
+                after.append(time_lookups(filtered, keys))
+            before, after = min(before), min(after)
+            ops = 2 * len(keys)
+            print(f"{name:<4} {hit_rate:>5.0%} {ops / before:>12,.0f} {ops / after:>13,.0f} {before / after:>7.2f}x "
+                  f"{bloom.false_positive_rate():>8.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# Description: Benchmarks the change feed. First the cost of recording changes: a mix of puts, increments and
+#              removes on both HashMaps with and without enable_feed(). Then replication to a replica in another
+#              process over a multiprocessing Pipe, syncing after every batch of changes either with the deltas of
+#              catch_up() or with a full snapshot each time, and reporting the changes replicated per second and
+#              the pickled bytes sent per sync.
+#
+# Usage:       python benchmarks/bench_feed.py [--size N] [--operations N] [--batches N ...] [--repeat N]
+
+import argparse
+import multiprocessing
+import os
+import pickle
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hash_map_feed
+import hash_map_oa
+import hash_map_sc
+from hash_map_defense import SeededHash
+
+
+ENGINES = {
+    "sc": hash_map_sc.HashMap,
+    "oa": hash_map_oa.HashMap,
+}
+
+
+def make_operations(size: int, operations: int, seed: int = 0) -> list:
+    """
+    Returns a list of (method name, key) calls over keys drawn from twice size keys, so that about half of the
+    removes find their key.
+    """
+    rng = random.Random(seed)
+    calls = []
+    for _ in range(operations):
+        key = 'key' + str(rng.randrange(2 * size))
+        draw = rng.random()
+        calls.append(('put' if draw < 0.6 else 'increment' if draw < 0.8 else 'remove', key))
+    return calls
+
+
+def run(hash_map, calls: list) -> None:
+    """Runs the calls on hash_map."""
+    for name, key in calls:
+        if name == 'put':
+            hash_map.put(key, 1)
+        elif name == 'increment':
+            hash_map.increment(key)
+        else:
+            hash_map.remove(key)
+
+
+def loaded_map(factory: callable, size: int, feed: bool):
+    """Returns a map holding size keys, with a change feed if feed is True."""
+    hash_map = factory(11, SeededHash(261))
+    for i in range(size):
+        hash_map.put('key' + str(i), i)
+    if feed:
+        hash_map.enable_feed()
+    return hash_map
+
+
+def recording(factory: callable, size: int, calls: list, repeat: int) -> tuple:
+    """Returns the fastest seconds to run calls on a loaded map (without feed, with feed)."""
+    results = []
+    for feed in (False, True):
+        best = float("inf")
+        for _ in range(repeat):
+            hash_map = loaded_map(factory, size, feed)
+            start = time.perf_counter()
+            run(hash_map, calls)
+            best = min(best, time.perf_counter() - start)
+        results.append(best)
+    return tuple(results)
+
+
+def replicate(factory: callable, size: int, calls: list, batch: int, snapshots: bool) -> tuple:
+    """
+    Runs calls on a loaded map, syncing a replica process after every batch of them, and returns
+    (seconds until the replica holds the last change, mean pickled bytes per sync). The replica starts from a
+    snapshot before the clock starts. With snapshots, every sync sends the whole map.
+    """
+    hash_map = loaded_map(factory, size, True)
+    primary, replica_end = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=hash_map_feed.follow, args=(replica_end,))
+    process.start()
+    hash_map_feed.send_changes(primary, hash_map)
+
+    sent = syncs = 0
+    start = time.perf_counter()
+    for first in range(0, len(calls), batch):
+        run(hash_map, calls[first:first + batch])
+        if snapshots:
+            primary.recv()
+            message = hash_map_feed.catch_up(hash_map)
+            primary.send(message)
+        else:
+            message = hash_map_feed.send_changes(primary, hash_map)
+        sent += len(pickle.dumps(message))
+        syncs += 1
+    replica = hash_map_feed.stop_replica(primary)
+    seconds = time.perf_counter() - start
+    process.join()
+    if replica.get_size() != hash_map.get_size():
+        raise AssertionError("the replica does not match the map")
+    return seconds, sent / syncs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="HashMap change feed benchmark")
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--operations", type=int, default=200000)
+    parser.add_argument("--batches", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    calls = make_operations(args.size, args.operations)
+    print(f"recording {args.operations:,} operations on a map of {args.size:,} keys")
+    for name, factory in ENGINES.items():
+        plain, fed = recording(factory, args.size, calls, args.repeat)
+        print(f"{name:<4} no feed {args.operations / plain:>12,.0f} ops/s"
+              f"   feed {args.operations / fed:>12,.0f} ops/s   overhead {fed / plain - 1:>6.1%}")
+
+    print(f"\nreplicating {args.operations:,} operations to another process")
+    for name, factory in ENGINES.items():
+        for batch in args.batches:
+            for snapshots in (False, True):
+                seconds, per_sync = replicate(factory, args.size, calls, batch, snapshots)
+                mode = "snapshots" if snapshots else "changes"
+                print(f"{name:<4} batch {batch:>6,} {mode:<10} {args.operations / seconds:>12,.0f} changes/s"
+                      f" {per_sync:>14,.0f} bytes/sync")
+
+
+if __name__ == "__main__":
+    main()
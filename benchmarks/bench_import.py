@@ -0,0 +1,105 @@
+# Description: Measures what a short-lived process pays to use the HashMaps: the cumulative import time of each
+#              map module under python -X importtime, which optional modules that import pulls in, and the time
+#              and memory it takes to create a map of each capacity. Exits non-zero if a module takes longer than
+#              the import budget or imports an optional module eagerly, so the budget can gate CI.
+#
+# Usage:       python benchmarks/bench_import.py [--budget-ms N] [--repeat N]
+
+import argparse
+import compileall
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+MODULES = ("hash_map_sc", "hash_map_oa")
+
+# Modules the maps only need for optional features, which importing a map must not load
+OPTIONAL_MODULES = ("array", "pickle", "random", "weakref", "multiprocessing", "concurrent.futures", "numpy")
+
+CAPACITIES = (11, 1000, 100000)
+
+
+def import_time(module: str, repeat: int) -> float:
+    """
+    Returns the fastest of repeat cumulative import times of module, in milliseconds, each measured with
+    python -X importtime in a fresh interpreter.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                                cwd=ROOT, capture_output=True, text=True, check=True)
+        for line in result.stderr.splitlines():
+            # import time: self [us] | cumulative | imported package
+            fields = line.split("|")
+            if len(fields) == 3 and fields[2].strip() == module:
+                best = min(best, int(fields[1]) / 1000)
+    return best
+
+
+def eager_imports(module: str) -> list:
+    """Returns the optional modules that importing module loads in a fresh interpreter."""
+    check = f"import sys, {module}; print(' '.join(m for m in {OPTIONAL_MODULES!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", check], cwd=ROOT, capture_output=True, text=True,
+                            check=True)
+    return result.stdout.split()
+
+
+def construct(map_class, capacity: int, repeat: int) -> tuple:
+    """Returns (microseconds, bytes) to create an empty map of the given class and capacity."""
+    from a6_include import hash_function_1
+
+    number = 200
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            map_class(capacity, hash_function_1)
+        best = min(best, (time.perf_counter() - start) / number)
+
+    tracemalloc.start()
+    maps = [map_class(capacity, hash_function_1) for _ in range(number)]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del maps
+    return best * 1e6, size / number
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="HashMap import time and constructor footprint benchmark")
+    parser.add_argument("--budget-ms", type=float, default=10.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    # stale or missing bytecode would be recompiled on every import and dominate the measurement
+    compileall.compile_dir(ROOT, maxlevels=0, quiet=1)
+
+    failed = False
+    for module in MODULES:
+        millis = import_time(module, args.repeat)
+        eager = eager_imports(module)
+        over = millis > args.budget_ms
+        failed = failed or over or bool(eager)
+        print(f"import {module:<12} {millis:7.2f} ms  budget {args.budget_ms:.1f} ms  "
+              f"{'OVER BUDGET' if over else 'ok'}")
+        if eager:
+            print(f"       {module:<12} imports optional modules eagerly: {', '.join(eager)}")
+
+    print()
+    import hash_map_oa
+    import hash_map_sc
+
+    for name, map_class in (("SC", hash_map_sc.HashMap), ("OA", hash_map_oa.HashMap)):
+        for capacity in CAPACITIES:
+            micros, size = construct(map_class, capacity, args.repeat)
+            print(f"{name} HashMap({capacity:>6}) {micros:8.2f} us {size:10.0f} bytes")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
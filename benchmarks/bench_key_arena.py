@@ -0,0 +1,55 @@
+# Description: Benchmarks the memory held by a map of short str keys in the node-per-key layouts of both HashMaps
+#              against the ArenaHashMap, which stores all keys in one bytearray.
+#
+# Usage:       python benchmarks/bench_key_arena.py [--sizes 10000 100000]
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hash_map_oa
+import hash_map_sc
+from a6_include import hash_function_2
+from hash_map_arena import ArenaHashMap
+
+
+def measure(map_class, size: int) -> tuple[int, float]:
+    """
+    Builds a map of size keys of the form 'k<number>' and returns the bytes it retains and the seconds it took.
+    Keys are created while memory is traced, so the str objects a map keeps alive are counted against it.
+    """
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    hash_map = map_class(11, hash_function_2)
+    for i in range(size):
+        hash_map.put('k' + str(i), i)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # the map stays alive until memory has been read
+    del hash_map
+    return retained, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Key arena memory benchmark")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10000, 100000])
+    args = parser.parse_args()
+
+    print(f"{'layout':<10} {'keys':>9} {'retained MiB':>13} {'bytes/key':>10} {'puts/s':>10}")
+    for size in args.sizes:
+        for name, map_class in (("SC", hash_map_sc.HashMap), ("OA", hash_map_oa.HashMap), ("arena", ArenaHashMap)):
+            retained, elapsed = measure(map_class, size)
+            print(f"{name:<10} {size:>9} {retained / 2 ** 20:>13.2f} {retained / size:>10.1f} "
+                  f"{size / elapsed:>10,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# Description: Benchmarks put/get throughput of both HashMaps per key type, comparing native key hashing against
+#              the old workaround of converting every key to a string first.
+#
+# Usage:       python benchmarks/bench_key_types.py [--size N] [--repeat N]
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hash_map_oa
+import hash_map_sc
+from a6_include import hash_function_2
+from hash_map_keys import CompositeKey
+
+
+def make_keys(kind: str, size: int) -> list:
+    """
+    Returns size distinct keys of the given kind.
+    """
+    if kind == "str":
+        return ['key' + str(i) for i in range(size)]
+    if kind == "int":
+        return list(range(size))
+    if kind == "bytes":
+        return [i.to_bytes(8, "little") for i in range(size)]
+    if kind == "tuple":
+        return [('user', i, i % 7) for i in range(size)]
+    if kind == "CompositeKey":
+        return [CompositeKey('user', i, i % 7) for i in range(size)]
+    raise ValueError(kind)
+
+
+def put_get(map_class, keys: list, stringify: bool) -> float:
+    """
+    Returns the seconds taken to put every key into a new map and get every key back.
+    With stringify, every key is converted with str() before each call, as callers had to before.
+    """
+    hash_map = map_class(11, hash_function_2)
+    start = time.perf_counter()
+    if stringify:
+        for key in keys:
+            hash_map.put(str(key), 1)
+        for key in keys:
+            hash_map.get(str(key))
+    else:
+        for key in keys:
+            hash_map.put(key, 1)
+        for key in keys:
+            hash_map.get(key)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Per key type HashMap benchmark")
+    parser.add_argument("--size", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'map':<4} {'key type':<13} {'native ops/s':>14} {'str() ops/s':>14} {'speedup':>8}")
+    for name, map_class in (("SC", hash_map_sc.HashMap), ("OA", hash_map_oa.HashMap)):
+        for kind in ("str", "int", "bytes", "tuple", "CompositeKey"):
+            keys = make_keys(kind, args.size)
+            # alternate the two variants so that machine noise affects both alike
+            native, stringified = [], []
+            for _ in range(args.repeat):
+                native.append(put_get(map_class, keys, False))
+                stringified.append(put_get(map_class, keys, kind != "str"))
+            native, stringified = min(native), min(stringified)
+            ops = 2 * args.size
+            print(f"{name:<4} {kind:<13} {ops / native:>14,.0f} {ops / stringified:>14,.0f} "
+                  f"{stringified / native:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
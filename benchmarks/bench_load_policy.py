@@ -0,0 +1,64 @@
+# Description: Benchmarks memory footprint and throughput of both HashMaps under an oscillating workload that
+#              repeatedly fills the map and drains it again, comparing the default load policy against a
+#              grow-only policy.
+#
+# Usage:       python benchmarks/bench_load_policy.py [--size N] [--cycles N] [--residue N]
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hash_map_oa
+import hash_map_sc
+from a6_include import hash_function_2
+from hash_map_policy import OA_DEFAULT_POLICY, SC_DEFAULT_POLICY, LoadPolicy
+
+
+def oscillate(hash_map, keys: list, cycles: int, residue: int) -> tuple[float, int, int]:
+    """
+    Fills hash_map with keys and drains it down to residue elements, cycles times.
+    Returns the elapsed seconds, the traced memory still held after the last drain and the final capacity.
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(cycles):
+        for key in keys:
+            hash_map.put(key, 1)
+        for key in keys[residue:]:
+            hash_map.remove(key)
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, current, hash_map.get_capacity()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Oscillating workload load-policy benchmark")
+    parser.add_argument("--size", type=int, default=10000, help="peak number of keys per cycle")
+    parser.add_argument("--cycles", type=int, default=3, help="number of fill/drain cycles")
+    parser.add_argument("--residue", type=int, default=100, help="keys left in the map after each drain")
+    args = parser.parse_args()
+
+    keys = ['key' + str(i) for i in range(args.size)]
+    ops = args.cycles * (2 * args.size - args.residue)
+
+    cases = (
+        ("SC", hash_map_sc.HashMap, "default", SC_DEFAULT_POLICY),
+        ("SC", hash_map_sc.HashMap, "grow-only", LoadPolicy(1.0, min_load=0)),
+        ("OA", hash_map_oa.HashMap, "default", OA_DEFAULT_POLICY),
+        ("OA", hash_map_oa.HashMap, "grow-only", LoadPolicy(0.5, min_load=0)),
+    )
+
+    print(f"{'map':<4} {'policy':<10} {'ops/s':>12} {'retained KiB':>14} {'capacity':>10}")
+    for name, map_class, policy_name, policy in cases:
+        hash_map = map_class(11, hash_function_2, policy=policy)
+        elapsed, retained, capacity = oscillate(hash_map, keys, args.cycles, args.residue)
+        print(f"{name:<4} {policy_name:<10} {ops / elapsed:>12,.0f} {retained / 1024:>14,.1f} {capacity:>10}")
+
+
+if __name__ == "__main__":
+    main()
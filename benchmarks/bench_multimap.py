@@ -0,0 +1,98 @@
+# Description: Benchmarks grouping records by key with the MultiHashMap against a chaining HashMap holding a list
+#              per key, filled with get() then put() or append() and with setdefault(). Reports the build time
+#              and the memory the grouped values take per record, for small groups and for large ones.
+#
+# Usage:       python benchmarks/bench_multimap.py [--records N] [--group-sizes N ...] [--repeat N]
+
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hash_map_multimap
+import hash_map_sc
+from a6_include import hash_function_2
+
+
+def get_then_put(records: list):
+    """Groups records in a HashMap of lists, with a get() and, for a new key, a put()."""
+    hash_map = hash_map_sc.HashMap(11, hash_function_2)
+    for key, value in records:
+        values = hash_map.get(key)
+        if values is None:
+            hash_map.put(key, [value])
+        else:
+            values.append(value)
+    return hash_map
+
+
+def setdefault_list(records: list):
+    """Groups records in a HashMap of lists with one setdefault() per record."""
+    hash_map = hash_map_sc.HashMap(11, hash_function_2)
+    for key, value in records:
+        hash_map.setdefault(key, []).append(value)
+    return hash_map
+
+
+def multimap_add(records: list, value_type: str = None):
+    """Groups records with MultiHashMap.add()."""
+    multimap = hash_map_multimap.MultiHashMap(11, hash_function_2, value_type)
+    for key, value in records:
+        multimap.add(key, value)
+    return multimap
+
+
+def multimap_group_by(records: list, value_type: str = None):
+    """Groups records with group_by(), which sizes the table up front and compacts the values."""
+    return hash_map_multimap.group_by(records, lambda record: record[0], lambda record: record[1],
+                                      function=hash_function_2, value_type=value_type)
+
+
+BUILDERS = {
+    "get + put list": get_then_put,
+    "setdefault list": setdefault_list,
+    "multimap add": multimap_add,
+    "group_by": multimap_group_by,
+    "group_by i8": lambda records: multimap_group_by(records, 'i8'),
+}
+
+
+def measure(builder: callable, records: list, repeat: int) -> tuple:
+    """Returns (fastest build seconds, bytes held by the built map per record)."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        builder(records)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    built = builder(records)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del built
+    return best, size / len(records)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="MultiHashMap grouping benchmark")
+    parser.add_argument("--records", type=int, default=200000)
+    parser.add_argument("--group-sizes", type=int, nargs="+", default=[2, 10, 1000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    for group_size in args.group_sizes:
+        keys = ['key' + str(i) for i in range(max(1, args.records // group_size))]
+        # values above 256 so that the list and object pool variants hold int objects like real records would
+        records = [(rng.choice(keys), 1000 + i) for i in range(args.records)]
+        print(f"\n{args.records:,} records, {len(keys):,} keys ({group_size} values per key)")
+        for name, builder in BUILDERS.items():
+            seconds, per_record = measure(builder, records, args.repeat)
+            print(f"{name:<16} {seconds:8.3f} s {per_record:8.1f} bytes/record")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# Description: Benchmarks resize_table() on both HashMaps with the serial re-put loop and with the keys
+#              rehashed in a process pool of increasing size, and reports the wall-clock speedup of each
+#              pool size over the serial resize.
+#
+# Usage:       python benchmarks/bench_parallel_resize.py [--size N] [--processes N ...] [--repeat N]
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hash_map_oa
+import hash_map_sc
+from a6_include import hash_function_1
+
+
+def time_resize(hash_map, processes: int, repeat: int) -> float:
+    """Returns the fastest of repeat resizes of fresh copies of hash_map to twice its capacity."""
+    columns = hash_map.export_columns()
+    best = float("inf")
+    for _ in range(repeat):
+        copy = type(hash_map).from_columns(columns)
+        start = time.perf_counter()
+        copy.resize_table(2 * copy.get_capacity(), processes)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+    parser = argparse.ArgumentParser(description="HashMap parallel resize benchmark")
+    parser.add_argument("--size", type=int, default=1000000)
+    parser.add_argument("--processes", type=int, nargs="+",
+                        default=sorted({1, 2, 4, 8, cores} & set(range(1, cores + 1))))
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{args.size:,} keys, {cores} cores available")
+    keys = ['key' + str(i) for i in range(args.size)]
+    for name, map_class in (("SC", hash_map_sc.HashMap), ("OA", hash_map_oa.HashMap)):
+        # hash_function_1 collides on these keys, so from_columns() switches to a SeededHash as put() would
+        hash_map = map_class.from_columns({'keys': keys, 'values': list(range(args.size)),
+                                           'function': hash_function_1})
+        serial = time_resize(hash_map, None, args.repeat)
+        print(f"{name} serial     {serial:8.3f} s")
+        for processes in args.processes:
+            seconds = time_resize(hash_map, processes, args.repeat)
+            print(f"{name} {processes:>2} workers {seconds:8.3f} s   speedup {serial / seconds:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
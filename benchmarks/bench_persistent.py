@@ -0,0 +1,95 @@
+# Description: Benchmarks versioned updates with PersistentHashMap against copying a chaining HashMap for every
+#              version, both by re-putting every pair into a new map and with the bucket by bucket _copy().
+#              Also compares get() throughput, since the trie trades some lookup speed for cheap versions.
+#
+# Usage:       python benchmarks/bench_persistent.py [--sizes N ...] [--versions N] [--repeat N]
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from a6_include import hash_function_2
+from hash_map_hamt import PersistentHashMap
+from hash_map_sc import HashMap
+
+
+def versions_by_reput(hash_map: HashMap, versions: int) -> list:
+    """Returns versions maps, each a full re-put copy of the previous one with one more change."""
+    history = [hash_map]
+    for i in range(versions):
+        previous = history[-1]
+        copy = HashMap(previous.get_capacity(), hash_function_2)
+        pairs = previous.get_keys_and_values()
+        for j in range(pairs.length()):
+            key, value = pairs[j]
+            copy.put(key, value)
+        copy.put('key' + str(i), -i)
+        history.append(copy)
+    return history
+
+
+def versions_by_copy(hash_map: HashMap, versions: int) -> list:
+    """Returns versions maps, each a bucket by bucket copy of the previous one with one more change."""
+    history = [hash_map]
+    for i in range(versions):
+        copy = history[-1]._copy()
+        copy.put('key' + str(i), -i)
+        history.append(copy)
+    return history
+
+
+def versions_persistent(persistent: PersistentHashMap, versions: int) -> list:
+    """Returns versions PersistentHashMap versions, each with one more change."""
+    history = [persistent]
+    for i in range(versions):
+        history.append(history[-1].put('key' + str(i), -i))
+    return history
+
+
+def best_of(repeat: int, function: callable, *args) -> float:
+    """Returns the fastest of repeat timed calls of function(*args)."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def get_all(hash_map, keys: list) -> None:
+    """Gets every key."""
+    for key in keys:
+        hash_map.get(key)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Persistent HashMap benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--versions", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'size':>7} {'re-put us/version':>18} {'_copy us/version':>17} {'HAMT us/version':>16} "
+          f"{'SC get/s':>11} {'HAMT get/s':>11}")
+    for size in args.sizes:
+        keys = ['key' + str(i) for i in range(size)]
+        hash_map = HashMap(11, hash_function_2)
+        persistent = PersistentHashMap(hash_function_2)
+        for i, key in enumerate(keys):
+            hash_map.put(key, i)
+            persistent = persistent.put(key, i)
+
+        reput = best_of(args.repeat, versions_by_reput, hash_map, args.versions) / args.versions
+        copied = best_of(args.repeat, versions_by_copy, hash_map, args.versions) / args.versions
+        hamt = best_of(args.repeat, versions_persistent, persistent, args.versions) / args.versions
+        sc_get = best_of(args.repeat, get_all, hash_map, keys)
+        hamt_get = best_of(args.repeat, get_all, persistent, keys)
+        print(f"{size:>7} {reput * 1e6:>18,.0f} {copied * 1e6:>17,.0f} {hamt * 1e6:>16,.1f} "
+              f"{size / sc_get:>11,.0f} {size / hamt_get:>11,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# Description: Benchmarks pickling both HashMaps as flat columns, with protocol 5 out-of-band buffers, against
+#              pickling their node graph the default way. Reports dump and load times, pickle size and the peak
+#              memory allocated while loading, then compares a put() loop with the bulk from_columns() import.
+#
+# Usage:       python benchmarks/bench_pickle.py [--size N] [--repeat N] [--value-type T]
+
+import argparse
+import os
+import pickle
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hash_map_oa
+import hash_map_sc
+from a6_include import hash_function_2
+
+
+class GraphSC(hash_map_sc.HashMap):
+    """Chaining HashMap pickled as its node graph, as it was before export_columns()."""
+    __reduce_ex__ = object.__reduce_ex__
+
+
+class GraphOA(hash_map_oa.HashMap):
+    """Open addressing HashMap pickled as its entry graph, as it was before export_columns()."""
+    __reduce_ex__ = object.__reduce_ex__
+
+
+def build(map_class, keys: list, value_type: str):
+    """Returns a map of the given class holding keys, each mapped to its position."""
+    hash_map = map_class(11, hash_function_2, value_type=value_type)
+    for i, key in enumerate(keys):
+        hash_map.put(key, i)
+    return hash_map
+
+
+def round_trip(hash_map, out_of_band: bool) -> tuple:
+    """Pickles and unpickles hash_map with protocol 5 and returns (dump seconds, load seconds, bytes)."""
+    buffers = [] if out_of_band else None
+    start = time.perf_counter()
+    data = pickle.dumps(hash_map, protocol=5, buffer_callback=None if buffers is None else buffers.append)
+    dumped = time.perf_counter()
+    pickle.loads(data, buffers=buffers)
+    loaded = time.perf_counter()
+    size = len(data) + sum(memoryview(buffer).nbytes for buffer in buffers or ())
+    return dumped - start, loaded - dumped, size
+
+
+def load_peak(hash_map, out_of_band: bool) -> int:
+    """Returns the peak bytes allocated while unpickling hash_map."""
+    buffers = [] if out_of_band else None
+    data = pickle.dumps(hash_map, protocol=5, buffer_callback=None if buffers is None else buffers.append)
+    tracemalloc.start()
+    copy = pickle.loads(data, buffers=buffers)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del copy
+    return peak
+
+
+def best_of(repeat: int, function: callable, *args) -> float:
+    """Returns the fastest of repeat timed calls of function(*args)."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="HashMap pickle benchmark")
+    parser.add_argument("--size", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--value-type", default=None, help="e.g. i8 to store values unboxed")
+    args = parser.parse_args()
+
+    keys = ['key' + str(i) for i in range(args.size)]
+    values = list(range(args.size))
+    print(f"{'map':<14} {'dump s':>8} {'load s':>8} {'MB':>8} {'load peak MB':>13}")
+    for name, graph_class, map_class in (("SC", GraphSC, hash_map_sc.HashMap),
+                                         ("OA", GraphOA, hash_map_oa.HashMap)):
+        rows = ((f"{name} node graph", build(graph_class, keys, args.value_type), False),
+                (f"{name} columns", build(map_class, keys, args.value_type), False),
+                (f"{name} columns+oob", None, True))
+        hash_map = None
+        for label, built, out_of_band in rows:
+            hash_map = built or hash_map
+            times = [round_trip(hash_map, out_of_band) for _ in range(args.repeat)]
+            dump = min(t[0] for t in times)
+            load = min(t[1] for t in times)
+            peak = load_peak(hash_map, out_of_band)
+            print(f"{label:<14} {dump:>8.3f} {load:>8.3f} {times[0][2] / 1e6:>8.1f} {peak / 1e6:>13.1f}")
+
+        columns = {'keys': keys, 'values': values, 'function': hash_function_2, 'value_type': args.value_type}
+        put_loop = best_of(1, build, map_class, keys, args.value_type)
+        bulk = best_of(args.repeat, map_class.from_columns, columns)
+        print(f"{name} put() loop {put_loop:.3f} s   from_columns() {bulk:.3f} s\n")
+
+
+if __name__ == "__main__":
+    main()
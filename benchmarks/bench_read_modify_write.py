@@ -0,0 +1,118 @@
+# Description: Benchmarks the single-probe read-modify-write operations of both HashMaps (increment, setdefault,
+#              update_with and pop) against the get followed by put (or remove) pattern they replace.
+#
+# Usage:       python benchmarks/bench_read_modify_write.py [--size N] [--distinct N] [--repeat N]
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hash_map_oa
+import hash_map_sc
+from a6_include import hash_function_2
+
+
+def increment_get_put(hash_map, keys: list) -> None:
+    """Counts keys with a get and a put per key."""
+    for key in keys:
+        count = hash_map.get(key)
+        hash_map.put(key, 1 if count is None else count + 1)
+
+
+def increment_single(hash_map, keys: list) -> None:
+    """Counts keys with one increment per key."""
+    for key in keys:
+        hash_map.increment(key)
+
+
+def setdefault_get_put(hash_map, keys: list) -> None:
+    """Fetches or adds each key with a get and, when missing, a put."""
+    for key in keys:
+        if hash_map.get(key) is None:
+            hash_map.put(key, 0)
+
+
+def setdefault_single(hash_map, keys: list) -> None:
+    """Fetches or adds each key with one setdefault per key."""
+    for key in keys:
+        hash_map.setdefault(key, 0)
+
+
+def update_get_put(hash_map, keys: list) -> None:
+    """Applies a function to each key's value with a get and a put."""
+    for key in keys:
+        value = hash_map.get(key)
+        hash_map.put(key, (0 if value is None else value) * 3 + 1)
+
+
+def update_single(hash_map, keys: list) -> None:
+    """Applies a function to each key's value with one update_with per key."""
+    for key in keys:
+        hash_map.update_with(key, lambda value: value * 3 + 1, 0)
+
+
+def pop_get_remove(hash_map, keys: list) -> None:
+    """Takes each key's value out with a get and a remove."""
+    for key in keys:
+        hash_map.get(key)
+        hash_map.remove(key)
+
+
+def pop_single(hash_map, keys: list) -> None:
+    """Takes each key's value out with one pop per key."""
+    for key in keys:
+        hash_map.pop(key)
+
+
+OPERATIONS = (
+    ("increment", increment_get_put, increment_single),
+    ("setdefault", setdefault_get_put, setdefault_single),
+    ("update_with", update_get_put, update_single),
+    ("pop", pop_get_remove, pop_single),
+)
+
+
+def time_run(map_class, function: callable, keys: list, prefill: list) -> float:
+    """
+    Returns the seconds function takes over keys on a new map holding every key of prefill.
+    """
+    hash_map = map_class(11, hash_function_2)
+    for key in prefill:
+        hash_map.put(key, 1)
+    start = time.perf_counter()
+    function(hash_map, keys)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Read-modify-write HashMap benchmark")
+    parser.add_argument("--size", type=int, default=50000, help="operations per run")
+    parser.add_argument("--distinct", type=int, default=5000, help="distinct keys among the operations")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    distinct = ['key' + str(i) for i in range(args.distinct)]
+    keys = [rng.choice(distinct) for _ in range(args.size)]
+
+    print(f"{'map':<4} {'operation':<12} {'get+put ops/s':>14} {'single ops/s':>14} {'speedup':>8}")
+    for name, map_class in (("SC", hash_map_sc.HashMap), ("OA", hash_map_oa.HashMap)):
+        for operation, baseline, single in OPERATIONS:
+            # pop runs over every distinct key of a full map; the others over the random key stream
+            run_keys, prefill = (distinct, distinct) if operation == "pop" else (keys, [])
+            # alternate the two variants so that machine noise affects both alike
+            before, after = [], []
+            for _ in range(args.repeat):
+                before.append(time_run(map_class, baseline, run_keys, prefill))
+                after.append(time_run(map_class, single, run_keys, prefill))
+            before, after = min(before), min(after)
+            ops = len(run_keys)
+            print(f"{name:<4} {operation:<12} {ops / before:>14,.0f} {ops / after:>14,.0f} {before / after:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# Description: Benchmarks intersect, difference and union of both HashMaps against the pattern they replace:
+#              iterating get_keys_and_values() of one map and calling contains_key on the other. Runs with a
+#              large and a small map, with maps that share capacity and hash function (aligned) and without.
+#
+# Usage:       python benchmarks/bench_set_ops.py [--large N] [--small N] [--repeat N] [--processes N]
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hash_map_oa
+import hash_map_sc
+from a6_include import hash_function_1, hash_function_2
+
+
+def build(map_class, keys: range, capacity: int, function: callable):
+    """Returns a map of the given class holding every key of keys."""
+    hash_map = map_class(capacity, function)
+    for i in keys:
+        hash_map.put('key' + str(i), i)
+    return hash_map
+
+
+def naive(operation: str, hash_map, other):
+    """
+    Computes operation the old way, walking hash_map's pairs and probing other with contains_key.
+    """
+    result = hash_map._empty_like()
+    pairs = hash_map.get_keys_and_values()
+    if operation == "union":
+        pairs_other = other.get_keys_and_values()
+        for i in range(pairs_other.length()):
+            key, value = pairs_other[i]
+            result.put(key, value)
+    for i in range(pairs.length()):
+        key, value = pairs[i]
+        if operation == "union" or other.contains_key(key) == (operation == "intersect"):
+            result.put(key, value)
+    return result
+
+
+def best_of(repeat: int, function: callable, *args) -> float:
+    """Returns the fastest of repeat timed calls of function(*args)."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="HashMap set algebra benchmark")
+    parser.add_argument("--large", type=int, default=50000)
+    parser.add_argument("--small", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--processes", type=int, default=None, help="also time the process pool path")
+    args = parser.parse_args()
+
+    print(f"{'map':<4} {'layout':<10} {'operation':<11} {'naive s':>9} {'method s':>9} {'speedup':>8}")
+    for name, map_class in (("SC", hash_map_sc.HashMap), ("OA", hash_map_oa.HashMap)):
+        large = build(map_class, range(args.large), 11, hash_function_2)
+        capacity = large.get_capacity()
+        layouts = (
+            ("aligned", build(map_class, range(0, 2 * args.small, 2), capacity, hash_function_2)),
+            ("unaligned", build(map_class, range(0, 2 * args.small, 2), 11, hash_function_1)),
+        )
+        for layout, small in layouts:
+            for operation in ("intersect", "difference", "union"):
+                # the naive pattern walks the large map; the methods pick the smaller side themselves
+                before = best_of(args.repeat, naive, operation, large, small)
+                after = best_of(args.repeat, getattr(large, operation), small)
+                print(f"{name:<4} {layout:<10} {operation:<11} {before:>9.4f} {after:>9.4f} {before / after:>7.2f}x")
+                if args.processes:
+                    pooled = best_of(args.repeat, getattr(large, operation), small, args.processes)
+                    print(f"{name:<4} {layout:<10} {operation + ' pool':<11} {before:>9.4f} {pooled:>9.4f} "
+                          f"{before / pooled:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
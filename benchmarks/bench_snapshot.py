@@ -0,0 +1,101 @@
+# Description: Benchmarks copy-on-write snapshots of both HashMaps: the cost of taking a snapshot compared with
+#              exporting get_keys_and_values(), the put throughput while a snapshot is alive, and how many
+#              puts a writer thread completes while a reader exports a snapshot.
+#
+# Usage:       python benchmarks/bench_snapshot.py [--size N] [--writes N] [--repeat N]
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hash_map_oa
+import hash_map_sc
+from a6_include import hash_function_2
+
+
+def build(map_class, size: int):
+    """Returns a map of the given class holding size keys."""
+    hash_map = map_class(11, hash_function_2)
+    for i in range(size):
+        hash_map.put('key' + str(i), i)
+    return hash_map
+
+
+def best_of(repeat: int, function: callable) -> float:
+    """Returns the fastest of repeat timed calls of function()."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def time_writes(hash_map, size: int, writes: int) -> float:
+    """Returns the seconds taken to overwrite writes existing keys, spread over the whole table."""
+    start = time.perf_counter()
+    for i in range(writes):
+        hash_map.put('key' + str(i * 7919 % size), -i)
+    return time.perf_counter() - start
+
+
+def export_while_writing(hash_map, size: int) -> tuple:
+    """
+    Exports a snapshot in a reader thread while the main thread keeps writing, and returns the seconds the
+    export took and the number of writes completed meanwhile.
+    """
+    snapshot = hash_map.snapshot()
+    done = threading.Event()
+    elapsed = []
+
+    def reader() -> None:
+        start = time.perf_counter()
+        snapshot.get_keys_and_values()
+        elapsed.append(time.perf_counter() - start)
+        done.set()
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    writes = 0
+    while not done.is_set():
+        hash_map.put('key' + str(writes * 7919 % size), writes)
+        writes += 1
+    thread.join()
+    return elapsed[0], writes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="HashMap snapshot benchmark")
+    parser.add_argument("--size", type=int, default=50000)
+    parser.add_argument("--writes", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for name, map_class in (("SC", hash_map_sc.HashMap), ("OA", hash_map_oa.HashMap)):
+        hash_map = build(map_class, args.size)
+        snapshot_seconds = best_of(args.repeat, hash_map.snapshot)
+        export_seconds = best_of(args.repeat, hash_map.get_keys_and_values)
+        print(f"{name} snapshot() {snapshot_seconds * 1e6:10.1f} us   get_keys_and_values() "
+              f"{export_seconds * 1e6:10.1f} us")
+
+        # the first writes after a snapshot copy segments, later ones find them copied already
+        plain = min(time_writes(hash_map, args.size, args.writes) for _ in range(args.repeat))
+        with_snapshot = []
+        for _ in range(args.repeat):
+            snapshot = hash_map.snapshot()
+            with_snapshot.append(time_writes(hash_map, args.size, args.writes))
+            del snapshot
+        with_snapshot = min(with_snapshot)
+        print(f"{name} puts/s without snapshot {args.writes / plain:12,.0f}   with a live snapshot "
+              f"{args.writes / with_snapshot:12,.0f}")
+
+        seconds, writes = export_while_writing(hash_map, args.size)
+        print(f"{name} export took {seconds:.3f} s while {writes:,} puts went through\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+# Description: Reproducible benchmark harness comparing the HashMap engines against Python's dict.
+#              Every engine runs the same pre-generated operation stream for each combination of workload,
+#              key size and map size, and the results are written as JSON. A second mode compares two
+#              result files and flags throughput regressions.
+#
+# Usage:       python benchmarks/run_benchmarks.py run [--sizes 1000 10000] [--output results.json]
+#              python benchmarks/run_benchmarks.py compare baseline.json current.json [--threshold 0.1]
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hash_map_adaptive
+import hash_map_oa
+import hash_map_sc
+from a6_include import hash_function_1, hash_function_2
+
+
+GET, PUT, REMOVE = 0, 1, 2
+
+
+class DictMap:
+    """
+    Adapter giving Python's dict the HashMap interface used by the harness
+    """
+
+    def __init__(self, capacity: int, function: callable) -> None:
+        """Initialize an empty dict; capacity and function are ignored."""
+        self._data = {}
+
+    def put(self, key, value: object) -> None:
+        """Adds or replaces a key-value pair."""
+        self._data[key] = value
+
+    def get(self, key) -> object:
+        """Returns the value of key, or None if it is absent."""
+        return self._data.get(key)
+
+    def remove(self, key) -> None:
+        """Removes key if it is present."""
+        self._data.pop(key, None)
+
+    def contains_key(self, key) -> bool:
+        """Returns True if key is present."""
+        return key in self._data
+
+
+# Engine name -> factory taking (capacity, hash function) and returning an object with put/get/remove
+ENGINES = {
+    "sc": hash_map_sc.HashMap,
+    "oa": hash_map_oa.HashMap,
+    "adaptive": hash_map_adaptive.AdaptiveHashMap,
+    "dict": DictMap,
+}
+
+HASH_FUNCTIONS = {
+    "1": hash_function_1,
+    "2": hash_function_2,
+}
+
+
+def register_engine(name: str, factory: callable) -> None:
+    """
+    Adds an engine to the harness. factory(capacity, function) must return a map with put, get and remove.
+    """
+    ENGINES[name] = factory
+
+
+# ------------------- WORKLOADS -------------------------------------------- #
+
+def make_keys(rng: random.Random, count: int, key_size: int, start: int = 0) -> list:
+    """
+    Returns count distinct keys of exactly key_size characters. Uniqueness comes from a hexadecimal suffix
+    and the remaining characters are random letters.
+    """
+    keys = []
+    for i in range(start, start + count):
+        suffix = format(i, 'x')
+        prefix = ''.join(rng.choices('abcdefghijklmnopqrstuvwxyz', k=max(0, key_size - len(suffix))))
+        keys.append(prefix + suffix)
+    return keys
+
+
+def make_colliding_blocks() -> list:
+    """
+    Returns every 4-character block of printable ASCII obtained from 'OOOO' by adding s * (1, -2, 1, 0) +
+    t * (0, 1, -2, 1) to its character codes. These changes keep both the sum of the codes and the sum
+    weighted by position, so every block adds the same amount to hash_function_1 and to hash_function_2 of a
+    key at any offset.
+    """
+    center, low, high = ord('O'), ord('!'), ord('~')
+    blocks = []
+    for s in range(-high, high + 1):
+        for t in range(-high, high + 1):
+            codes = (center + s, center - 2 * s + t, center + s - 2 * t, center + t)
+            if all(low <= code <= high for code in codes):
+                blocks.append(''.join(map(chr, codes)))
+    return blocks
+
+
+def make_colliding_keys(count: int, key_size: int) -> list:
+    """
+    Returns count distinct keys of exactly key_size characters that share one hash under hash_function_1 and
+    under hash_function_2. Each key is a sequence of colliding blocks padded to key_size, enumerated in a fixed
+    order. Raises ValueError if there are fewer than count such keys.
+    """
+    from itertools import islice, product
+
+    blocks = make_colliding_blocks()
+    available = len(blocks) ** (key_size // 4)
+    if count > available:
+        raise ValueError(f"only {available:,} colliding keys of size {key_size} exist, {count:,} were requested; "
+                         f"use a larger key size")
+    padding = 'O' * (key_size % 4)
+    return [''.join(parts) + padding for parts in islice(product(blocks, repeat=key_size // 4), count)]
+
+
+def read_heavy(rng, size, key_size, ops):
+    """90% gets, a fifth of them misses, and 10% updates of existing keys."""
+    keys = make_keys(rng, size, key_size)
+    missing = make_keys(rng, size, key_size, start=size)
+    stream = []
+    for _ in range(ops):
+        roll = rng.random()
+        if roll < 0.72:
+            stream.append((GET, rng.choice(keys)))
+        elif roll < 0.9:
+            stream.append((GET, rng.choice(missing)))
+        else:
+            stream.append((PUT, rng.choice(keys)))
+    return keys, stream
+
+
+def write_heavy(rng, size, key_size, ops):
+    """90% puts, half of them new keys, and 10% gets."""
+    keys = make_keys(rng, size, key_size)
+    new_keys = iter(make_keys(rng, ops, key_size, start=size))
+    stream = []
+    for _ in range(ops):
+        roll = rng.random()
+        if roll < 0.45:
+            stream.append((PUT, next(new_keys)))
+        elif roll < 0.9:
+            stream.append((PUT, rng.choice(keys)))
+        else:
+            stream.append((GET, rng.choice(keys)))
+    return keys, stream
+
+
+def churn(rng, size, key_size, ops):
+    """Alternating removes of live keys and puts of new keys, keeping the size constant."""
+    keys = make_keys(rng, size, key_size)
+    new_keys = make_keys(rng, ops // 2 + 1, key_size, start=size)
+    live = list(keys)
+    stream = []
+    for i in range(ops // 2):
+        victim = rng.randrange(len(live))
+        stream.append((REMOVE, live[victim]))
+        live[victim] = new_keys[i]
+        stream.append((PUT, new_keys[i]))
+    return keys, stream
+
+
+def zipfian(rng, size, key_size, ops, exponent: float = 1.1):
+    """Gets drawn from a Zipf distribution over the keys, so a few hot keys dominate."""
+    keys = make_keys(rng, size, key_size)
+    weights, total = [], 0.0
+    for rank in range(1, size + 1):
+        total += 1.0 / rank ** exponent
+        weights.append(total)
+    return keys, [(GET, key) for key in rng.choices(keys, cum_weights=weights, k=ops)]
+
+
+def adversarial(rng, size, key_size, ops):
+    """Gets over keys that all collide under both hash_function_1 and hash_function_2."""
+    keys = make_colliding_keys(size, key_size)
+    return keys, [(GET, rng.choice(keys)) for _ in range(ops)]
+
+
+WORKLOADS = {
+    "read_heavy": read_heavy,
+    "write_heavy": write_heavy,
+    "churn": churn,
+    "zipfian": zipfian,
+    "adversarial": adversarial,
+}
+
+
+# ------------------- RUNNER ----------------------------------------------- #
+
+def run_stream(factory: callable, function: callable, keys: list, stream: list) -> float:
+    """
+    Loads keys into a new map built by factory, then returns the seconds taken to replay stream on it.
+    """
+    hash_map = factory(11, function)
+    for key in keys:
+        hash_map.put(key, 0)
+
+    get, put, remove = hash_map.get, hash_map.put, hash_map.remove
+    start = time.perf_counter()
+    for op, key in stream:
+        if op == GET:
+            get(key)
+        elif op == PUT:
+            put(key, 1)
+        else:
+            remove(key)
+    return time.perf_counter() - start
+
+
+def run(args: argparse.Namespace) -> dict:
+    """
+    Runs every selected engine over every workload, key size and map size and returns the JSON document.
+    """
+    function = HASH_FUNCTIONS[args.hash]
+    results = []
+    for workload in args.workloads:
+        for key_size in args.key_sizes:
+            for size in args.sizes:
+                ops = args.ops or size
+                # each combination gets its own seed so that results don't depend on which ones are selected
+                rng = random.Random(f"{args.seed}-{workload}-{key_size}-{size}")
+                keys, stream = WORKLOADS[workload](rng, size, key_size, ops)
+                for engine in args.engines:
+                    seconds = min(run_stream(ENGINES[engine], function, keys, stream)
+                                  for _ in range(args.repeat))
+                    result = {
+                        "engine": engine,
+                        "workload": workload,
+                        "key_size": key_size,
+                        "size": size,
+                        "ops": len(stream),
+                        "seconds": seconds,
+                        "ops_per_sec": len(stream) / seconds if seconds else float('inf'),
+                    }
+                    results.append(result)
+                    print(f"{engine:<8} {workload:<12} key={key_size:<4} size={size:<9} "
+                          f"{result['ops_per_sec']:>14,.0f} ops/s", file=sys.stderr)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "seed": args.seed,
+            "hash_function": args.hash,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list:
+    """
+    Returns (key, baseline ops/s, current ops/s, change) for every result that got slower by more than
+    threshold, as a fraction of the baseline throughput.
+    """
+    def index(document):
+        return {(r["engine"], r["workload"], r["key_size"], r["size"]): r["ops_per_sec"]
+                for r in document["results"]}
+
+    before, after = index(baseline), index(current)
+    slowdowns = []
+    for key in sorted(before.keys() & after.keys()):
+        change = after[key] / before[key] - 1
+        if change < -threshold:
+            slowdowns.append((key, before[key], after[key], change))
+    return slowdowns
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="HashMap benchmark harness")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmarks and write JSON results")
+    run_parser.add_argument("--engines", nargs="+", default=list(ENGINES), choices=list(ENGINES))
+    run_parser.add_argument("--workloads", nargs="+", default=list(WORKLOADS), choices=list(WORKLOADS))
+    run_parser.add_argument("--sizes", nargs="+", type=int, default=[1000, 10000],
+                            help="number of keys loaded before each workload, e.g. 1000 ... 10000000")
+    run_parser.add_argument("--key-sizes", nargs="+", type=int, default=[8, 32])
+    run_parser.add_argument("--ops", type=int, default=0, help="operations per workload, defaults to the size")
+    run_parser.add_argument("--hash", choices=list(HASH_FUNCTIONS), default="2")
+    run_parser.add_argument("--repeat", type=int, default=3, help="runs per measurement, the fastest is kept")
+    run_parser.add_argument("--seed", type=int, default=261)
+    run_parser.add_argument("--output", help="JSON file to write, defaults to stdout")
+
+    compare_parser = commands.add_parser("compare", help="flag slowdowns between two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.10,
+                                help="fractional throughput drop that counts as a slowdown")
+
+    args = parser.parse_args()
+
+    if args.command == "run":
+        document = run(args)
+        if args.output:
+            with open(args.output, "w") as file:
+                json.dump(document, file, indent=2)
+        else:
+            json.dump(document, sys.stdout, indent=2)
+        return 0
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    with open(args.current) as file:
+        current = json.load(file)
+    slowdowns = compare(baseline, current, args.threshold)
+    for (engine, workload, key_size, size), before, after, change in slowdowns:
+        print(f"SLOWER {engine} {workload} key={key_size} size={size}: "
+              f"{before:,.0f} -> {after:,.0f} ops/s ({change:+.1%})")
+    if not slowdowns:
+        print("no slowdowns")
+    return 1 if slowdowns else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
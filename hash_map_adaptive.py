@@ -0,0 +1,447 @@
+# Description: Facade hashmap that picks between the chaining and the open addressing HashMap at run time. It
+#              records the probe lengths and operation mix of its current engine over a sample of every window
+#              of operations, estimates the time per operation and memory per key of both engines from them,
+#              and migrates to the other engine with from_columns() once that one is clearly cheaper.
+#              It is never faster than a plain chaining map, and with the default EnginePolicy it does not beat
+#              one: on the mixed workload of benchmarks/bench_adaptive.py it only breaks even on time and memory
+#              combined. It pays off over chaining when memory_weight is raised to about 3, and over open
+#              addressing when churn leaves that engine full of tombstones.
+
+from math import exp, log
+
+import hash_map_oa
+import hash_map_sc
+from a6_include import DynamicArray, hash_function_1, hash_function_2
+from hash_map_policy import OA_DEFAULT_POLICY, SC_DEFAULT_POLICY
+from hash_map_serialize import bulk_capacity
+from hash_map_stats import HashMapStats
+
+
+# Engine name -> (HashMap class, its default load policy)
+ENGINES = {
+    'sc': (hash_map_sc.HashMap, SC_DEFAULT_POLICY),
+    'oa': (hash_map_oa.HashMap, OA_DEFAULT_POLICY),
+}
+
+# Engine name -> (microseconds per operation, microseconds per recorded probe or chain node), fitted to get()
+# timings at several loads, tombstone counts and hit ratios by `python benchmarks/bench_adaptive.py --calibrate`
+# on CPython 3.11 with hash_function_2 and a SeededHash, averaged and rounded. Walking a chain node costs far
+# less than probing a bucket, which computes an index and checks its epoch. Recalibrate on other interpreters.
+DEFAULT_COSTS = {
+    'sc': (1.4, 0.1),
+    'oa': (1.0, 0.7),
+}
+
+# Approximate bytes allocated per SLNode or HashEntry, per LinkedList, and per bucket for the bucket and epoch
+# array references, measured with tracemalloc on CPython 3.11
+ENTRY_BYTES = 100
+LIST_BYTES = 88
+SLOT_BYTES = 16
+
+# Highest effective load used to predict open addressing probes, which grow without bound towards 1
+_MAX_PREDICTED_LOAD = 0.95
+
+# Statistics operations that remove a key
+_REMOVES = ('remove', 'pop')
+
+
+class EnginePolicy:
+    """
+    Engine selection policy for an AdaptiveHashMap
+
+    window          operations between two engine decisions
+    sample          operations at the end of each window whose probe lengths are recorded
+    min_gain        the map migrates once the other engine's estimated cost is this fraction below the current one
+    memory_weight   weight of memory per key against time per operation; at 1, 1% less memory is worth 1% more time
+    cooldown        after a migration, the map runs at least cooldown times its size in operations before the
+                    next one, which pays for the rebuild
+    costs           engine name -> (microseconds per operation, microseconds per recorded probe or chain node)
+    """
+
+    def __init__(self,
+                 window: int = 1024,
+                 sample: int = 128,
+                 min_gain: float = 0.1,
+                 memory_weight: float = 1.0,
+                 cooldown: float = 2.0,
+                 costs: dict = None) -> None:
+        """
+        Initialize a policy, defaulting costs to DEFAULT_COSTS.
+        """
+        if sample < 1 or window <= sample:
+            raise ValueError("window must be greater than sample, and sample at least 1")
+        if not 0 <= min_gain < 1:
+            raise ValueError("min_gain must be in [0, 1)")
+        if memory_weight < 0 or cooldown < 0:
+            raise ValueError("memory_weight and cooldown must not be negative")
+
+        self.window = window
+        self.sample = sample
+        self.min_gain = min_gain
+        self.memory_weight = memory_weight
+        self.cooldown = cooldown
+        self.costs = dict(DEFAULT_COSTS if costs is None else costs)
+
+    def __repr__(self) -> str:
+        """Override repr method to provide more readable output."""
+        return (f"EnginePolicy(window={self.window}, sample={self.sample}, min_gain={self.min_gain}, "
+                f"memory_weight={self.memory_weight}, cooldown={self.cooldown}, costs={self.costs})")
+
+
+DEFAULT_ENGINE_POLICY = EnginePolicy()
+
+
+class ProbeSample(HashMapStats):
+    """
+    HashMapStats that only records operations and probe lengths
+    It skips the chain length histogram, which enable_stats() would have to fill by visiting every bucket.
+    """
+
+    def record_chain_change(self, old_length: int, new_length: int) -> None:
+        """Ignores chain length changes."""
+
+    def operations(self) -> int:
+        """Returns the number of operations recorded."""
+        return sum(self.hits.values()) + sum(self.misses.values())
+
+    def mean_probes(self) -> float:
+        """Returns the mean probe length of the recorded operations, or 0 if none were recorded."""
+        total = self.operations()
+        if not total:
+            return 0.0
+        return sum(probes * count for histogram in self.probe_lengths.values()
+                   for probes, count in histogram.items()) / total
+
+
+def expected_probes(engine: str, size: int, capacity: int, tombstones: int, hit_ratio: float) -> float:
+    """
+    Returns the mean probe length a map of the given engine would record per operation under a uniform hash,
+    when hit_ratio of the operations find their key. Chaining maps record the length of the chain they search,
+    open addressing maps the number of buckets they probe, tombstones included.
+    """
+    if engine == 'sc':
+        load = size / capacity
+        hit, miss = 1 + load, load
+    else:
+        load = min((size + tombstones) / capacity, _MAX_PREDICTED_LOAD)
+        miss = 1 / (1 - load)
+        hit = log(miss) / load if load > 0 else 1.0
+    return hit_ratio * hit + (1 - hit_ratio) * miss
+
+
+def bytes_per_key(engine: str, size: int, capacity: int, tombstones: int, nonempty: int = None) -> float:
+    """
+    Returns the approximate bytes a map of the given engine allocates per key, not counting the keys and values
+    themselves. nonempty is the number of chains of a chaining map; it defaults to its expected value under a
+    uniform hash.
+    """
+    if engine == 'sc':
+        if nonempty is None:
+            nonempty = capacity * (1 - exp(-size / capacity))
+        total = size * ENTRY_BYTES + nonempty * LIST_BYTES + capacity * SLOT_BYTES
+    else:
+        total = (size + tombstones) * ENTRY_BYTES + capacity * SLOT_BYTES
+    return total / max(size, 1)
+
+
+class AdaptiveHashMap:
+    def __init__(self,
+                 capacity: int = 11,
+                 function: callable = hash_function_1,
+                 engine: str = 'oa',
+                 policy: EnginePolicy = DEFAULT_ENGINE_POLICY,
+                 power_of_two: bool = False,
+                 value_type: str = None) -> None:
+        """
+        Initialize new hashmap that starts as the given engine, 'sc' for chaining or 'oa' for open addressing,
+        and lets policy decide when to migrate to the other one. Each engine uses its default load policy.
+        power_of_two and value_type are passed on to every engine the map migrates to.
+        """
+        if engine not in ENGINES:
+            raise ValueError(f"engine must be one of {', '.join(ENGINES)}")
+        map_class, load_policy = ENGINES[engine]
+        self._map = map_class(capacity, function, power_of_two, load_policy, value_type=value_type)
+        self._engine = engine
+        self._policy = policy
+        self._min_capacity = capacity
+        self._countdown = policy.window - policy.sample
+        self._sample = None
+        self._operations = 0
+        self._migrate_after = 0
+        self._migrations = 0
+        self._last_decision = None
+        # engine name -> ratio of its last measured mean probe length to the uniform-hash prediction
+        self._spreads = {name: 1.0 for name in ENGINES}
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output
+        """
+        return str(self._map)
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return self._map.get_size()
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map
+        """
+        return self._map.get_capacity()
+
+    def get_engine(self) -> str:
+        """
+        Returns the name of the current engine, 'sc' or 'oa'.
+        """
+        return self._engine
+
+    # ------------------------------------------------------------------ #
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Adds a key-value pair to the hash map. If the key already exists, it replaces the value.
+        """
+        self._countdown -= 1
+        if not self._countdown:
+            self._next_phase()
+        self._map.put(key, value)
+
+    def get(self, key: str) -> object:
+        """
+        Returns the value of key, or None if the key is not in the hashmap.
+        """
+        self._countdown -= 1
+        if not self._countdown:
+            self._next_phase()
+        return self._map.get(key)
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if the key is found in the hashmap. Returns False if not.
+        """
+        self._countdown -= 1
+        if not self._countdown:
+            self._next_phase()
+        return self._map.contains_key(key)
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the key and its value from the hashmap.
+        """
+        self._countdown -= 1
+        if not self._countdown:
+            self._next_phase()
+        self._map.remove(key)
+
+    def increment(self, key: str, delta: object = 1) -> object:
+        """
+        Adds delta to the value of key, starting from 0 if the key is absent, and returns the new value.
+        """
+        self._countdown -= 1
+        if not self._countdown:
+            self._next_phase()
+        return self._map.increment(key, delta)
+
+    def setdefault(self, key: str, default: object = None) -> object:
+        """
+        Returns the value of key, first inserting default if the key is absent.
+        """
+        self._countdown -= 1
+        if not self._countdown:
+            self._next_phase()
+        return self._map.setdefault(key, default)
+
+    def update_with(self, key: str, function: callable, default: object = None) -> object:
+        """
+        Replaces the value of key with function(value), using default for an absent key, and returns it.
+        """
+        self._countdown -= 1
+        if not self._countdown:
+            self._next_phase()
+        return self._map.update_with(key, function, default)
+
+    def pop(self, key: str, default: object = None) -> object:
+        """
+        Removes key and returns its value, or returns default if the key is absent.
+        """
+        self._countdown -= 1
+        if not self._countdown:
+            self._next_phase()
+        return self._map.pop(key, default)
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Changes the capacity of the current engine's table. Migrations keep it as the minimum capacity.
+        """
+        if new_capacity < self._map.get_size():
+            return
+        self._map.resize_table(new_capacity)
+        self._min_capacity = new_capacity
+
+    def table_load(self) -> float:
+        """
+        Calculates and returns the load factor of the hashmap.
+        """
+        return self._map.table_load()
+
+    def empty_buckets(self) -> int:
+        """
+        Returns number of empty buckets in the hash table.
+        """
+        return self._map.empty_buckets()
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns an array of key-value pair tuples for each element in hashmap.
+        """
+        return self._map.get_keys_and_values()
+
+    def clear(self) -> None:
+        """
+        Clears the contents of the hashmap, keeping its engine and capacity.
+        """
+        self._map.clear()
+
+    def snapshot(self):
+        """
+        Returns a read-only view of the hashmap as it is now, in O(1). A migration leaves the old engine's table
+        to its views untouched, so they stay valid.
+        """
+        return self._map.snapshot()
+
+    def get_value_column(self) -> "ValueColumn":
+        """
+        Returns the ValueColumn holding the values of a map created with value_type, or None.
+        """
+        return self._map.get_value_column()
+
+    def get_engine_stats(self) -> dict:
+        """
+        Returns the current engine, the number of migrations and the inputs and cost estimates of the last
+        engine decision, or None for them before the first decision.
+        """
+        return {'engine': self._engine, 'migrations': self._migrations, 'last_decision': self._last_decision}
+
+    def _next_phase(self) -> None:
+        """
+        Starts recording a sample at the end of a window, or ends the sample and decides on the engine.
+        """
+        if self._sample is None:
+            self._sample = self._map._stats = ProbeSample()
+            self._countdown = self._policy.sample
+            return
+        sample, self._sample = self._sample, None
+        self._map._stats = None
+        self._countdown = self._policy.window - self._policy.sample
+        self._operations += self._policy.window
+        self._decide(sample)
+
+    def _estimate(self, engine: str, size: int, capacity: int, tombstones: int, hit_ratio: float,
+                  spread: float, nonempty: int = None) -> tuple:
+        """
+        Returns (microseconds per operation, bytes per key) of a map of the given engine and table, with
+        expected probe lengths multiplied by spread.
+        """
+        per_operation, per_probe = self._policy.costs[engine]
+        probes = spread * expected_probes(engine, size, capacity, tombstones, hit_ratio)
+        return (per_operation + per_probe * probes,
+                bytes_per_key(engine, size, capacity, tombstones, nonempty))
+
+    def _decide(self, sample: ProbeSample) -> None:
+        """
+        Estimates the cost of staying on the current engine and of migrating to the other one from a sample,
+        and migrates if the policy allows it.
+
+        The sample gives the miss ratio, the share of removes and the mean probe length of the current engine.
+        The ratio of that probe length to its uniform-hash prediction measures how well the keys spread in
+        this engine. Clustered hashes hurt probing far more than chaining, so the other engine's prediction is
+        scaled by the ratio last measured in that engine, which starts at 1. Open addressing keeps removed keys
+        as tombstones until its next resize, so its estimates include the tombstones the sampled removes would
+        leave over the next cooldown period.
+        """
+        operations = sample.operations()
+        size = self._map.get_size()
+        if not operations or not size:
+            return
+        policy = self._policy
+        hit_ratio = sum(sample.hits.values()) / operations
+        remove_ratio = sum(sample.hits.get(name, 0) + sample.misses.get(name, 0) for name in _REMOVES) / operations
+        horizon = max(policy.window, policy.cooldown * size)
+        future_tombstones = int(remove_ratio * horizon / 2)
+
+        current = self._engine
+        other = 'sc' if current == 'oa' else 'oa'
+        capacity = self._map.get_capacity()
+        tombstones = self._map._tombstones if current == 'oa' else 0
+        nonempty = self._map._nonempty if current == 'sc' else None
+        measured = sample.mean_probes()
+        predicted = expected_probes(current, size, capacity, tombstones, hit_ratio)
+        spread = self._spreads[current] = max(1.0, measured / predicted) if predicted else 1.0
+
+        stay = self._estimate(current, size, capacity,
+                              tombstones + future_tombstones if current == 'oa' else 0, hit_ratio, spread, nonempty)
+        other_capacity = max(self._min_capacity, bulk_capacity(size, ENGINES[other][1]))
+        move = self._estimate(other, size, other_capacity, future_tombstones if other == 'oa' else 0,
+                              hit_ratio, self._spreads[other])
+        # costs relative to the current engine, which costs 1 + memory_weight
+        stay_cost = 1 + policy.memory_weight
+        move_cost = move[0] / stay[0] + policy.memory_weight * move[1] / stay[1]
+
+        self._last_decision = {
+            'operations': operations, 'miss_ratio': 1 - hit_ratio, 'remove_ratio': remove_ratio,
+            'mean_probes': measured, 'spreads': dict(self._spreads),
+            'estimates': {current: {'microseconds': stay[0], 'bytes_per_key': stay[1], 'cost': stay_cost},
+                          other: {'microseconds': move[0], 'bytes_per_key': move[1], 'cost': move_cost}},
+        }
+        if move_cost <= (1 - policy.min_gain) * stay_cost and self._operations >= self._migrate_after:
+            self._migrate(other)
+
+    def _migrate(self, engine: str) -> None:
+        """
+        Rebuilds the hashmap as the given engine with from_columns(), hashing every key once into a table sized
+        for all of them. A reseeded hash function carries over.
+        """
+        columns = self._map.export_columns()
+        map_class, load_policy = ENGINES[engine]
+        self._map = map_class.from_columns({
+            'keys': columns['keys'], 'values': columns['values'], 'function': columns['function'],
+            'power_of_two': columns['power_of_two'], 'value_type': columns['value_type'],
+            'next_reseed_size': columns['next_reseed_size'], 'policy': load_policy,
+            'capacity': self._min_capacity, 'min_capacity': self._min_capacity,
+        })
+        self._engine = engine
+        self._migrate_after = self._operations + int(self._policy.cooldown * self._map.get_size())
+        self._migrations += 1
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+    from hash_map_defense import SeededHash
+
+    print("\nAdaptiveHashMap example 1")
+    print("-------------------------")
+    m = AdaptiveHashMap(11, hash_function_2)
+    for i in range(1, 6):
+        m.put(str(i), str(i * 10))
+    m.put('3', 'thirty')
+    m.remove('5')
+    print(m.get_engine(), m.get_size(), m.get('3'), m.get('5'), m.contains_key('1'))
+    print(m.get_keys_and_values())
+
+    print("\nAdaptiveHashMap example 2 - churn")
+    print("---------------------------------")
+    # removes leave tombstones in open addressing, so steady churn moves the map to chaining
+    m = AdaptiveHashMap(11, SeededHash(261))
+    for i in range(2000):
+        m.put('key' + str(i), i)
+    print(m.get_engine(), m.get_size())
+    for i in range(2000, 12000):
+        m.remove('key' + str(i - 2000))
+        m.put('key' + str(i), i)
+        m.get('missing' + str(i))
+    stats = m.get_engine_stats()
+    print(m.get_engine(), m.get_size(), stats['migrations'], round(stats['last_decision']['remove_ratio'], 2))
+    print(all(m.get('key' + str(i)) == i for i in range(10000, 12000)), m.get('key0'))
@@ -0,0 +1,439 @@
+# Description: Open addressing hashmap that keeps its keys in a KeyArena instead of one str object per key.
+#              All keys live back to back in a single bytearray addressed by offset/length arrays, and the
+#              table itself is three flat arrays (arena slot, cached hash, value), so there is no HashEntry
+#              or key object per element. Keys are compared against memoryview slices of the arena, and the
+#              arena is compacted once removals leave more dead bytes in it than live ones.
+
+from array import array
+
+from a6_include import DynamicArray, hash_function_1, hash_function_2
+from hash_map_defense import OA_COLLISION_LIMIT, SeededHash
+from hash_map_keys import hash_buffer
+from hash_map_policy import OA_DEFAULT_POLICY, LoadPolicy, check_open_addressing
+from hash_map_primes import is_prime, next_prime
+
+
+_MASK64 = 0xFFFFFFFFFFFFFFFF
+
+# markers stored in a table's slot array in place of an arena slot
+EMPTY = -1
+TOMBSTONE = -2
+
+STR_KEY = 0
+BYTES_KEY = 1
+
+# arenas smaller than this are never compacted
+_MIN_COMPACT_BYTES = 4096
+
+
+class KeyArena:
+    """
+    Contiguous storage for str and bytes keys
+    Each key gets a slot number that stays valid until the key is released, even across compactions.
+    The buffer grows by doubling, and one memoryview of it is kept for comparisons until it is reallocated.
+    """
+
+    def __init__(self, initial_bytes: int = 256) -> None:
+        """Initialize an empty arena."""
+        self._data = bytearray(initial_bytes)
+        self._view = memoryview(self._data)
+        self._used = 0
+        self._offsets = array('q')
+        self._lengths = array('q')
+        self._kinds = bytearray()
+        self._free_slots = []
+        self._dead_bytes = 0
+
+    def __len__(self) -> int:
+        """Return the number of keys stored in the arena."""
+        return len(self._offsets) - len(self._free_slots)
+
+    def nbytes(self) -> int:
+        """Return the number of key bytes held, including dead bytes left by released keys."""
+        return self._used
+
+    def dead_bytes(self) -> int:
+        """Return the number of bytes held by released keys."""
+        return self._dead_bytes
+
+    def add(self, encoded: bytes, kind: int) -> int:
+        """
+        Appends an encoded key of the given kind (STR_KEY or BYTES_KEY) and returns its slot.
+        """
+        offset, length = self._used, len(encoded)
+        if offset + length > len(self._data):
+            self._reallocate(max(2 * len(self._data), offset + length))
+        self._view[offset:offset + length] = encoded
+        self._used += length
+
+        if self._free_slots:
+            slot = self._free_slots.pop()
+            self._offsets[slot] = offset
+            self._lengths[slot] = length
+            self._kinds[slot] = kind
+        else:
+            slot = len(self._offsets)
+            self._offsets.append(offset)
+            self._lengths.append(length)
+            self._kinds.append(kind)
+        return slot
+
+    def release(self, slot: int) -> None:
+        """
+        Frees a slot; its bytes stay in place until the next compaction.
+        """
+        self._dead_bytes += self._lengths[slot]
+        self._lengths[slot] = -1
+        self._free_slots.append(slot)
+
+    def matches(self, slot: int, encoded: bytes, kind: int) -> bool:
+        """
+        Returns True if the key in slot equals the encoded key of the given kind.
+        """
+        length = self._lengths[slot]
+        if length != len(encoded) or self._kinds[slot] != kind:
+            return False
+        offset = self._offsets[slot]
+        return self._view[offset:offset + length] == encoded
+
+    def get_key(self, slot: int) -> object:
+        """
+        Returns the key in slot as a new str or bytes object.
+        """
+        offset = self._offsets[slot]
+        encoded = bytes(self._view[offset:offset + self._lengths[slot]])
+        if self._kinds[slot] == STR_KEY:
+            return encoded.decode('utf-8', 'surrogatepass')
+        return encoded
+
+    def should_compact(self) -> bool:
+        """
+        Returns True once released keys account for more than half of the arena.
+        """
+        return self._dead_bytes > _MIN_COMPACT_BYTES and 2 * self._dead_bytes > self._used
+
+    def compact(self) -> None:
+        """
+        Moves every live key to the front of a new buffer, dropping the bytes of released keys.
+        Slots are not renumbered.
+        """
+        old_view = self._view
+        self._data = bytearray(max(256, 2 * (self._used - self._dead_bytes)))
+        self._view = memoryview(self._data)
+        used = 0
+        for slot in range(len(self._offsets)):
+            length = self._lengths[slot]
+            if length < 0:
+                continue
+            offset = self._offsets[slot]
+            self._view[used:used + length] = old_view[offset:offset + length]
+            self._offsets[slot] = used
+            used += length
+        old_view.release()
+        self._used = used
+        self._dead_bytes = 0
+
+    def _reallocate(self, size: int) -> None:
+        """
+        Copies the used bytes into a new buffer of the given size.
+        """
+        data = bytearray(size)
+        data[:self._used] = self._view[:self._used]
+        self._view.release()
+        self._data = data
+        self._view = memoryview(data)
+
+
+def encode_key(key) -> tuple:
+    """
+    Returns (encoded bytes, kind) for a str or bytes-like key.
+    """
+    if isinstance(key, str):
+        return key.encode('utf-8', 'surrogatepass'), STR_KEY
+    if isinstance(key, (bytes, bytearray, memoryview)):
+        return bytes(key), BYTES_KEY
+    raise TypeError(f"ArenaHashMap keys must be str or bytes, not {type(key).__name__}")
+
+
+class ArenaHashMap:
+    def __init__(self,
+                 capacity: int = 11,
+                 function: callable = hash_function_1,
+                 policy: LoadPolicy = OA_DEFAULT_POLICY,
+                 collision_limit: int = OA_COLLISION_LIMIT) -> None:
+        """
+        Initialize new HashMap that uses
+        quadratic probing for collision resolution and stores its keys in a KeyArena.
+        Keys must be str or bytes; str keys are hashed with function and bytes keys with hash_buffer.
+        A put() that probes more than collision_limit buckets switches to a seeded hash function.
+        policy's max_load must be at most 0.5, so that every probe sequence still ends at a free bucket.
+        """
+        check_open_addressing(policy)
+        # capacity must be a prime number
+        self._capacity = next_prime(capacity)
+        self._allocate_buckets(self._capacity)
+        self._arena = KeyArena()
+
+        self._hash_function = function
+        self._size = 0
+        self._policy = policy
+        self._min_capacity = self._capacity
+        self._tombstones = 0
+        self._collision_limit = collision_limit
+        self._next_reseed_size = 0
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output
+        """
+        out = ''
+        for i in range(self._capacity):
+            slot = self._slots[i]
+            if slot >= 0:
+                out += f"{i}: K: {self._arena.get_key(slot)} V: {self._values[i]}\n"
+            else:
+                out += f"{i}: {'TOMBSTONE' if slot == TOMBSTONE else None}\n"
+        return out
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return self._size
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map
+        """
+        return self._capacity
+
+    def get_arena(self) -> KeyArena:
+        """
+        Returns the arena holding this map's keys.
+        """
+        return self._arena
+
+    # ------------------------------------------------------------------ #
+
+    def put(self, key, value: object) -> None:
+        """
+        Adds a key-value pair to the hash map. If the key already exists, it replaces the value.
+        """
+        # Check the load factor and resize if necessary
+        new_capacity = self._policy.grow_capacity(self._size, self._capacity)
+        if new_capacity is not None:
+            self._resize(new_capacity)
+        elif 4 * self._tombstones >= self._capacity:
+            # purges tombstones before they leave too few empty buckets to end probe sequences
+            self._resize(self._capacity)
+
+        encoded, kind = encode_key(key)
+        key_hash = self._hash(key, encoded, kind)
+        index, free_index, probes = self._probe(key_hash, encoded, kind)
+        if index >= 0:
+            self._values[index] = value
+            return
+
+        if self._slots[free_index] == TOMBSTONE:
+            self._tombstones -= 1
+        self._slots[free_index] = self._arena.add(encoded, kind)
+        self._hashes[free_index] = key_hash
+        self._values[free_index] = value
+        self._size += 1
+        if self._collision_limit is not None and probes > self._collision_limit:
+            self._reseed()
+
+    def get(self, key) -> object:
+        """
+        Returns the value of key, or None if the key is not in the hashmap.
+        """
+        index = self._find(key)
+        if index < 0:
+            return None
+        return self._values[index]
+
+    def contains_key(self, key) -> bool:
+        """
+        Returns True if the key is found in the hashmap. Returns False if not.
+        """
+        return self._find(key) >= 0
+
+    def remove(self, key) -> None:
+        """
+        Removes the key and its value from the hashmap, releasing the key's bytes in the arena.
+        """
+        index = self._find(key)
+        if index < 0:
+            return
+        self._arena.release(self._slots[index])
+        self._slots[index] = TOMBSTONE
+        self._values[index] = None
+        self._size -= 1
+        self._tombstones += 1
+        if self._arena.should_compact():
+            self._arena.compact()
+
+        # Check the load factor and shrink if necessary
+        new_capacity = self._policy.shrink_capacity(self._size, self._capacity, self._min_capacity)
+        if new_capacity is not None:
+            self._resize(new_capacity)
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Changes the capacity of the array. The resulting capacity is reserved:
+        automatic shrinking in remove() never goes below it.
+        """
+        # checks if new capacity is valid
+        if new_capacity < self._size:
+            return
+        self._resize(new_capacity)
+        self._min_capacity = self._capacity
+
+    def table_load(self) -> float:
+        """
+        Calculates and returns the load factor of the hashmap.
+        """
+        return self._size / self._capacity
+
+    def empty_buckets(self) -> int:
+        """
+        Returns number of empty buckets in the hash table.
+        """
+        return self._capacity - self._size
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns an array of key-value pair tuples for each element in hashmap.
+        """
+        new_array = DynamicArray()
+        for i in range(self._capacity):
+            slot = self._slots[i]
+            if slot >= 0:
+                new_array.append((self._arena.get_key(slot), self._values[i]))
+        return new_array
+
+    def clear(self) -> None:
+        """
+        Clears the hashmap and its arena, keeping the capacity the same.
+        """
+        self._allocate_buckets(self._capacity)
+        self._arena = KeyArena()
+        self._size = 0
+        self._tombstones = 0
+
+    def _hash(self, key, encoded: bytes, kind: int) -> int:
+        """
+        Returns the non-negative hash of a key; str keys use the map's hash function.
+        A SeededHash hashes both str keys and the encoded bytes of bytes keys.
+        """
+        if type(self._hash_function) is SeededHash:
+            return self._hash_function(key if kind == STR_KEY else encoded)
+        if kind == STR_KEY:
+            return self._hash_function(key) & _MASK64
+        return hash_buffer(encoded)
+
+    def _probe(self, key_hash: int, encoded: bytes, kind: int) -> tuple:
+        """
+        Probes for an encoded key and returns (index of the key or -1, index where it could be inserted,
+        number of buckets probed).
+        The insertion index is the first tombstone on the probe sequence, or else the empty bucket ending it.
+        Stored hashes are compared first, so the arena is only read for likely matches.
+        """
+        slots, hashes, arena, capacity = self._slots, self._hashes, self._arena, self._capacity
+        index_initial = key_hash % capacity
+        free_index = -1
+        for j in range(capacity):
+            index = (index_initial + j * j) % capacity
+            slot = slots[index]
+            if slot == EMPTY:
+                return -1, index if free_index < 0 else free_index, j + 1
+            if slot == TOMBSTONE:
+                if free_index < 0:
+                    free_index = index
+            elif hashes[index] == key_hash and arena.matches(slot, encoded, kind):
+                return index, free_index, j + 1
+        return -1, free_index, capacity
+
+    def _find(self, key) -> int:
+        """
+        Returns the index holding key, or -1 if the key is not in the hashmap.
+        """
+        encoded, kind = encode_key(key)
+        return self._probe(self._hash(key, encoded, kind), encoded, kind)[0]
+
+    def _reseed(self) -> None:
+        """
+        Switches to a SeededHash with a fresh seed, recomputes every cached hash from the arena and rehashes.
+        Re-seeding again requires the size to double first.
+        """
+        if self._size < self._next_reseed_size:
+            return
+        self._next_reseed_size = 2 * self._size
+        self._hash_function = SeededHash()
+        for i in range(self._capacity):
+            slot = self._slots[i]
+            if slot >= 0:
+                self._hashes[i] = self._hash_function(self._arena.get_key(slot))
+        self._resize(self._capacity)
+
+    def _resize(self, new_capacity: int) -> None:
+        """
+        Moves every live element into new arrays of at least new_capacity buckets using the cached hashes,
+        so keys are neither rehashed nor compared. Tombstones are dropped.
+        """
+        if not is_prime(new_capacity):
+            new_capacity = next_prime(new_capacity)
+
+        old_slots, old_hashes, old_values = self._slots, self._hashes, self._values
+        self._allocate_buckets(new_capacity)
+        self._capacity = new_capacity
+        self._tombstones = 0
+
+        slots, hashes, values = self._slots, self._hashes, self._values
+        for i in range(len(old_slots)):
+            slot = old_slots[i]
+            if slot < 0:
+                continue
+            key_hash = old_hashes[i]
+            index_initial = key_hash % new_capacity
+            for j in range(new_capacity):
+                index = (index_initial + j * j) % new_capacity
+                if slots[index] == EMPTY:
+                    slots[index] = slot
+                    hashes[index] = key_hash
+                    values[index] = old_values[i]
+                    break
+
+    def _allocate_buckets(self, capacity: int) -> None:
+        """
+        Creates empty slot, hash and value arrays of the given capacity.
+        """
+        self._slots = array('q', [EMPTY]) * capacity
+        self._hashes = array('Q', [0]) * capacity
+        self._values = [None] * capacity
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nArenaHashMap example 1")
+    print("----------------------")
+    m = ArenaHashMap(11, hash_function_2)
+    for i in range(1, 6):
+        m.put(str(i), str(i * 10))
+    m.put(b'raw', 'bytes key')
+    m.put('3', 'thirty')
+    print(m.get_size(), m.get_capacity(), m.get('3'), m.get(b'raw'), m.get(b'3'), m.contains_key('6'))
+    print(m.get_keys_and_values())
+
+    print("\nArenaHashMap example 2 - compaction")
+    print("-----------------------------------")
+    m = ArenaHashMap(11, hash_function_2)
+    for i in range(5000):
+        m.put('key' + str(i), i)
+    print(m.get_size(), m.get_capacity(), m.get_arena().nbytes())
+    for i in range(4500):
+        m.remove('key' + str(i))
+    print(m.get_size(), m.get_capacity(), m.get_arena().nbytes(), m.get_arena().dead_bytes())
+    print(all(m.get('key' + str(i)) == i for i in range(4500, 5000)), m.get('key1'))
@@ -0,0 +1,164 @@
+# Description: Pattern-blocked Bloom filter that either HashMap can keep in front of its lookups. It is built from
+#              the key hashes the map computes anyway, so a definite miss costs two word reads and never touches
+#              a bucket. Bloom filters can't forget keys, so the maps rebuild theirs on every resize and once
+#              enough keys have been removed.
+
+from array import array
+
+
+_MASK64 = 0xFFFFFFFFFFFFFFFF
+
+# 2^64 divided by the golden ratio, the multiplier of Fibonacci hashing
+_GOLDEN = 0x9E3779B97F4A7C15
+
+# Each key's bits come from one of 4096 precomputed patterns, so adding or testing a key needs no loop.
+# The pattern is chosen by the low bits of the mixed hash and the block by the bits above them: taking both
+# from the low bits would let each block of an even block count see only a fraction of the patterns.
+_PATTERN_BITS = 12
+_PATTERN_MASK = (1 << _PATTERN_BITS) - 1
+
+
+def make_patterns(hashes: int) -> array:
+    """
+    Returns the 4096 64-bit masks with hashes bits set each that a filter with hashes bits per key uses.
+    They are drawn from a fixed seed, so every filter with the same hashes uses the same patterns.
+    """
+    import random
+
+    rng = random.Random(hashes)
+    patterns = array('Q')
+    for _ in range(1 << _PATTERN_BITS):
+        mask = 0
+        for bit in rng.sample(range(64), hashes):
+            mask |= 1 << bit
+        patterns.append(mask)
+    return patterns
+
+
+_patterns_cache = {}
+
+
+class BloomFilter:
+    """
+    Pattern-blocked Bloom filter over key hashes
+    Each key sets a precomputed pattern of hashes bits inside one 64-bit block, so a query reads two words
+    and runs no loop. Lookup counters give the false-positive rate: the share of keys that were not in the
+    map but still passed the filter.
+    """
+
+    def __init__(self, expected_keys: int, bits_per_key: int = 10, hashes: int = None) -> None:
+        """
+        Initialize an empty filter sized for expected_keys keys at bits_per_key bits each.
+        hashes defaults to the count that minimizes false positives for bits_per_key, at most 8.
+        """
+        self.bits_per_key = bits_per_key
+        self.hashes = hashes if hashes is not None else max(1, min(8, round(bits_per_key * 0.693)))
+        if self.hashes not in _patterns_cache:
+            _patterns_cache[self.hashes] = make_patterns(self.hashes)
+        self._patterns = _patterns_cache[self.hashes]
+        self._blocks = None
+        self.reset(expected_keys)
+        self.negatives = 0
+        self.false_positives = 0
+
+    def __len__(self) -> int:
+        """Return the number of keys added since the last reset."""
+        return self.keys
+
+    def add(self, key_hash: int) -> None:
+        """Adds a key by its hash."""
+        mixed = ((key_hash * _GOLDEN) & _MASK64) >> 16
+        self._blocks[(mixed >> _PATTERN_BITS) % len(self._blocks)] |= self._patterns[mixed & _PATTERN_MASK]
+        self.keys += 1
+
+    def might_contain(self, key_hash: int) -> bool:
+        """
+        Returns False if the key with this hash was definitely never added, True if it may have been.
+        """
+        mixed = ((key_hash * _GOLDEN) & _MASK64) >> 16
+        mask = self._patterns[mixed & _PATTERN_MASK]
+        if self._blocks[(mixed >> _PATTERN_BITS) % len(self._blocks)] & mask == mask:
+            return True
+        self.negatives += 1
+        return False
+
+    def record_false_positive(self) -> None:
+        """Records that a key passed the filter but was not in the map."""
+        self.false_positives += 1
+
+    def false_positive_rate(self) -> float:
+        """
+        Returns the share of lookups of missing keys that passed the filter, or 0.0 before any such lookup.
+        """
+        misses = self.negatives + self.false_positives
+        return self.false_positives / misses if misses else 0.0
+
+    def needs_rebuild(self) -> bool:
+        """
+        Returns True once removed keys make up a quarter of the keys added, since their bits still answer maybe.
+        """
+        return 4 * self.removed > self.keys
+
+    def reset(self, expected_keys: int = None) -> None:
+        """
+        Removes every key and resizes the filter for expected_keys keys, or keeps its size if that is None.
+        The lookup counters are kept, so the false-positive rate covers the lifetime of the map.
+        """
+        if expected_keys is not None:
+            self._blocks = array('Q', bytes(8 * max(1, -(-expected_keys * self.bits_per_key // 64))))
+        else:
+            self._blocks = array('Q', bytes(8 * len(self._blocks)))
+        self.keys = 0
+        self.removed = 0
+
+    def size_in_bytes(self) -> int:
+        """Return the memory used by the bit blocks."""
+        return 8 * len(self._blocks)
+
+    def as_dict(self) -> dict:
+        """
+        Returns the filter's size and counters as a dictionary of plain Python values.
+        """
+        return {
+            "keys": self.keys,
+            "removed": self.removed,
+            "bytes": self.size_in_bytes(),
+            "hashes": self.hashes,
+            "negatives": self.negatives,
+            "false_positives": self.false_positives,
+            "false_positive_rate": self.false_positive_rate(),
+        }
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+    import random
+
+    from a6_include import hash_function_1
+
+    print("\nBloomFilter example 1 - false positives for even and odd block counts")
+    print("----------------------------------------------------------------------")
+    rng = random.Random(0)
+    for blocks in (511, 512, 4095, 4096, 8192, 12288):
+        # 6.4 keys per 64-bit block is 10 bits per key
+        bloom = BloomFilter(blocks * 64 // 10)
+        for _ in range(blocks * 64 // 10):
+            bloom.add(rng.getrandbits(64))
+        for _ in range(20000):
+            if bloom.might_contain(rng.getrandbits(64)):
+                bloom.record_false_positive()
+        print(blocks, len(bloom._blocks), round(bloom.false_positive_rate(), 3), bloom.false_positive_rate() < 0.03)
+
+    print("\nBloomFilter example 2 - filters of maps with even and odd block counts")
+    print("----------------------------------------------------------------------")
+    from hash_map_sc import HashMap
+
+    for capacity in (26203, 26209):
+        m = HashMap(capacity, hash_function_1)
+        bloom = m.enable_filter()
+        for i in range(capacity // 2):
+            m.put('key' + str(i), i)
+        for i in range(20000):
+            m.get('missing' + str(i))
+        print(capacity, bloom.size_in_bytes() // 8, round(bloom.false_positive_rate(), 3))
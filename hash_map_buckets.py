@@ -0,0 +1,28 @@
+# Description: Placeholder for the bucket and epoch arrays of a map that has not been written to. Every index
+#              reads as empty, and the map allocates its real arrays on its first write, so creating a map costs
+#              the same whatever its capacity, and maps that are created but never filled stay small.
+
+from a6_include import DynamicArrayException
+
+
+class UnallocatedArray:
+    """
+    Read-only stand-in for the DynamicArray of buckets and the DynamicArray of epochs of a new map
+    Every index reads as None, which is neither a bucket nor an epoch, so one instance serves as both.
+    """
+
+    __slots__ = ('_length',)
+
+    def __init__(self, length: int) -> None:
+        """Initialize a placeholder for arrays of the given length."""
+        self._length = length
+
+    def __getitem__(self, index: int) -> None:
+        """Returns None for every valid index."""
+        if index < 0 or index >= self._length:
+            raise DynamicArrayException
+        return None
+
+    def length(self) -> int:
+        """Return the length of the arrays this stands in for."""
+        return self._length
@@ -0,0 +1,179 @@
+# Description: Typed value storage for numeric-valued HashMaps. A map created with value_type keeps its values
+#              unboxed in one ValueColumn array, and each SLNode or HashEntry holds the value's slot in that
+#              column. Aggregates such as sum, max and histogram read the column directly, without visiting
+#              any bucket or entry.
+
+from array import array
+from itertools import compress
+
+
+# NumPy-style type names accepted for value_type, mapped to array typecodes
+VALUE_TYPES = {
+    'i1': 'b', 'i2': 'h', 'i4': 'i', 'i8': 'q',
+    'u1': 'B', 'u2': 'H', 'u4': 'I', 'u8': 'Q',
+    'f4': 'f', 'f8': 'd',
+}
+
+
+class ValueColumn:
+    """
+    Array of numeric values addressed by slot
+    Released slots are zeroed, excluded from aggregates and reused by later appends, so slots of
+    live values never move.
+    """
+
+    def __init__(self, value_type: str) -> None:
+        """
+        Initialize an empty column; value_type is a NumPy-style name like 'i8' or 'f8', or an array typecode.
+        """
+        typecode = VALUE_TYPES.get(value_type, value_type)
+        if typecode not in VALUE_TYPES.values():
+            raise ValueError(f"unsupported value_type {value_type!r}, expected one of {sorted(VALUE_TYPES)}")
+        self.value_type = value_type
+        self.typecode = typecode
+        self._data = array(typecode)
+        self._live = bytearray()
+        self._free_slots = []
+
+    def __len__(self) -> int:
+        """Return the number of live values."""
+        return len(self._data) - len(self._free_slots)
+
+    def append(self, value) -> int:
+        """
+        Stores a value and returns its slot.
+        """
+        if self._free_slots:
+            slot = self._free_slots.pop()
+            self._data[slot] = value
+            self._live[slot] = 1
+            return slot
+        self._data.append(value)
+        self._live.append(1)
+        return len(self._data) - 1
+
+    def get(self, slot: int):
+        """Return the value in slot."""
+        return self._data[slot]
+
+    def set(self, slot: int, value) -> None:
+        """Replace the value in slot."""
+        self._data[slot] = value
+
+    def add(self, slot: int, delta):
+        """
+        Adds delta to the value in slot in place and returns the new value.
+        """
+        value = self._data[slot] + delta
+        self._data[slot] = value
+        return self._data[slot]
+
+    def release(self, slot: int) -> None:
+        """
+        Frees a slot for reuse.
+        """
+        self._data[slot] = 0
+        self._live[slot] = 0
+        self._free_slots.append(slot)
+
+    def clear(self) -> None:
+        """Removes every value."""
+        self._data = array(self.typecode)
+        self._live = bytearray()
+        self._free_slots = []
+
+    def copy(self) -> "ValueColumn":
+        """Returns a copy of the column with every value in the same slot."""
+        column = ValueColumn(self.value_type)
+        column._data = array(self.typecode, self._data)
+        column._live = bytearray(self._live)
+        column._free_slots = list(self._free_slots)
+        return column
+
+    @classmethod
+    def from_values(cls, value_type: str, values) -> "ValueColumn":
+        """
+        Returns a column holding values in slots 0, 1, 2, ... values may be a list, an array or a
+        memoryview of items of the column's type, which is copied in one block.
+        """
+        column = cls(value_type)
+        if isinstance(values, list):
+            column._data = array(column.typecode, values)
+        else:
+            column._data.frombytes(memoryview(values).cast('B'))
+        column._live = bytearray(b'\x01') * len(column._data)
+        return column
+
+    def live_values(self):
+        """
+        Returns an iterable over the live values; the array itself when no slot is free.
+        """
+        if not self._free_slots:
+            return self._data
+        return compress(self._data, self._live)
+
+    def sum(self):
+        """Return the sum of the live values."""
+        return sum(self.live_values())
+
+    def max(self, default=None):
+        """Return the largest live value, or default if there are none."""
+        return max(self.live_values(), default=default)
+
+    def min(self, default=None):
+        """Return the smallest live value, or default if there are none."""
+        return min(self.live_values(), default=default)
+
+    def histogram(self, bins: int = 10, value_range: tuple = None) -> tuple[list, list]:
+        """
+        Returns (counts, edges) for bins equal-width bins over value_range, which defaults to the min and max.
+        Values outside value_range are not counted; the last bin includes its upper edge.
+        """
+        if value_range is None:
+            value_range = (self.min(default=0), self.max(default=0))
+        low, high = value_range
+        width = (high - low) / bins or 1
+        counts = [0] * bins
+        for value in self.live_values():
+            if low <= value <= high:
+                counts[min(int((value - low) / width), bins - 1)] += 1
+        return counts, [low + i * width for i in range(bins + 1)]
+
+    def to_numpy(self):
+        """
+        Returns a copy of the live values as a NumPy array. A view would share the column's memory, but while
+        it existed the column could not grow, so the map could not add keys.
+        NumPy is only imported when this is called.
+        """
+        import numpy
+
+        data = numpy.frombuffer(self._data, dtype=self._data.typecode)
+        if not self._free_slots:
+            return data.copy()
+        return data[numpy.frombuffer(self._live, dtype=numpy.bool_)]
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+    from a6_include import hash_function_1
+    from hash_map_oa import HashMap as OAHashMap
+    from hash_map_sc import HashMap as SCHashMap
+
+    print("\nto_numpy example 1 - the map keeps growing")
+    print("------------------------------------------")
+    try:
+        import numpy
+    except ImportError:
+        numpy = None
+        print("NumPy is not installed")
+    if numpy is not None:
+        for map_class in (SCHashMap, OAHashMap):
+            m = map_class(11, hash_function_1, value_type='i8')
+            for i in range(5):
+                m.put('key' + str(i), i)
+            values = m.get_value_column().to_numpy()
+            for i in range(5, 50):
+                m.put('key' + str(i), i)
+            m.remove('key0')
+            print(map_class.__module__, values.tolist(), m.get_size(), m.get_value_column().to_numpy().sum())
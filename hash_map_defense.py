@@ -0,0 +1,53 @@
+# Description: Collision-attack defense shared by both HashMaps. When a put() sees a chain (SC) or probe sequence
+#              (OA) longer than the map's collision limit, the map switches to a SeededHash with a random secret
+#              seed and rehashes, so keys crafted to collide under the original hash function spread out again.
+
+import os
+
+
+# Longest chain or probe sequence a put() may see before the map re-seeds. With a uniform hash these lengths are
+# practically never reached below the maximum load factor, so hitting one points at colliding keys.
+SC_COLLISION_LIMIT = 16
+OA_COLLISION_LIMIT = 32
+
+
+class SeededHash:
+    """
+    Keyed hash function built on Python's own hash, which is SipHash for str and bytes
+    The secret seed is mixed in through a tuple hash, so collisions depend on a value clients never see.
+    """
+
+    def __init__(self, seed: int = None) -> None:
+        """Initialize with the given seed, or a random 64-bit seed."""
+        self.seed = int.from_bytes(os.urandom(8), "little") if seed is None else seed
+
+    def __call__(self, key: object) -> int:
+        """Returns a non-negative hash of key under this seed."""
+        return hash((self.seed, key)) & 0x7FFFFFFFFFFFFFFF
+
+    def __repr__(self) -> str:
+        """Override repr method to provide more readable output without exposing the seed."""
+        return "SeededHash()"
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+    from itertools import permutations
+
+    from a6_include import hash_function_1
+    from hash_map_oa import HashMap as OAHashMap
+    from hash_map_sc import HashMap as SCHashMap
+
+    print("\ncollision defense example 1")
+    print("---------------------------")
+    # every permutation of the same letters has the same hash_function_1 value
+    keys = [''.join(p) for p in permutations('abcdef')]
+    for map_class in (SCHashMap, OAHashMap):
+        m = map_class(11, hash_function_1)
+        m.enable_stats()
+        for key in keys:
+            m.put(key, 1)
+        stats = m.get_stats()
+        print(map_class.__module__, m.get_size(), stats['reseeds'], m._hash_function,
+              all(m.contains_key(key) for key in keys))
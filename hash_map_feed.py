@@ -0,0 +1,251 @@
+# Description: Change feed for both HashMaps, for keeping replicas of a map in other processes up to date without
+#              resending every key. enable_feed() makes a map record each put, remove, clear and resize into a
+#              ChangeFeed, a bounded ring buffer numbered by sequence. catch_up() answers a replica's position
+#              with the changes it is missing, or with a snapshot of the map's columns if the ring no longer
+#              holds them or they outnumber the keys. Replica applies either, and follow() runs one in another
+#              process over a multiprocessing Connection.
+
+import os
+
+
+# Operations recorded in a ChangeFeed
+PUT = 'put'
+REMOVE = 'remove'
+CLEAR = 'clear'
+RESIZE = 'resize'
+
+
+class ChangeFeed:
+    """
+    Bounded ring buffer of the changes made to a HashMap, numbered by sequence
+    Each change is an operation with a key and a value, kept in three parallel lists:
+    ('put', key, value) with the value key holds afterwards, also for increment(), setdefault(), update_with()
+    and merge(); ('remove', key, None), also for pop(); ('clear', None, None); and ('resize', capacity, None)
+    for every rehash, automatic or not. Once capacity changes are recorded, each new one overwrites the oldest.
+    The ring keeps references to the keys and values it holds until they are overwritten.
+    """
+
+    def __init__(self, capacity: int = 65536) -> None:
+        """
+        Initialize an empty feed holding up to capacity changes, with a fresh random feed_id.
+        Replicas compare feed_id before applying changes, so sequence numbers from a feed that was replaced,
+        or from a restarted process, are never mistaken for this one's.
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.feed_id = os.urandom(8).hex()
+        # the sequence number the next change will get, which is also the number of changes recorded
+        self.sequence = 0
+        self._operations = [None] * capacity
+        self._keys = [None] * capacity
+        self._values = [None] * capacity
+
+    def __len__(self) -> int:
+        """Return the number of changes the ring currently holds."""
+        return min(self.sequence, self.capacity)
+
+    def record(self, operation: str, key: object = None, value: object = None) -> None:
+        """Appends a change, overwriting the oldest once the ring is full."""
+        slot = self.sequence % self.capacity
+        self._operations[slot] = operation
+        self._keys[slot] = key
+        self._values[slot] = value
+        self.sequence += 1
+
+    def oldest(self) -> int:
+        """
+        Returns the sequence number of the oldest change still in the ring.
+        """
+        return max(0, self.sequence - self.capacity)
+
+    def changes_since(self, sequence: int) -> tuple:
+        """
+        Returns (operations, keys, values), three lists with the changes numbered sequence and up, in order.
+        Returns None if some of them were already overwritten or sequence is past the last change.
+        """
+        if sequence < self.oldest() or sequence > self.sequence:
+            return None
+        if sequence == self.sequence:
+            return [], [], []
+        start, end = sequence % self.capacity, self.sequence % self.capacity
+        if start < end:
+            return self._operations[start:end], self._keys[start:end], self._values[start:end]
+        return (self._operations[start:] + self._operations[:end], self._keys[start:] + self._keys[:end],
+                self._values[start:] + self._values[:end])
+
+    def clear(self) -> None:
+        """
+        Drops every change and starts a new feed_id, so every replica catches up with a snapshot next.
+        """
+        self.__init__(self.capacity)
+
+
+def catch_up(hash_map, feed_id: str = None, sequence: int = 0) -> dict:
+    """
+    Returns the message that brings a replica at position (feed_id, sequence) up to date with hash_map, which
+    must have a change feed. Both kinds of message hold the 'feed_id' and the 'sequence' of the next change:
+    changes add 'start', 'operations', 'keys' and 'values', and a snapshot adds 'map_class' and the
+    'columns' of export_columns(). A snapshot is sent when the feed is not the one the replica followed, when
+    the ring no longer holds the changes, or when they outnumber the keys, since rebuilding the map is then
+    cheaper than replaying them. Messages can be pickled if the hash function can.
+    """
+    feed = hash_map.get_feed()
+    if feed is None:
+        raise ValueError("the hashmap has no change feed; call enable_feed() first")
+    changes = feed.changes_since(sequence) if feed_id == feed.feed_id else None
+    if changes is not None and len(changes[0]) <= hash_map.get_size():
+        operations, keys, values = changes
+        return {'feed_id': feed.feed_id, 'sequence': feed.sequence, 'start': sequence,
+                'operations': operations, 'keys': keys, 'values': values}
+    return {'feed_id': feed.feed_id, 'sequence': feed.sequence, 'map_class': type(hash_map),
+            'columns': hash_map.export_columns()}
+
+
+def apply_changes(hash_map, operations: list, keys: list, values: list) -> None:
+    """
+    Applies the changes of a ChangeFeed to hash_map in order.
+    Resizes are only replayed where hash_map's capacity differs, since a replica applying the same puts and
+    removes under the same load policy resizes at the same points by itself.
+    """
+    put, remove = hash_map.put, hash_map.remove
+    for operation, key, value in zip(operations, keys, values):
+        if operation == PUT:
+            put(key, value)
+        elif operation == REMOVE:
+            remove(key)
+        elif operation == CLEAR:
+            hash_map.clear()
+        elif hash_map.get_capacity() != key:
+            hash_map.resize_table(key)
+
+
+class Replica:
+    """
+    Copy of a HashMap kept up to date with the messages of catch_up()
+    """
+
+    def __init__(self, hash_map=None, feed_id: str = None, sequence: int = 0) -> None:
+        """
+        Initialize a replica of hash_map, which was last synced at position (feed_id, sequence).
+        A new replica has no map and gets a snapshot on its first sync.
+        """
+        self._map = hash_map
+        self.feed_id = feed_id
+        self.sequence = sequence
+
+    def position(self) -> tuple:
+        """
+        Returns (feed_id, sequence), the arguments of catch_up() for this replica.
+        """
+        return self.feed_id, self.sequence
+
+    def get_map(self):
+        """
+        Returns the replicated hashmap, or None before the first sync.
+        """
+        return self._map
+
+    def apply(self, message: dict) -> None:
+        """
+        Applies a message from catch_up(), replacing the map if it holds a snapshot.
+        Raises ValueError if the message holds changes that don't start at this replica's position.
+        """
+        if 'columns' in message:
+            self._map = message['map_class'].from_columns(message['columns'])
+        elif (message['feed_id'], message['start']) != self.position():
+            raise ValueError(f"changes from {message['start']} of feed {message['feed_id']} "
+                             f"don't continue replica at {self.sequence} of feed {self.feed_id}")
+        else:
+            apply_changes(self._map, message['operations'], message['keys'], message['values'])
+        self.feed_id, self.sequence = message['feed_id'], message['sequence']
+
+
+def send_changes(connection, hash_map) -> dict:
+    """
+    Receives a replica's position from connection, sends back the message of catch_up() and returns it.
+    """
+    feed_id, sequence = connection.recv()
+    message = catch_up(hash_map, feed_id, sequence)
+    connection.send(message)
+    return message
+
+
+def stop_replica(connection):
+    """
+    Receives a replica's position from connection, tells it to stop and returns the map it sends back.
+    """
+    connection.recv()
+    connection.send(None)
+    return connection.recv()
+
+
+def follow(connection, replica: Replica = None) -> Replica:
+    """
+    Keeps a replica in sync through connection, the end of a multiprocessing Pipe whose other end is served
+    with send_changes(). It sends its position, applies the reply and repeats until it receives None, then sends
+    its map back and returns the replica.
+    """
+    if replica is None:
+        replica = Replica()
+    while True:
+        connection.send(replica.position())
+        message = connection.recv()
+        if message is None:
+            break
+        replica.apply(message)
+    connection.send(replica.get_map())
+    return replica
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+    import multiprocessing
+
+    from a6_include import hash_function_2
+    from hash_map_oa import HashMap as OAHashMap
+    from hash_map_sc import HashMap as SCHashMap
+
+    print("\nChangeFeed example 1")
+    print("--------------------")
+    m = SCHashMap(11, hash_function_2)
+    feed = m.enable_feed(capacity=8)
+    m.put('a', 1)
+    m.increment('a', 5)
+    m.put('b', 2)
+    m.pop('b')
+    m.clear()
+    print(feed.sequence, feed.changes_since(0))
+    for i in range(10):
+        m.put('key' + str(i), i)
+    print(feed.oldest(), len(feed), feed.changes_since(2), feed.changes_since(feed.sequence - 2))
+
+    print("\nReplica example 1 - two processes")
+    print("---------------------------------")
+    for map_class in (SCHashMap, OAHashMap):
+        m = map_class(11, hash_function_2)
+        m.enable_feed(capacity=64)
+        primary, replica_end = multiprocessing.Pipe()
+        process = multiprocessing.Process(target=follow, args=(replica_end,))
+        process.start()
+        for i in range(500):
+            m.put('key' + str(i), i)
+        kinds = []
+        for round_number in range(6):
+            # the new replica starts from a snapshot, the fourth round makes more changes than the ring holds
+            # and after clear() the changes outnumber the keys, so those rounds send snapshots too
+            for i in range(200 if round_number == 3 else 40):
+                m.put('key' + str(i % 150), round_number * 1000 + i)
+                if i % 3 == 0:
+                    m.remove('key' + str(i // 2))
+            if round_number == 5:
+                m.clear()
+                m.put('after clear', 1)
+            message = send_changes(primary, m)
+            kinds.append(len(message['operations']) if 'operations' in message else 'snapshot')
+        copy = stop_replica(primary)
+        process.join()
+        mine, theirs = m.export_columns(), copy.export_columns()
+        print(map_class.__module__, kinds, m.get_size(), copy.get_capacity() == m.get_capacity(),
+              sorted(zip(mine['keys'], mine['values'])) == sorted(zip(theirs['keys'], theirs['values'])))
@@ -0,0 +1,305 @@
+# Description: Immutable hash map built as a hash array mapped trie (HAMT). put() and remove() return a new
+#              version and leave the old one untouched. Each version shares every trie node off the changed path
+#              with its predecessor, so a new version costs O(log32 n) time and memory instead of a full copy.
+#              Keys are hashed with the same pluggable hash functions as the other maps.
+
+from a6_include import DynamicArray, hash_function_1
+from hash_map_keys import hash_key, mix_int
+
+
+# Hash bits consumed per trie level; each node has up to 2^5 = 32 children
+BITS_PER_LEVEL = 5
+_LEVEL_MASK = (1 << BITS_PER_LEVEL) - 1
+
+_MISSING = object()
+
+
+class _BitmapNode:
+    """
+    Trie node whose bitmap marks which of the 32 child positions are present
+    children holds only the present children, in position order. Each is a (key_hash, key, value) leaf tuple,
+    a _BitmapNode or a _CollisionNode.
+    """
+
+    __slots__ = ('bitmap', 'children')
+
+    def __init__(self, bitmap: int, children: tuple) -> None:
+        """Initialize a node; nodes are never changed after this."""
+        self.bitmap = bitmap
+        self.children = children
+
+
+class _CollisionNode:
+    """
+    Trie node holding keys whose 64-bit hashes are all key_hash, as a tuple of (key, value) pairs
+    """
+
+    __slots__ = ('key_hash', 'pairs')
+
+    def __init__(self, key_hash: int, pairs: tuple) -> None:
+        """Initialize a node; nodes are never changed after this."""
+        self.key_hash = key_hash
+        self.pairs = pairs
+
+
+_EMPTY_ROOT = _BitmapNode(0, ())
+
+
+def _lookup(node, key_hash: int, key: object) -> object:
+    """
+    Returns the value of key in the trie rooted at node, or _MISSING.
+    """
+    shift = 0
+    while True:
+        if type(node) is _CollisionNode:
+            if node.key_hash == key_hash:
+                for pair_key, value in node.pairs:
+                    if pair_key == key:
+                        return value
+            return _MISSING
+        bit = 1 << ((key_hash >> shift) & _LEVEL_MASK)
+        if not node.bitmap & bit:
+            return _MISSING
+        child = node.children[(node.bitmap & (bit - 1)).bit_count()]
+        if type(child) is tuple:
+            return child[2] if child[0] == key_hash and child[1] == key else _MISSING
+        node = child
+        shift += BITS_PER_LEVEL
+
+
+def _join(leaf: tuple, other: tuple, shift: int):
+    """
+    Returns the smallest subtrie at level shift holding two leaves whose keys differ.
+    """
+    if leaf[0] == other[0]:
+        return _CollisionNode(leaf[0], ((leaf[1], leaf[2]), (other[1], other[2])))
+    position = (leaf[0] >> shift) & _LEVEL_MASK
+    other_position = (other[0] >> shift) & _LEVEL_MASK
+    if position == other_position:
+        return _BitmapNode(1 << position, (_join(leaf, other, shift + BITS_PER_LEVEL),))
+    children = (leaf, other) if position < other_position else (other, leaf)
+    return _BitmapNode((1 << position) | (1 << other_position), children)
+
+
+def _assoc(node, shift: int, key_hash: int, key: object, value: object) -> tuple:
+    """
+    Returns (new_node, added): the subtrie node with key set to value, and whether key is new.
+    new_node is node itself if nothing changed.
+    """
+    if type(node) is _CollisionNode:
+        if node.key_hash != key_hash:
+            # the new key differs higher up, so put the collision node below a bitmap node
+            parent = _BitmapNode(1 << ((node.key_hash >> shift) & _LEVEL_MASK), (node,))
+            return _assoc(parent, shift, key_hash, key, value)
+        for i, (pair_key, pair_value) in enumerate(node.pairs):
+            if pair_key == key:
+                if pair_value is value:
+                    return node, False
+                pairs = node.pairs[:i] + ((key, value),) + node.pairs[i + 1:]
+                return _CollisionNode(key_hash, pairs), False
+        return _CollisionNode(key_hash, node.pairs + ((key, value),)), True
+
+    bit = 1 << ((key_hash >> shift) & _LEVEL_MASK)
+    index = (node.bitmap & (bit - 1)).bit_count()
+    children = node.children
+    if not node.bitmap & bit:
+        leaf = (key_hash, key, value)
+        return _BitmapNode(node.bitmap | bit, children[:index] + (leaf,) + children[index:]), True
+
+    child = children[index]
+    if type(child) is tuple:
+        if child[0] == key_hash and child[1] == key:
+            if child[2] is value:
+                return node, False
+            new_child, added = (key_hash, key, value), False
+        else:
+            new_child, added = _join(child, (key_hash, key, value), shift + BITS_PER_LEVEL), True
+    else:
+        new_child, added = _assoc(child, shift + BITS_PER_LEVEL, key_hash, key, value)
+        if new_child is child:
+            return node, False
+    return _BitmapNode(node.bitmap, children[:index] + (new_child,) + children[index + 1:]), added
+
+
+def _without(node, shift: int, key_hash: int, key: object):
+    """
+    Returns the subtrie node without key: node itself if key is not in it, None if it is now empty, or a
+    single leaf tuple when that is all that is left below the root, so that the trie stays compact.
+    """
+    if type(node) is _CollisionNode:
+        if node.key_hash != key_hash:
+            return node
+        pairs = tuple(pair for pair in node.pairs if pair[0] != key)
+        if len(pairs) == len(node.pairs):
+            return node
+        if len(pairs) == 1:
+            return key_hash, pairs[0][0], pairs[0][1]
+        return _CollisionNode(key_hash, pairs)
+
+    bit = 1 << ((key_hash >> shift) & _LEVEL_MASK)
+    if not node.bitmap & bit:
+        return node
+    index = (node.bitmap & (bit - 1)).bit_count()
+    children = node.children
+    child = children[index]
+    if type(child) is tuple:
+        if child[0] != key_hash or child[1] != key:
+            return node
+        new_child = None
+    else:
+        new_child = _without(child, shift + BITS_PER_LEVEL, key_hash, key)
+        if new_child is child:
+            return node
+
+    if new_child is None:
+        if len(children) == 1:
+            return None
+        bitmap = node.bitmap & ~bit
+        children = children[:index] + children[index + 1:]
+    else:
+        bitmap = node.bitmap
+        children = children[:index] + (new_child,) + children[index + 1:]
+    # a lone leaf moves up to the parent; the root always stays a bitmap node
+    if shift and len(children) == 1 and type(children[0]) is tuple:
+        return children[0]
+    return _BitmapNode(bitmap, children)
+
+
+def _iterate(node):
+    """Yields every (key, value) pair in the trie rooted at node."""
+    if type(node) is _CollisionNode:
+        yield from node.pairs
+        return
+    for child in node.children:
+        if type(child) is tuple:
+            yield child[1], child[2]
+        else:
+            yield from _iterate(child)
+
+
+class PersistentHashMap:
+    """
+    Immutable hash map; put() and remove() return new versions that share structure with this one
+    Versions are safe to hand to other threads and to keep for undo, since none of them ever changes.
+    """
+
+    __slots__ = ('_hash_function', '_root', '_size')
+
+    def __init__(self, function: callable = hash_function_1) -> None:
+        """
+        Initialize an empty map whose str keys are hashed with function.
+        """
+        self._hash_function = function
+        self._root = _EMPTY_ROOT
+        self._size = 0
+
+    def _version(self, root: _BitmapNode, size: int) -> "PersistentHashMap":
+        """
+        Returns a map with the same hash function, the given root and size.
+        """
+        version = PersistentHashMap.__new__(PersistentHashMap)
+        version._hash_function = self._hash_function
+        version._root = root
+        version._size = size
+        return version
+
+    def _key_hash(self, key: str) -> int:
+        """
+        Returns the 64-bit trie hash of key, mixed so that every 5-bit level of it is well distributed.
+        """
+        if type(key) is str:
+            return mix_int(self._hash_function(key))
+        return mix_int(hash_key(key, self._hash_function))
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output
+        """
+        return '{' + ', '.join(f'{key}: {value}' for key, value in self) + '}'
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return self._size
+
+    def put(self, key: str, value: object) -> "PersistentHashMap":
+        """
+        Returns a new version with key set to value. This version is unchanged.
+        """
+        root, added = _assoc(self._root, 0, self._key_hash(key), key, value)
+        if root is self._root:
+            return self
+        return self._version(root, self._size + 1 if added else self._size)
+
+    def remove(self, key: str) -> "PersistentHashMap":
+        """
+        Returns a new version without key, or this version if key is not in it.
+        """
+        root = _without(self._root, 0, self._key_hash(key), key)
+        if root is self._root:
+            return self
+        return self._version(_EMPTY_ROOT if root is None else root, self._size - 1)
+
+    def get(self, key: str) -> object:
+        """
+        Returns the value of key, or None if key is not in the map.
+        """
+        value = _lookup(self._root, self._key_hash(key), key)
+        return None if value is _MISSING else value
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if the key is in the map, False if not.
+        """
+        return _lookup(self._root, self._key_hash(key), key) is not _MISSING
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns an array of key-value pair tuples for each element in the map.
+        """
+        pairs = DynamicArray()
+        for pair in self:
+            pairs.append(pair)
+        return pairs
+
+    def __iter__(self):
+        """
+        Yields every (key, value) pair in trie order.
+        """
+        return _iterate(self._root)
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+    from itertools import permutations
+
+    print("\nPersistentHashMap example 1")
+    print("---------------------------")
+    v0 = PersistentHashMap()
+    v1 = v0.put('key1', 10).put('key2', 20)
+    v2 = v1.put('key1', 11).remove('key2')
+    for version in (v0, v1, v2):
+        print(version.get_size(), version.get('key1'), version.contains_key('key2'), version)
+
+    print("\nPersistentHashMap example 2 - undo history")
+    print("------------------------------------------")
+    history = [PersistentHashMap()]
+    for i in range(1000):
+        history.append(history[-1].put('key' + str(i), i))
+    for i in range(0, 1000, 3):
+        history.append(history[-1].remove('key' + str(i)))
+    print(history[-1].get_size(), history[500].get_size(), history[500].get('key499'), history[-1].get('key3'))
+
+    print("\nPersistentHashMap example 3 - colliding hashes")
+    print("----------------------------------------------")
+    # every permutation of the same letters has the same hash_function_1 value
+    m = PersistentHashMap(hash_function_1)
+    keys = [''.join(p) for p in permutations('abcd')]
+    for key in keys:
+        m = m.put(key, key.upper())
+    print(m.get_size(), m.get('dcba'), all(m.contains_key(key) for key in keys))
+    for key in keys[:-1]:
+        m = m.remove(key)
+    print(m.get_size(), m.get_keys_and_values())
@@ -0,0 +1,220 @@
+# Description: Profiling hooks for both HashMaps. Hooks registered with add_hook() are called before and after
+#              put, get, remove, increment, setdefault, update_with, pop and resize_table. SamplingTracer is a
+#              hook that times one in every N operations and can write its samples as a pstats file or as
+#              collapsed stacks for flamegraph tools.
+
+import marshal
+import time
+
+
+class HashMapHook:
+    """
+    Base class for HashMap hooks; subclasses override before(), after() and/or failed()
+    operation is 'put', 'get', 'remove', 'increment', 'setdefault', 'update_with', 'pop' or 'resize_table'.
+    For resize_table, key is the requested capacity.
+    Every before() call is matched by exactly one after() or failed() call.
+    """
+
+    def before(self, hash_map, operation: str, key: object) -> None:
+        """Called before operation runs."""
+        pass
+
+    def after(self, hash_map, operation: str, key: object, result: object) -> None:
+        """Called after operation returned result."""
+        pass
+
+    def failed(self, hash_map, operation: str, key: object, error: BaseException) -> None:
+        """Called instead of after() when operation raised error, before the error propagates."""
+        pass
+
+
+def call_with_hooks(hash_map, hooks: tuple, operation: str, key: object, method: callable, *args) -> object:
+    """
+    Runs method(*args) between the before() and after() callbacks of every hook and returns its result.
+    after() callbacks run in reverse registration order so that hooks nest. If method or a before() callback
+    raises, every hook whose before() ran gets failed() instead, in the same order, and the error propagates.
+    """
+    entered = 0
+    try:
+        for hook in hooks:
+            hook.before(hash_map, operation, key)
+            entered += 1
+        result = method(*args)
+    except BaseException as error:
+        for hook in reversed(hooks[:entered]):
+            hook.failed(hash_map, operation, key, error)
+        raise
+    for hook in reversed(hooks):
+        hook.after(hash_map, operation, key, result)
+    return result
+
+
+class TraceSample:
+    """
+    One timed operation recorded by a SamplingTracer
+    """
+
+    def __init__(self, operation: str, key: object, stack: tuple, seconds: float, child_seconds: float) -> None:
+        """Initialize a sample; stack lists the enclosing operations, outermost first, ending with this one."""
+        self.operation = operation
+        self.key = key
+        self.stack = stack
+        self.seconds = seconds
+        self.child_seconds = child_seconds
+
+    def __str__(self) -> str:
+        """Override string method to provide more readable output."""
+        return f"{';'.join(self.stack)} key={self.key!r} {self.seconds * 1e6:.1f}us"
+
+
+class SamplingTracer(HashMapHook):
+    """
+    Hook that times one in every `every` calls of each operation and keeps the key involved
+    Operations listed in always (resize_table by default) are timed on every call.
+    At most max_samples samples are kept; later ones are dropped and counted in dropped.
+    """
+
+    def __init__(self, every: int = 100, always: tuple = ('resize_table',), max_samples: int = 100000) -> None:
+        """Initialize a tracer with no samples."""
+        if every < 1:
+            raise ValueError("every must be at least 1")
+        self.every = every
+        self.always = always
+        self.max_samples = max_samples
+        self.samples = []
+        self.dropped = 0
+        self._counts = {}
+        # one [operation, started or None, child seconds] frame per running operation
+        self._frames = []
+        self._owner = None
+
+    def before(self, hash_map, operation: str, key: object) -> None:
+        """Opens a frame for operation, starting the clock if this call is sampled."""
+        if self._owner is None:
+            self._owner = type(hash_map)
+        count = self._counts.get(operation, 0) + 1
+        self._counts[operation] = count
+        sampled = count % self.every == 0 or operation in self.always
+        self._frames.append([operation, time.perf_counter() if sampled else None, 0.0])
+
+    def after(self, hash_map, operation: str, key: object, result: object) -> None:
+        """Closes the frame of operation and records a sample if it was timed."""
+        name, started, child_seconds = self._frames.pop()
+        if started is None:
+            return
+        seconds = time.perf_counter() - started
+        if self._frames:
+            self._frames[-1][2] += seconds
+
+        if len(self.samples) >= self.max_samples:
+            self.dropped += 1
+            return
+        stack = tuple(frame[0] for frame in self._frames) + (name,)
+        self.samples.append(TraceSample(name, key, stack, seconds, child_seconds))
+
+    def failed(self, hash_map, operation: str, key: object, error: BaseException) -> None:
+        """
+        Closes the frame of an operation that raised without recording a sample; its time still counts
+        against the enclosing operation's self time.
+        """
+        _, started, _ = self._frames.pop()
+        if started is not None and self._frames:
+            self._frames[-1][2] += time.perf_counter() - started
+
+    def clear(self) -> None:
+        """Discards all samples and counters."""
+        self.samples = []
+        self.dropped = 0
+        self._counts = {}
+
+    def collapsed_stacks(self) -> dict:
+        """
+        Returns {'put;resize_table': microseconds, ...} with the self time of every sampled stack,
+        the input format of flamegraph.pl and speedscope.
+        """
+        stacks = {}
+        for sample in self.samples:
+            name = ';'.join(sample.stack)
+            self_micros = max(0.0, sample.seconds - sample.child_seconds) * 1e6
+            stacks[name] = stacks.get(name, 0) + self_micros
+        return stacks
+
+    def write_collapsed(self, filename: str) -> None:
+        """
+        Writes the collapsed stacks to filename, one 'stack microseconds' line each.
+        """
+        with open(filename, "w") as file:
+            for name, micros in sorted(self.collapsed_stacks().items()):
+                file.write(f"{name} {max(1, round(micros))}\n")
+
+    def dump_stats(self, filename: str) -> None:
+        """
+        Writes the samples to filename in the marshal format of cProfile, so they can be loaded with
+        pstats.Stats(filename) or any tool that reads .prof files.
+        """
+        module = self._owner.__module__ + ".py" if self._owner is not None else "hash_map"
+        prefix = self._owner.__name__ + "." if self._owner is not None else ""
+
+        def function(operation):
+            return module, 0, prefix + operation
+
+        # function -> [primitive calls, calls, self time, cumulative time, {caller: [same four]}]
+        stats = {}
+        for sample in self.samples:
+            entry = stats.setdefault(function(sample.operation), [0, 0, 0.0, 0.0, {}])
+            self_seconds = max(0.0, sample.seconds - sample.child_seconds)
+            entry[0] += 1
+            entry[1] += 1
+            entry[2] += self_seconds
+            entry[3] += sample.seconds
+            if len(sample.stack) > 1:
+                caller = entry[4].setdefault(function(sample.stack[-2]), [0, 0, 0.0, 0.0])
+                caller[0] += 1
+                caller[1] += 1
+                caller[2] += self_seconds
+                caller[3] += sample.seconds
+
+        with open(filename, "wb") as file:
+            marshal.dump({func: (cc, nc, tt, ct, {caller: tuple(values) for caller, values in callers.items()})
+                          for func, (cc, nc, tt, ct, callers) in stats.items()}, file)
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+    import pstats
+    import tempfile
+
+    from a6_include import hash_function_2
+    from hash_map_sc import HashMap
+
+    print("\nSamplingTracer example 1")
+    print("------------------------")
+    m = HashMap(11, hash_function_2)
+    tracer = SamplingTracer(every=50)
+    m.add_hook(tracer)
+    for i in range(500):
+        m.put('key' + str(i), i)
+        m.get('key' + str(i // 2))
+    m.remove('key1')
+    m.remove_hook(tracer)
+    print(len(tracer.samples), sorted(tracer.collapsed_stacks()))
+
+    with tempfile.TemporaryDirectory() as directory:
+        tracer.dump_stats(directory + "/trace.prof")
+        stats = pstats.Stats(directory + "/trace.prof")
+        print(sorted(name for _, _, name in stats.stats))
+
+    print("\nSamplingTracer example 2 - an operation that raises")
+    print("---------------------------------------------------")
+    m = HashMap(11, hash_function_2)
+    tracer = SamplingTracer(every=1)
+    m.add_hook(tracer)
+    m.put('a', 1)
+    try:
+        m.update_with('a', lambda value: value / 0)
+    except ZeroDivisionError as error:
+        print(type(error).__name__, len(tracer._frames))
+    m.get('a')
+    m.put('b', 2)
+    print(sorted(tracer.collapsed_stacks()))
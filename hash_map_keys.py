@@ -0,0 +1,165 @@
+# Description: Hashing for keys that aren't strings. Both HashMaps hash str keys with their configured hash
+#              function and route every other key through hash_key(), which mixes numbers, hashes bytes-like
+#              buffers without copying them and combines the element hashes of tuples.
+
+from zlib import crc32
+
+from hash_map_defense import SeededHash
+
+
+_MASK64 = 0xFFFFFFFFFFFFFFFF
+
+# 2^64 divided by the golden ratio, the multiplier of Fibonacci hashing
+_GOLDEN = 0x9E3779B97F4A7C15
+
+
+def mix_int(n: int) -> int:
+    """
+    Returns a well-distributed 64-bit hash of an integer with one multiplication and a fold of the high bits,
+    so that strided integers don't pile up in the same buckets of a power of two table.
+    """
+    n = (n * _GOLDEN) & _MASK64
+    return n ^ (n >> 32)
+
+
+def hash_buffer(buffer) -> int:
+    """
+    Returns a hash of the bytes in a bytes, bytearray or memoryview object without copying them.
+    """
+    return crc32(buffer)
+
+
+def hash_tuple(key: tuple, function: callable) -> int:
+    """
+    Combines the hashes of the parts of a tuple into one order-dependent 64-bit hash.
+    str parts are hashed with function, bytes-like and tuple parts like top-level keys and anything else with
+    Python's hash(), so that equal parts such as 1 and 1.0 contribute equally.
+    """
+    acc = _GOLDEN
+    for part in key:
+        kind = type(part)
+        if kind is str:
+            part_hash = function(part)
+        elif kind is int:
+            part_hash = hash(part)
+        elif isinstance(part, tuple):
+            part_hash = hash_key(part, function)
+        elif isinstance(part, (bytes, bytearray, memoryview)):
+            part_hash = crc32(part)
+        elif isinstance(part, str):
+            part_hash = function(part)
+        else:
+            part_hash = hash(part)
+        acc = ((acc ^ part_hash) * _GOLDEN) & _MASK64
+    return acc ^ (acc >> 32)
+
+
+class CompositeKey(tuple):
+    """
+    Immutable composite key that caches its hash
+    Behaves exactly like the tuple of its parts, but a HashMap only hashes its parts the first time it is
+    used with each hash function, so reusing one CompositeKey for many lookups skips rehashing the parts.
+    """
+
+    def __new__(cls, *parts):
+        """Create a key from its parts, e.g. CompositeKey('user', 42)."""
+        return super().__new__(cls, parts)
+
+    def __init__(self, *parts) -> None:
+        """Initialize an empty hash cache."""
+        self._hash_function = None
+        self._hash = 0
+
+    def __reduce__(self) -> tuple:
+        """
+        Pickles and copies the key as its parts. The cached hash is left out: hashes of parts hashed with
+        Python's hash() differ between processes, so the copy hashes its parts again on first use.
+        """
+        return CompositeKey, tuple(self)
+
+
+def hash_key(key, function: callable) -> int:
+    """
+    Returns the hash of key for a map whose str keys are hashed with function.
+    Keys that compare equal get equal hashes: numbers go through Python's hash() before mixing, so 1 and 1.0
+    hash alike, and tuples hash alike whether or not they are CompositeKeys.
+    """
+    if isinstance(function, SeededHash):
+        # a seeded hash already handles every hashable key and must not be bypassed; bytearray and memoryviews
+        # of one are not hashable, so bytes-like keys are hashed as the bytes they compare equal to
+        if isinstance(key, (bytearray, memoryview)):
+            return function(bytes(key))
+        return function(key)
+    kind = type(key)
+    if kind is int:
+        return mix_int(hash(key))
+    if kind is CompositeKey:
+        if key._hash_function is not function:
+            key._hash = hash_tuple(key, function)
+            key._hash_function = function
+        return key._hash
+    if isinstance(key, tuple):
+        return hash_tuple(key, function)
+    if isinstance(key, (bytes, bytearray, memoryview)):
+        return crc32(key)
+    if isinstance(key, str):
+        return function(key)
+    return mix_int(hash(key))
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+    from a6_include import hash_function_1, hash_function_2
+    from hash_map_oa import HashMap as OAHashMap
+    from hash_map_sc import HashMap as SCHashMap
+
+    print("\nhash_key example 1")
+    print("------------------")
+    for key in (42, 42.0, True, b'abc', memoryview(b'abc'), ('a', 1), CompositeKey('a', 1)):
+        print(type(key).__name__, hash_key(key, hash_function_1))
+
+    print("\nnon-string keys example 1")
+    print("-------------------------")
+    for map_class in (SCHashMap, OAHashMap):
+        m = map_class(11, hash_function_2)
+        for i in range(100):
+            m.put(i, i * 100)
+            m.put(('pair', i), i)
+            m.put(str(i).encode(), -i)
+        print(map_class.__module__, m.get_size(), m.get(7), m.get(('pair', 7)), m.get(CompositeKey('pair', 7)),
+              m.get(b'7'), m.get(memoryview(b'7')), m.contains_key('7'))
+
+    print("\nCompositeKey example 1 - pickle and copy")
+    print("----------------------------------------")
+    import copy
+    import pickle
+
+    key = CompositeKey('a', 1)
+    hash_key(key, hash_function_1)
+    for restored in (pickle.loads(pickle.dumps(key)), pickle.loads(pickle.dumps(key, protocol=0)),
+                     copy.copy(key), copy.deepcopy(key)):
+        assert type(restored) is CompositeKey and restored == key == ('a', 1) and restored._hash_function is None
+    for map_class in (SCHashMap, OAHashMap):
+        m = map_class(11, hash_function_2)
+        m.put(key, 5)
+        restored = pickle.loads(pickle.dumps(m))
+        print(map_class.__module__, restored.get(key), restored.get(('a', 1)), restored.get_keys_and_values())
+
+    print("\nbytes-like keys example 1 - reseeding")
+    print("-------------------------------------")
+    from itertools import permutations
+
+    for map_class in (SCHashMap, OAHashMap):
+        m = map_class(11, hash_function_1)
+        m.enable_stats()
+        byte_keys = [bytearray(b'key' + bytes([i])) for i in range(10)]
+        for key in byte_keys:
+            m.put(key, 1)
+        # every permutation of the same letters collides under hash_function_1, which makes the map reseed
+        keys = [''.join(p) for p in permutations('abcde')][:40]
+        for key in keys:
+            m.put(key, 1)
+        print(map_class.__module__, m.get_size(), m.get_stats()['reseeds'],
+              all(m.contains_key(key) for key in byte_keys + keys), m.get(bytes(byte_keys[3])),
+              m.get(memoryview(byte_keys[3])))
@@ -0,0 +1,400 @@
+# Description: Multimap mode for the chaining HashMap. Each key maps to a segment of a shared ValuePool, which keeps
+#              the values of every key back to back in one list or typed array, so a key costs three array
+#              entries instead of a list object. add() finds or creates the key's segment with a single
+#              setdefault() lookup, and group_by() builds a multimap from a stream of records with the table
+#              sized for its keys up front.
+
+from array import array
+from itertools import repeat
+
+from a6_include import DynamicArray, hash_function_1, hash_function_2
+from hash_map_columns import VALUE_TYPES
+from hash_map_policy import SC_DEFAULT_POLICY
+from hash_map_sc import HashMap
+from hash_map_serialize import bulk_capacity
+
+
+# offset of a freed segment
+FREED = -1
+
+# pools holding fewer values than this are never compacted
+_MIN_COMPACT_VALUES = 1024
+
+
+class ValuePool:
+    """
+    Values of many segments stored back to back in one list, or in one array for a typed pool
+    A segment is addressed by an id that stays valid until it is freed, and its values are contiguous. A
+    segment that outgrows its room moves to the end of the pool with twice the room, unless it already ends
+    the pool and just grows in place. Once the room left behind by moved and freed segments exceeds the live
+    values, the segments are moved together again.
+    """
+
+    def __init__(self, value_type: str = None) -> None:
+        """
+        Initialize an empty pool; value_type is a NumPy-style name like 'i8' or 'f8' for unboxed values, or
+        None for any Python objects.
+        """
+        self.value_type = value_type
+        if value_type is None:
+            self.typecode = None
+        else:
+            self.typecode = VALUE_TYPES.get(value_type, value_type)
+            if self.typecode not in VALUE_TYPES.values():
+                raise ValueError(f"unsupported value_type {value_type!r}, expected one of {sorted(VALUE_TYPES)}")
+        self._values = self._empty()
+        self._offsets = array('q')
+        self._lengths = array('q')
+        self._rooms = array('q')
+        self._free_segments = []
+        self._live = 0
+        self._dead = 0
+
+    def __len__(self) -> int:
+        """Return the number of values stored in live segments."""
+        return self._live
+
+    def capacity(self) -> int:
+        """Return the number of value slots held, including room not used by any live value."""
+        return len(self._values)
+
+    def _empty(self):
+        """Returns an empty list, or an empty array of the pool's type."""
+        return [] if self.typecode is None else array(self.typecode)
+
+    def _blank(self, count: int):
+        """Returns count unused slots: None, or zero for a typed pool."""
+        if self.typecode is None:
+            return repeat(None, count)
+        return repeat(0, count)
+
+    def next_segment(self) -> int:
+        """
+        Returns the id the next new_segment() call will return, without allocating it.
+        """
+        if self._free_segments:
+            return self._free_segments[-1]
+        return len(self._offsets)
+
+    def new_segment(self) -> int:
+        """
+        Allocates an empty segment and returns its id.
+        """
+        if self._free_segments:
+            segment = self._free_segments.pop()
+            self._offsets[segment] = len(self._values)
+            self._lengths[segment] = 0
+            self._rooms[segment] = 0
+            return segment
+        self._offsets.append(len(self._values))
+        self._lengths.append(0)
+        self._rooms.append(0)
+        return len(self._offsets) - 1
+
+    def append(self, segment: int, value) -> None:
+        """
+        Appends value to a segment.
+        """
+        offset, length = self._offsets[segment], self._lengths[segment]
+        if length == self._rooms[segment]:
+            offset = self._grow(segment)
+        self._values[offset + length] = value
+        self._lengths[segment] = length + 1
+        self._live += 1
+
+    def extend(self, segment: int, values) -> None:
+        """
+        Appends every value of an iterable to a segment.
+        """
+        for value in values:
+            self.append(segment, value)
+
+    def get(self, segment: int):
+        """
+        Returns a copy of the values of a segment, as a list or as an array of the pool's type.
+        """
+        offset = self._offsets[segment]
+        return self._values[offset:offset + self._lengths[segment]]
+
+    def length(self, segment: int) -> int:
+        """Return the number of values in a segment."""
+        return self._lengths[segment]
+
+    def remove_one(self, segment: int, value) -> bool:
+        """
+        Removes the first occurrence of value from a segment, keeping the order of the others.
+        Returns True if the value was found.
+        """
+        offset, length = self._offsets[segment], self._lengths[segment]
+        end = offset + length
+        try:
+            index = self._values.index(value, offset, end)
+        except ValueError:
+            return False
+        self._values[index:end - 1] = self._values[index + 1:end]
+        self._values[end - 1] = None if self.typecode is None else 0
+        self._lengths[segment] = length - 1
+        self._live -= 1
+        return True
+
+    def free(self, segment: int) -> None:
+        """
+        Releases a segment and its values; its id is reused by a later new_segment().
+        """
+        offset, room = self._offsets[segment], self._rooms[segment]
+        self._values[offset:offset + room] = self._blank_block(room)
+        self._live -= self._lengths[segment]
+        self._dead += room
+        self._offsets[segment] = FREED
+        self._lengths[segment] = 0
+        self._rooms[segment] = 0
+        self._free_segments.append(segment)
+        self._compact_if_sparse()
+
+    def clear(self) -> None:
+        """Removes every segment and value."""
+        self._values = self._empty()
+        self._offsets = array('q')
+        self._lengths = array('q')
+        self._rooms = array('q')
+        self._free_segments = []
+        self._live = 0
+        self._dead = 0
+
+    def compact(self, keep_room: bool = False) -> None:
+        """
+        Moves every live segment to the front of a new pool in id order. Each segment is left exactly the room
+        its values take, or with keep_room the room it had.
+        """
+        old = self._values
+        values = self._empty()
+        offsets, lengths, rooms = self._offsets, self._lengths, self._rooms
+        for segment in range(len(offsets)):
+            offset = offsets[segment]
+            if offset == FREED:
+                continue
+            room = rooms[segment] if keep_room else lengths[segment]
+            offsets[segment] = len(values)
+            rooms[segment] = room
+            values += old[offset:offset + room]
+        self._values = values
+        self._dead = 0
+
+    def _blank_block(self, count: int):
+        """Returns a list or array of count unused slots."""
+        if self.typecode is None:
+            return [None] * count
+        return array(self.typecode, bytes(count * array(self.typecode).itemsize))
+
+    def _grow(self, segment: int) -> int:
+        """
+        Gives a full segment twice its room, or room for one value if it has none, and returns its offset.
+        A segment ending the pool grows in place; any other moves to the end of the pool.
+        """
+        self._compact_if_sparse()
+        offset, room = self._offsets[segment], self._rooms[segment]
+        new_room = max(1, 2 * room)
+        if offset + room == len(self._values):
+            self._values.extend(self._blank(new_room - room))
+        else:
+            moved = self._values[offset:offset + room]
+            self._values[offset:offset + room] = self._blank_block(room)
+            self._dead += room
+            offset = self._offsets[segment] = len(self._values)
+            self._values += moved
+            self._values.extend(self._blank(new_room - room))
+        self._rooms[segment] = new_room
+        return offset
+
+    def _compact_if_sparse(self) -> None:
+        """
+        Moves the segments together, keeping their room, once moved and freed segments have left behind more
+        room than there are live values.
+        """
+        if self._dead > self._live and len(self._values) >= _MIN_COMPACT_VALUES:
+            self.compact(keep_room=True)
+
+
+class MultiHashMap:
+    def __init__(self,
+                 capacity: int = 11,
+                 function: callable = hash_function_1,
+                 value_type: str = None) -> None:
+        """
+        Initialize new multimap, a chaining HashMap from each key to a segment of values in a ValuePool.
+        With value_type (e.g. 'i8' or 'f8'), values are stored unboxed in a typed pool.
+        """
+        self._map = HashMap(capacity, function)
+        self._pool = ValuePool(value_type)
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output
+        """
+        out = ''
+        for key, segment in self._map._items():
+            out += f"{key}: {list(self._pool.get(segment))}\n"
+        return out
+
+    def get_size(self) -> int:
+        """
+        Return the number of keys in the multimap
+        """
+        return self._map.get_size()
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of the underlying hashmap
+        """
+        return self._map.get_capacity()
+
+    def get_value_count(self) -> int:
+        """
+        Return the number of values stored under all keys
+        """
+        return len(self._pool)
+
+    def get_pool(self) -> ValuePool:
+        """
+        Returns the pool holding the multimap's values.
+        """
+        return self._pool
+
+    # ------------------------------------------------------------------ #
+
+    def add(self, key: str, value: object) -> None:
+        """
+        Appends value to the values of key, adding the key if it is not in the multimap.
+        """
+        segment = self._pool.next_segment()
+        found = self._map.setdefault(key, segment)
+        if found == segment:
+            self._pool.new_segment()
+        self._pool.append(found, value)
+
+    def get_all(self, key: str):
+        """
+        Returns the values of key in the order they were added, as a list or as an array for a typed multimap.
+        Returns an empty one if the key is not in the multimap.
+        """
+        segment = self._map.get(key)
+        if segment is None:
+            return self._pool._empty()
+        return self._pool.get(segment)
+
+    def count(self, key: str) -> int:
+        """
+        Returns the number of values of key, or 0 if the key is not in the multimap.
+        """
+        segment = self._map.get(key)
+        if segment is None:
+            return 0
+        return self._pool.length(segment)
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if the key has at least one value. Returns False if not.
+        """
+        return self._map.contains_key(key)
+
+    def remove_one(self, key: str, value: object) -> bool:
+        """
+        Removes the first occurrence of value from the values of key, and the key once it has no values left.
+        Returns True if the value was found.
+        """
+        segment = self._map.get(key)
+        if segment is None or not self._pool.remove_one(segment, value):
+            return False
+        if not self._pool.length(segment):
+            self._map.remove(key)
+            self._pool.free(segment)
+        return True
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the key and all of its values.
+        """
+        segment = self._map.pop(key)
+        if segment is not None:
+            self._pool.free(segment)
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns an array of (key, values) tuples, one for each key in the multimap.
+        """
+        new_array = DynamicArray()
+        for key, segment in self._map._items():
+            new_array.append((key, self._pool.get(segment)))
+        return new_array
+
+    def clear(self) -> None:
+        """
+        Clears the multimap, keeping the capacity of its hashmap.
+        """
+        self._map.clear()
+        self._pool.clear()
+
+    def compact(self) -> None:
+        """
+        Packs every key's values next to each other with no spare room, as group_by() does once it is done.
+        """
+        self._pool.compact()
+
+
+def group_by(iterable, key_function: callable, value_function: callable = None, expected_keys: int = None,
+             function: callable = hash_function_1, value_type: str = None) -> MultiHashMap:
+    """
+    Returns a MultiHashMap holding each item of iterable, or value_function(item), under key_function(item),
+    reading iterable once. The table is sized up front for expected_keys, or for len(iterable) keys if the
+    iterable has a length, so it never grows while the items are added. If far fewer keys turn up, it is
+    shrunk once at the end, and the values are compacted.
+    """
+    if expected_keys is None and hasattr(iterable, '__len__'):
+        expected_keys = len(iterable)
+    capacity = 11 if expected_keys is None else bulk_capacity(expected_keys, SC_DEFAULT_POLICY)
+    multimap = MultiHashMap(capacity, function, value_type)
+
+    add = multimap.add
+    if value_function is None:
+        for item in iterable:
+            add(key_function(item), item)
+    else:
+        for item in iterable:
+            add(key_function(item), value_function(item))
+
+    hash_map = multimap._map
+    fitted = bulk_capacity(hash_map.get_size(), SC_DEFAULT_POLICY)
+    if hash_map.get_capacity() > 2 * fitted:
+        hash_map.resize_table(fitted)
+    multimap.compact()
+    return multimap
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nMultiHashMap example 1")
+    print("----------------------")
+    m = MultiHashMap(11, hash_function_2)
+    for key, value in (('a', 1), ('b', 2), ('a', 3), ('c', 4), ('a', 5), ('b', 6)):
+        m.add(key, value)
+    print(m.get_size(), m.get_value_count(), m.get_all('a'), m.count('b'), m.count('z'), m.get_all('z'))
+    print(m.remove_one('a', 3), m.remove_one('a', 7), m.get_all('a'))
+    print(m.remove_one('c', 4), m.contains_key('c'), m.get_size())
+    print(m)
+
+    print("\nMultiHashMap example 2 - typed values")
+    print("-------------------------------------")
+    m = MultiHashMap(11, hash_function_2, value_type='f8')
+    for i in range(10):
+        m.add('even' if i % 2 == 0 else 'odd', i / 2)
+    print(m.get_all('even'), m.get_all('odd'), m.get_pool().capacity())
+    m.compact()
+    print(m.get_value_count(), m.get_pool().capacity())
+
+    print("\ngroup_by example 1")
+    print("------------------")
+    words = ['apple', 'avocado', 'banana', 'blueberry', 'cherry', 'apricot', 'beet']
+    m = group_by(words, lambda word: word[0], len, function=hash_function_2)
+    print(m.get_capacity(), m.get_keys_and_values())
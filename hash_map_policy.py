@@ -0,0 +1,125 @@
+# Description: Load-factor policy shared by both HashMaps. A policy decides when put() grows the table, when
+#              remove() shrinks it and which capacity each resize targets.
+
+from math import ceil
+
+
+class LoadPolicy:
+    """
+    Resize policy for a hash map
+
+    max_load            table grows before an insert would take the load factor above this value
+    min_load            table shrinks once the load factor falls below this value; 0 disables shrinking
+    growth_factor       capacity is multiplied by this value on every growth
+    shrink_hysteresis   a shrink targets a load of max_load / shrink_hysteresis, so the table has to
+                        grow by this factor again before the next growth is triggered
+    """
+
+    def __init__(self,
+                 max_load: float,
+                 min_load: float = None,
+                 growth_factor: float = 2.0,
+                 shrink_hysteresis: float = 2.0) -> None:
+        """
+        Initialize a policy, defaulting min_load to a quarter of max_load.
+        """
+        if min_load is None:
+            min_load = max_load / 4
+
+        if max_load <= 0:
+            raise ValueError("max_load must be positive")
+        if growth_factor <= 1:
+            raise ValueError("growth_factor must be greater than 1")
+        if shrink_hysteresis < 1:
+            raise ValueError("shrink_hysteresis must be at least 1")
+        if min_load < 0 or min_load >= max_load / shrink_hysteresis:
+            raise ValueError("min_load must be in [0, max_load / shrink_hysteresis)")
+
+        self.max_load = max_load
+        self.min_load = min_load
+        self.growth_factor = growth_factor
+        self.shrink_hysteresis = shrink_hysteresis
+
+    def __repr__(self) -> str:
+        """Override repr method to provide more readable output."""
+        return (f"LoadPolicy(max_load={self.max_load}, min_load={self.min_load}, "
+                f"growth_factor={self.growth_factor}, shrink_hysteresis={self.shrink_hysteresis})")
+
+    def grow_capacity(self, size: int, capacity: int) -> int:
+        """
+        Returns the capacity to grow to before one more element is added, or None if no growth is needed.
+        The new element is counted, so the load factor never exceeds max_load.
+        """
+        if (size + 1) / capacity <= self.max_load:
+            return None
+        return max(capacity + 1, int(capacity * self.growth_factor))
+
+    def shrink_capacity(self, size: int, capacity: int, min_capacity: int) -> int:
+        """
+        Returns the capacity to shrink to after an element was removed, or None if no shrink is needed.
+        The table never shrinks below min_capacity.
+        """
+        if size / capacity >= self.min_load:
+            return None
+        target = max(min_capacity, ceil(size * self.shrink_hysteresis / self.max_load))
+        if target >= capacity:
+            return None
+        return target
+
+
+# Highest max_load for quadratic probing of a prime capacity table, whose probe sequences only reach
+# (capacity + 1) / 2 distinct buckets. grow_capacity() counts the key being inserted, so at this load a table
+# holds at most (capacity - 1) / 2 keys and every probe sequence ends at a free bucket.
+QUADRATIC_MAX_LOAD = 0.5
+
+
+def check_open_addressing(policy: LoadPolicy, power_of_two: bool = False) -> None:
+    """
+    Raises ValueError if policy lets an open addressing table fill up until a probe sequence finds no free
+    bucket: max_load must be below 1 with triangular probing of a power of two table, which visits every
+    bucket, and at most QUADRATIC_MAX_LOAD with quadratic probing of a prime capacity table. Both bounds rely
+    on grow_capacity() growing the table before an insert would exceed max_load.
+    """
+    if power_of_two and policy.max_load >= 1:
+        raise ValueError(f"max_load must be below 1 for open addressing, not {policy.max_load}")
+    if not power_of_two and policy.max_load > QUADRATIC_MAX_LOAD:
+        raise ValueError(f"max_load must be at most {QUADRATIC_MAX_LOAD} for quadratic probing of a prime "
+                         f"capacity table, not {policy.max_load}")
+
+
+# Default policies matching the load factors each HashMap was designed for
+SC_DEFAULT_POLICY = LoadPolicy(1.0)
+OA_DEFAULT_POLICY = LoadPolicy(0.5)
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+    from a6_include import hash_function_1
+    from hash_map_arena import ArenaHashMap
+    from hash_map_oa import HashMap as OAHashMap
+
+    print("\ncheck_open_addressing example 1")
+    print("-------------------------------")
+    for factory in (lambda policy: OAHashMap(11, hash_function_1, policy=policy),
+                    lambda policy: OAHashMap(11, hash_function_1, True, policy),
+                    lambda policy: ArenaHashMap(11, hash_function_1, policy)):
+        for max_load in (0.5, 0.9, 2.0):
+            try:
+                m = factory(LoadPolicy(max_load))
+                for i in range(100):
+                    m.put('key' + str(i), i)
+                print(max_load, m.get_size(), m.get_capacity())
+            except ValueError as error:
+                print(max_load, error)
+
+    print("\ncheck_open_addressing example 2 - probe sequences always end at a free bucket")
+    print("-----------------------------------------------------------------------------")
+    from a6_include import hash_function_2
+
+    # growing only once the load reached 0.5 let these keys fill all 6 buckets that the probe sequence of
+    # 'q7' reaches in a table of capacity 11, so popping it found no free bucket
+    m = OAHashMap(11, hash_function_2)
+    for key in ('k149', 'k36', 'k736', 'k982', 'k164', 'k456'):
+        m.put(key, 1)
+    print(m.get_size(), m.get_capacity(), LoadPolicy(0.5).grow_capacity(5, 11), m.pop('q7', 'missing'))
@@ -0,0 +1,104 @@
+# Description: Prime and power-of-two capacity selection shared by both HashMaps. Primality is decided with a
+#              deterministic Miller-Rabin test, and searches for the next prime are bounded by a precomputed table
+#              of growth primes spaced roughly 2x apart.
+
+from bisect import bisect_left
+
+
+# Each prime is the next prime after twice the one before it, starting from the default capacity of 11,
+# so a map that only grows through put() walks this table exactly.
+GROWTH_PRIMES = (
+    11, 23, 47, 97, 197, 397, 797, 1597, 3203, 6421, 12853, 25717, 51437, 102877, 205759, 411527, 823117,
+    1646237, 3292489, 6584983, 13169977, 26339969, 52679969, 105359939, 210719881, 421439783, 842879579,
+    1685759167, 3371518343, 6743036717, 13486073473, 26972146961, 53944293929, 107888587883, 215777175787,
+    431554351609, 863108703229, 1726217406467, 3452434812973, 6904869625999, 13809739252051, 27619478504183,
+    55238957008387, 110477914016779, 220955828033581, 441911656067171, 883823312134381, 1767646624268779,
+    3535293248537579, 7070586497075177, 14141172994150357, 28282345988300791, 56564691976601587,
+    113129383953203213, 226258767906406483, 452517535812813007, 905035071625626043, 1810070143251252131,
+    3620140286502504283,
+)
+
+_SMALL_PRIMES = (3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41, 43, 47, 53, 59, 61, 67, 71, 73, 79, 83, 89, 97)
+
+# These bases make Miller-Rabin deterministic for every n < 3.3 * 10^24
+_WITNESSES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+
+
+def is_prime(n: int) -> bool:
+    """
+    Returns True if n is prime, using trial division by small primes and then deterministic Miller-Rabin.
+    """
+    if n == 2 or n == 3:
+        return True
+    if n < 2 or n % 2 == 0:
+        return False
+
+    for p in _SMALL_PRIMES:
+        if n % p == 0:
+            return n == p
+    if n < 101 * 101:
+        return True
+
+    # writes n - 1 as d * 2^s with d odd
+    d, s = n - 1, 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+
+    for a in _WITNESSES:
+        x = pow(a, d, n)
+        if x == 1 or x == n - 1:
+            continue
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def next_prime(n: int) -> int:
+    """
+    Returns the smallest odd prime greater than or equal to n.
+    When n is inside the growth table, the search stops at the next table prime without testing it.
+    """
+    if n % 2 == 0:
+        n += 1
+
+    i = bisect_left(GROWTH_PRIMES, n)
+    bound = GROWTH_PRIMES[i] if i < len(GROWTH_PRIMES) else None
+
+    while n != bound and not is_prime(n):
+        n += 2
+    return n
+
+
+def next_power_of_two(n: int) -> int:
+    """
+    Returns the smallest power of two greater than or equal to n, and at least 2.
+    """
+    if n <= 2:
+        return 2
+    return 1 << (n - 1).bit_length()
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nnext_prime example 1")
+    print("--------------------")
+    for n in (0, 1, 2, 20, 30, 53, 106, 10 ** 6, 10 ** 9, 2 * 421439783):
+        print(n, next_prime(n))
+
+    print("\nis_prime example 1")
+    print("------------------")
+    # 561 and 41041 are Carmichael numbers, 3215031751 is a strong pseudoprime to bases 2, 3, 5 and 7
+    for n in (1, 2, 97, 561, 41041, 3215031751, 2 ** 61 - 1):
+        print(n, is_prime(n))
+
+    print("\nnext_power_of_two example 1")
+    print("---------------------------")
+    for n in (0, 3, 8, 11, 1000):
+        print(n, next_power_of_two(n))
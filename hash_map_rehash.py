@@ -0,0 +1,117 @@
+# Description: Parallel rehashing for resize_table() on large maps. The keys are pickled in chunks into one
+#              shared memory block, a process pool hashes each chunk into a shared array of new indexes, and
+#              the map then links every entry into its new table in a single pass. Only the hashing runs in
+#              parallel, since that is where a pure Python hash function spends its time. The pool and shared
+#              memory modules are imported on first use, since importing them takes longer than a small map
+#              lives.
+
+from array import array
+
+from hash_map_keys import hash_key
+from hash_map_serialize import fingerprint, same_hashes, uses_python_hash
+
+
+# Smallest map resize_table() rehashes in a pool; below this, starting the workers costs more than it saves
+PARALLEL_MIN_SIZE = 100000
+
+# Number of keys hashed by a pool worker at a time
+CHUNK_SIZE = 50000
+
+_MASK64 = (1 << 64) - 1
+
+# Settings and shared blocks of the current pool worker, set once by _init_worker
+_function = None
+_capacity = None
+_mask = None
+_same_hashes = False
+_keys_block = None
+_indexes_block = None
+_hashes_block = None
+
+
+def _init_worker(function: callable, capacity: int, mask: int, expected: tuple, keys_name: str,
+                 indexes_name: str, hashes_name: str) -> None:
+    """
+    Stores the hash settings and attaches the shared blocks of a pool worker. expected is the fingerprint of
+    function in the parent process.
+    """
+    from multiprocessing.shared_memory import SharedMemory
+
+    global _function, _capacity, _mask, _same_hashes, _keys_block, _indexes_block, _hashes_block
+    _function, _capacity, _mask = function, capacity, mask
+    _same_hashes = same_hashes(function, expected)
+    # workers share the parent's resource tracker, so attaching does not make them owners of the blocks
+    _keys_block = SharedMemory(keys_name)
+    _indexes_block = SharedMemory(indexes_name)
+    _hashes_block = None if hashes_name is None else SharedMemory(hashes_name)
+
+
+def _hash_chunk(task: tuple) -> bool:
+    """
+    Unpickles the chunk of keys stored at [start, end) of the keys block and writes the new index of each,
+    and its hash if requested, into the shared arrays from position on. Returns False without hashing if the
+    hash function gives different results in this worker than in the parent process.
+    """
+    if not _same_hashes:
+        return False
+    import pickle
+
+    start, end, position = task
+    keys = pickle.loads(_keys_block.buf[start:end])
+    indexes, hashes = array('q'), array('Q')
+    for key in keys:
+        key_hash = _function(key) if type(key) is str else hash_key(key, _function)
+        indexes.append(key_hash & _mask if _mask is not None else key_hash % _capacity)
+        if _hashes_block is not None:
+            hashes.append(key_hash & _MASK64)
+    _indexes_block.buf[8 * position:8 * (position + len(keys))] = indexes.tobytes()
+    if _hashes_block is not None:
+        _hashes_block.buf[8 * position:8 * (position + len(keys))] = hashes.tobytes()
+    return True
+
+
+def rehash(keys: list, function: callable, capacity: int, mask: int, processes: int,
+           with_hashes: bool = False, chunk_size: int = CHUNK_SIZE) -> tuple:
+    """
+    Returns (indexes, hashes): an array('q') holding the index of each key in a table of the given capacity
+    and mask, computed by processes worker processes, and with_hashes an array('Q') of the low 64 bits of
+    each key's hash, or None. function and the keys must be picklable.
+    Returns None if function or the keys hash differently in the workers, as a SeededHash or frozenset keys
+    do when they are spawned rather than forked.
+    """
+    import pickle
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing.shared_memory import SharedMemory
+
+    chunks = [pickle.dumps(keys[i:i + chunk_size], pickle.HIGHEST_PROTOCOL)
+              for i in range(0, len(keys), chunk_size)]
+    keys_block = SharedMemory(create=True, size=max(1, sum(len(chunk) for chunk in chunks)))
+    blocks = [keys_block, SharedMemory(create=True, size=max(8, 8 * len(keys)))]
+    if with_hashes:
+        blocks.append(SharedMemory(create=True, size=max(8, 8 * len(keys))))
+    try:
+        tasks = []
+        offset = 0
+        for n, chunk in enumerate(chunks):
+            keys_block.buf[offset:offset + len(chunk)] = chunk
+            tasks.append((offset, offset + len(chunk), n * chunk_size))
+            offset += len(chunk)
+
+        expected = fingerprint(function, uses_python_hash(keys))
+        initargs = (function, capacity, mask, expected, keys_block.name, blocks[1].name,
+                    blocks[2].name if with_hashes else None)
+        with ProcessPoolExecutor(processes, initializer=_init_worker, initargs=initargs) as pool:
+            if not all(pool.map(_hash_chunk, tasks)):
+                return None
+
+        indexes = array('q')
+        indexes.frombytes(blocks[1].buf[:8 * len(keys)])
+        hashes = None
+        if with_hashes:
+            hashes = array('Q')
+            hashes.frombytes(blocks[2].buf[:8 * len(keys)])
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+    return indexes, hashes
@@ -7,71 +7,89 @@
 #              method and the table uses this to automatically resize if the load factor >= 1.
 
 
-from a6_include import (DynamicArray, LinkedList,
+
+from a6_include import (DynamicArray, LinkedList, SLNode,
                         hash_function_1, hash_function_2)
+from hash_map_buckets import UnallocatedArray
+from hash_map_defense import SC_COLLISION_LIMIT, SeededHash
+from hash_map_hooks import HashMapHook, call_with_hooks
+from hash_map_keys import hash_key
+from hash_map_policy import SC_DEFAULT_POLICY, LoadPolicy
+from hash_map_primes import is_prime, next_power_of_two, next_prime
+from hash_map_setops import difference_maps, intersect_maps, merge_maps, union_maps
+from hash_map_snapshot import HashMapSnapshot
+from hash_map_stats import HashMapStats
 
 
 class HashMap:
     def __init__(self,
                  capacity: int = 11,
-                 function: callable = hash_function_1) -> None:
+                 function: callable = hash_function_1,
+                 power_of_two: bool = False,
+                 policy: LoadPolicy = SC_DEFAULT_POLICY,
+                 collision_limit: int = SC_COLLISION_LIMIT,
+                 value_type: str = None) -> None:
         """
         Initialize new HashMap that uses
-        separate chaining for collision resolution
-        DO NOT CHANGE THIS METHOD IN ANY WAY
+        separate chaining for collision resolution.
+        Buckets are allocated lazily on their first write, and the bucket array on the first write to the map.
+        With power_of_two, capacity is rounded up to a power of two and indexes are computed with a mask.
+        policy controls when put() grows and remove() shrinks the table.
+        A put() into a chain longer than collision_limit switches to a seeded hash function; None disables this.
+        With value_type (e.g. 'i8' or 'f8'), values are stored unboxed in a ValueColumn.
         """
-        self._buckets = DynamicArray()
-
-        # capacity must be a prime number
-        self._capacity = self._next_prime(capacity)
-        for _ in range(self._capacity):
-            self._buckets.append(LinkedList())
+        # capacity must be a prime number, or a power of two in mask mode
+        if power_of_two:
+            self._capacity = next_power_of_two(capacity)
+            self._mask = self._capacity - 1
+        else:
+            self._capacity = self._next_prime(capacity)
+            self._mask = None
+        self._epoch = 0
+        # the bucket and epoch arrays are allocated on the first write
+        self._buckets = self._epochs = UnallocatedArray(self._capacity)
 
         self._hash_function = function
         self._size = 0
+        self._policy = policy
+        self._min_capacity = self._capacity
+        self._nonempty = 0
+        self._stats = None
+        self._hooks = None
+        self._resize_hooks = None
+        self._collision_limit = collision_limit
+        self._next_reseed_size = 0
+        self._values = None
+        if value_type is not None:
+            from hash_map_columns import ValueColumn
+
+            self._values = ValueColumn(value_type)
+        self._filter = None
+        self._snapshots = None
+        self._feed = None
 
     def __str__(self) -> str:
         """
         Override string method to provide more readable output
-        DO NOT CHANGE THIS METHOD IN ANY WAY
         """
         out = ''
         for i in range(self._buckets.length()):
-            out += str(i) + ': ' + str(self._buckets[i]) + '\n'
+            bucket = self._get_bucket(i)
+            out += str(i) + ': ' + (str(bucket) if bucket is not None else 'SLL []') + '\n'
         return out
 
     def _next_prime(self, capacity: int) -> int:
         """
-        Increment from given number and the find the closest prime number
-        DO NOT CHANGE THIS METHOD IN ANY WAY
+        Increment from given number to find the closest prime number
         """
-        if capacity % 2 == 0:
-            capacity += 1
-
-        while not self._is_prime(capacity):
-            capacity += 2
-
-        return capacity
+        return next_prime(capacity)
 
     @staticmethod
     def _is_prime(capacity: int) -> bool:
         """
         Determine if given integer is a prime number and return boolean
-        DO NOT CHANGE THIS METHOD IN ANY WAY
         """
-        if capacity == 2 or capacity == 3:
-            return True
-
-        if capacity == 1 or capacity % 2 == 0:
-            return False
-
-        factor = 3
-        while factor ** 2 <= capacity:
-            if capacity % factor == 0:
-                return False
-            factor += 2
-
-        return True
+        return is_prime(capacity)
 
     def get_size(self) -> int:
         """
@@ -93,48 +111,225 @@ class HashMap:
         """
         Adds a key-value pair to the hash map. If the key already exists, it replaces the value.
         """
+        if self._hooks is not None:
+            return self._run_hooked('put', key, self.put, key, value)
+
         # Check the load factor and resize if necessary
-        if self.table_load() >= 1.0:
-            self.resize_table(2 * self._capacity)
+        new_capacity = self._policy.grow_capacity(self._size, self._capacity)
+        if new_capacity is not None:
+            self._resize(new_capacity)
 
         # Finds the bucket that matches the key
         index = self.get_index(key)
-        bucket = self._buckets[index]
+        bucket = self._get_bucket_for_write(index)
 
         # Check if the key already exists in the bucket
         node = bucket.contains(key)
+        if self._stats is not None:
+            self._stats.record('put', bucket.length(), node is not None)
         if node is not None:
             # If key exists, update the value
-            node.value = value
+            if self._values is None:
+                node.value = value
+            else:
+                self._values.set(node.value, value)
         else:
             # If key does not exist, insert new key-value pair and increment size
-            bucket.insert(key, value)
-            self._size += 1
+            self._insert(bucket, key, value)
+        if self._feed is not None:
+            self._feed.record('put', key, value)
+
+    def increment(self, key: str, delta: object = 1) -> object:
+        """
+        Adds delta to the value of key in place and returns the new value.
+        If the key is not in the hashmap, it is added with delta as its value.
+        """
+        if self._hooks is not None:
+            return self._run_hooked('increment', key, self.increment, key, delta)
+
+        bucket, node = self._find_node_for_write(key, 'increment')
+        if node is None:
+            self._insert(bucket, key, delta)
+            value = delta
+        elif self._values is not None:
+            value = self._values.add(node.value, delta)
+        else:
+            node.value += delta
+            value = node.value
+        if self._feed is not None:
+            self._feed.record('put', key, value)
+        return value
+
+    def setdefault(self, key: str, default: object = None) -> object:
+        """
+        Returns the value of key. If the key is not in the hashmap, it is added with default as its value first.
+        """
+        if self._hooks is not None:
+            return self._run_hooked('setdefault', key, self.setdefault, key, default)
+
+        bucket, node = self._find_node_for_write(key, 'setdefault')
+        if node is None:
+            self._insert(bucket, key, default)
+            if self._feed is not None:
+                self._feed.record('put', key, default)
+            return default
+        if self._values is not None:
+            return self._values.get(node.value)
+        return node.value
+
+    def update_with(self, key: str, function: callable, default: object = None) -> object:
+        """
+        Replaces the value of key with function(value) and returns the new value.
+        If the key is not in the hashmap, it is added with function(default) as its value.
+        """
+        if self._hooks is not None:
+            return self._run_hooked('update_with', key, self.update_with, key, function, default)
+
+        bucket, node = self._find_node_for_write(key, 'update_with')
+        if node is None:
+            value = function(default)
+            self._insert(bucket, key, value)
+        elif self._values is None:
+            value = node.value = function(node.value)
+        else:
+            value = function(self._values.get(node.value))
+            self._values.set(node.value, value)
+        if self._feed is not None:
+            self._feed.record('put', key, value)
+        return value
+
+    def pop(self, key: str, default: object = None) -> object:
+        """
+        Removes key from the hashmap and returns its value, or returns default if the key is not in the hashmap.
+        """
+        if self._hooks is not None:
+            return self._run_hooked('pop', key, self.pop, key, default)
 
-    def resize_table(self, new_capacity: int) -> None:
+        index = self.get_index(key)
+        bucket = self._get_bucket(index)
+        length = 0 if bucket is None else bucket.length()
+        node = None if length == 0 else bucket.contains(key)
+        if self._stats is not None:
+            self._stats.record('pop', length, node is not None)
+        if node is None:
+            return default
+        if self._snapshots is not None:
+            self._preserve(index)
+        value = node.value
+        if self._values is not None:
+            value = self._values.get(node.value)
+            self._values.release(node.value)
+        bucket.remove(key)
+        if self._feed is not None:
+            self._feed.record('remove', key)
+        self._removed(length)
+        return value
+
+    def resize_table(self, new_capacity: int, processes: int = None) -> None:
         """
-        Increases the capacity of the array.
+        Changes the capacity of the array. The resulting capacity is reserved:
+        automatic shrinking in remove() never goes below it.
+        With processes, maps of at least PARALLEL_MIN_SIZE keys are rehashed in a pool of that many worker
+        processes, so the hash function and keys must be picklable.
         """
         # checks that new_capacity is valid
         if new_capacity < 1:
             return
+        self._resize(new_capacity, processes)
+        self._min_capacity = self._capacity
+
+    def _resize(self, new_capacity: int, processes: int = None) -> None:
+        """
+        Rehashes every element into a new array of at least new_capacity buckets.
+        """
+        if self._resize_hooks is not None:
+            return self._run_resize_hooked(new_capacity, processes)
+
+        # rehashing puts are not recorded as operations or changes
+        stats, self._stats = self._stats, None
+        feed, self._feed = self._feed, None
+        if stats is not None:
+            started = stats.start_resize()
+
         # updates new_capacity to next prime number if it is not already prime
-        if not self._is_prime(new_capacity):
+        if self._mask is not None:
+            new_capacity = next_power_of_two(new_capacity)
+            self._mask = new_capacity - 1
+        elif not self._is_prime(new_capacity):
             new_capacity = self._next_prime(new_capacity)
 
-        # creates an array of empty buckets of size new_capacity
-        old_buckets = self._buckets
-        self._buckets = DynamicArray()
-        for _ in range(new_capacity):
-            self._buckets.append(LinkedList())
+        # snapshots keep the old array, which is not written to after this point
+        if self._snapshots is not None:
+            self._detach_snapshots()
+
+        # creates an array of unallocated buckets of size new_capacity
+        old_buckets, old_epochs, old_epoch = self._buckets, self._epochs, self._epoch
+        parallel = False
+        if processes is not None:
+            from hash_map_rehash import PARALLEL_MIN_SIZE
+
+            parallel = self._size >= PARALLEL_MIN_SIZE
+        # with typed values, nodes hold column slots that are carried over unchanged
+        values, self._values = self._values, None
+        if self._filter is not None:
+            # re-inserting every key refills the filter, now sized for the new capacity
+            self._filter.reset(self._expected_keys(new_capacity))
+        self._allocate_buckets(new_capacity)
         self._capacity = new_capacity
         self._size = 0
+        self._nonempty = 0
+
+        # copies key-value pairs from the live buckets of old_buckets to new array
+        if not parallel or not self._rehash_in_pool(old_buckets, old_epochs, old_epoch, processes):
+            for i in range(old_buckets.length()):
+                current_bucket = old_buckets[i]
+                if current_bucket is None or old_epochs[i] != old_epoch:
+                    continue
+                for element in current_bucket:
+                    self.put(element.key, element.value)
+        self._values = values
+
+        if stats is not None:
+            self._stats = stats
+            stats.chain_lengths.clear()
+            self._count_chains()
+            stats.end_resize(started)
+        if feed is not None:
+            self._feed = feed
+            feed.record('resize', new_capacity)
 
-        # copies key-value pairs from old_buckets to new array
+    def _rehash_in_pool(self, old_buckets: DynamicArray, old_epochs: DynamicArray, old_epoch: int,
+                        processes: int) -> bool:
+        """
+        Links every element of the live buckets of old_buckets into the new, empty bucket array in one pass,
+        with the new indexes computed by a pool of processes worker processes. Chains are not checked
+        against the collision limit here; the next put() into a long chain still re-seeds.
+        Returns False, leaving the new array empty, if the hash function gives different results in the workers.
+        """
+        from hash_map_rehash import rehash
+        from hash_map_serialize import GCPaused
+
+        keys, values = [], []
         for i in range(old_buckets.length()):
-            current_bucket = old_buckets[i]
-            for element in current_bucket:
-                self.put(element.key, element.value)
+            bucket = old_buckets[i]
+            if bucket is None or old_epochs[i] != old_epoch:
+                continue
+            for node in bucket:
+                keys.append(node.key)
+                values.append(node.value)
+        rehashed = rehash(keys, self._hash_function, self._capacity, self._mask, processes, self._filter is not None)
+        if rehashed is None:
+            return False
+        indexes, hashes = rehashed
+        with GCPaused():
+            buckets, _ = self._link(keys, values, indexes, None)
+        self._buckets = DynamicArray(buckets)
+        self._size = len(keys)
+        self._nonempty = sum(bucket is not None for bucket in buckets)
+        if hashes is not None:
+            for key_hash in hashes:
+                self._filter.add(key_hash)
+        return True
 
     def table_load(self) -> float:
         """
@@ -146,46 +341,85 @@ class HashMap:
     def empty_buckets(self) -> int:
         """
         Returns the number of empty buckets in the array.
+        The count of non-empty buckets is maintained by put() and remove(), so this runs in O(1).
         """
-        empties = 0
-        for i in range(self._capacity):
-            if self._buckets[i].length() == 0:
-                empties += 1
-        return empties
+        return self._capacity - self._nonempty
 
     def get(self, key: str):
         """
         Returns the value of the key in the hashmap. If the key is not in the hashmap, returns None.
         """
-        if self.contains_key(key) is False:
+        if self._hooks is not None:
+            return self._run_hooked('get', key, self.get, key)
+
+        node = self._find_node(key, 'get')
+        if node is None:
             return None
-        index = self.get_index(key)
-        bucket = self._buckets[index]
-        for element in bucket:
-            if element.key == key:
-                return element.value
-        return None
+        if self._values is not None:
+            return self._values.get(node.value)
+        return node.value
 
     def contains_key(self, key: str) -> bool:
         """
         Returns True if the key is in the hash map. Returns False if it is not.
         """
-        index = self.get_index(key)
-        for i in range(self._capacity):
-            if self._buckets[i] == self._buckets[index] and self._buckets[i].contains(key):
-                return True
-        return False
+        return self._find_node(key, 'contains_key') is not None
 
     def remove(self, key: str) -> None:
         """
         Removes a key-value pair from the hashmap if the key matches the parameter.
         """
-        if self.contains_key(key) is False:
-            return
+        if self._hooks is not None:
+            return self._run_hooked('remove', key, self.remove, key)
+
         index = self.get_index(key)
-        bucket = self._buckets[index]
-        bucket.remove(key)
-        self._size -= 1
+        bucket = self._get_bucket(index)
+        length = 0 if bucket is None else bucket.length()
+        if self._snapshots is not None and length > 0:
+            self._preserve(index)
+        if self._values is not None and length > 0:
+            node = bucket.contains(key)
+            if node is not None:
+                self._values.release(node.value)
+        removed = length > 0 and bucket.remove(key)
+        if self._stats is not None:
+            self._stats.record('remove', length, removed)
+        if removed:
+            if self._feed is not None:
+                self._feed.record('remove', key)
+            self._removed(length)
+
+    def intersect(self, other, processes: int = None) -> "HashMap":
+        """
+        Returns a new hashmap with the keys found in both maps and their values from this map.
+        With processes, the larger map is probed in a pool of that many worker processes.
+        """
+        if processes is None and self._aligned_with(other):
+            return self._aligned_intersect(other)
+        return intersect_maps(self, other, processes)
+
+    def difference(self, other, processes: int = None) -> "HashMap":
+        """
+        Returns a new hashmap with the keys of this map that are not in other, and their values.
+        """
+        if processes is None and self._aligned_with(other):
+            return self._aligned_difference(other)
+        return difference_maps(self, other, processes)
+
+    def union(self, other, processes: int = None) -> "HashMap":
+        """
+        Returns a new hashmap with the keys of both maps, taking the value from this map for keys in both.
+        """
+        return union_maps(self, other, processes)
+
+    def merge(self, other, resolver: callable = None, processes: int = None) -> None:
+        """
+        Adds every key-value pair of other to this map. For keys already in this map, the value becomes
+        resolver(key, mine, theirs), or other's value if resolver is None.
+        """
+        if processes is None and self._aligned_with(other):
+            return self._aligned_merge(other, resolver)
+        merge_maps(self, other, resolver, processes)
 
     def get_keys_and_values(self) -> DynamicArray:
         """
@@ -193,26 +427,636 @@ class HashMap:
         """
         new_array = DynamicArray()
         for i in range(self._capacity):
-            current_bucket = self._buckets[i]
+            current_bucket = self._get_bucket(i)
+            if current_bucket is None:
+                continue
             for element in current_bucket:
-                new_array.append((element.key, element.value))
+                if self._values is None:
+                    new_array.append((element.key, element.value))
+                else:
+                    new_array.append((element.key, self._values.get(element.value)))
         return new_array
 
     def clear(self) -> None:
         """
         Clears the hashmap, keeping the capacity the same.
+        Runs in O(1) by advancing the epoch, which marks every bucket written before it as empty.
         """
-        self._buckets = DynamicArray()
-        for _ in range(self._capacity):
-            self._buckets.append(LinkedList())
+        self._epoch += 1
         self._size = 0
+        self._nonempty = 0
+        if self._values is not None:
+            if self._snapshots is not None:
+                # snapshots still read the old column for the buckets they share
+                self._values = type(self._values)(self._values.value_type)
+            else:
+                self._values.clear()
+        if self._filter is not None:
+            self._filter.reset()
+        if self._stats is not None:
+            self._stats.chain_lengths.clear()
+        if self._feed is not None:
+            self._feed.record('clear')
 
     def get_index(self, key: str) -> int:
         """
         Returns the integer index of a given key.
         """
-        index = self._hash_function(key) % self._capacity
+        # str keys go straight to the hash function, other key types are dispatched by hash_key
+        if type(key) is str:
+            key_hash = self._hash_function(key)
+        else:
+            key_hash = hash_key(key, self._hash_function)
+        if self._mask is not None:
+            return key_hash & self._mask
+        index = key_hash % self._capacity
         return index
+
+    def _key_hash(self, key: str) -> int:
+        """
+        Returns the hash get_index() reduces to an index.
+        """
+        if type(key) is str:
+            return self._hash_function(key)
+        return hash_key(key, self._hash_function)
+
+    def _hash_index(self, key_hash: int) -> int:
+        """
+        Returns the index of a key with the given hash.
+        """
+        if self._mask is not None:
+            return key_hash & self._mask
+        return key_hash % self._capacity
+
+    def enable_stats(self) -> HashMapStats:
+        """
+        Starts recording operation statistics and returns the HashMapStats object they are recorded into.
+        The chain length histogram is initialized from the current buckets.
+        """
+        if self._stats is None:
+            self._stats = HashMapStats()
+            self._count_chains()
+        return self._stats
+
+    def disable_stats(self) -> None:
+        """
+        Stops recording operation statistics and discards them.
+        """
+        self._stats = None
+
+    def snapshot(self) -> HashMapSnapshot:
+        """
+        Returns a read-only view of the hashmap as it is now, in O(1).
+        The view shares the bucket array; later writes first copy the segment of buckets they change into
+        every live view, so reading a view never blocks writers and always sees the same keys and values.
+        """
+        import weakref
+
+        snapshot = HashMapSnapshot(self, False)
+        if self._snapshots is None:
+            self._snapshots = weakref.WeakSet()
+        self._snapshots.add(snapshot)
+        return snapshot
+
+    @staticmethod
+    def _read_slot(buckets: DynamicArray, epochs: DynamicArray, epoch: int, values: "ValueColumn",
+                   index: int) -> tuple:
+        """
+        Returns the (key, value) pairs of a bucket as a tuple, for snapshots.
+        """
+        if epochs[index] != epoch or buckets[index] is None:
+            return ()
+        if values is None:
+            return tuple((node.key, node.value) for node in buckets[index])
+        return tuple((node.key, values.get(node.value)) for node in buckets[index])
+
+    def _preserve(self, index: int) -> None:
+        """
+        Has every live snapshot copy the segment holding index before it is changed.
+        """
+        if not self._snapshots:
+            self._snapshots = None
+            return
+        for snapshot in self._snapshots:
+            snapshot._preserve(index)
+
+    def _detach_snapshots(self) -> None:
+        """
+        Hands the current bucket array over to the live snapshots before it is replaced.
+        """
+        frozen_values = None if self._values is None else self._values.copy()
+        for snapshot in self._snapshots:
+            snapshot._detach(self._values, frozen_values)
+        self._snapshots = None
+
+    def enable_filter(self, bits_per_key: int = 10, hashes: int = None) -> "BloomFilter":
+        """
+        Puts a Bloom filter in front of get() and contains_key() and returns it. Lookups of keys the filter
+        rules out return without touching any bucket. The filter is rebuilt on every resize and once a
+        quarter of the keys it holds have been removed.
+        """
+        if self._filter is None:
+            from hash_map_bloom import BloomFilter
+
+            self._filter = BloomFilter(self._expected_keys(self._capacity), bits_per_key, hashes)
+            self._rebuild_filter()
+        return self._filter
+
+    def disable_filter(self) -> None:
+        """
+        Removes the Bloom filter.
+        """
+        self._filter = None
+
+    def get_filter(self) -> "BloomFilter":
+        """
+        Returns the Bloom filter added by enable_filter(), or None.
+        """
+        return self._filter
+
+    def enable_feed(self, capacity: int = 65536) -> "ChangeFeed":
+        """
+        Starts recording every put, remove, clear and resize into a ChangeFeed of up to capacity changes and
+        returns it. increment(), setdefault(), update_with() and merge() are recorded as puts of the value they
+        leave, and pop() as a remove. Replicas catch up with hash_map_feed.catch_up().
+        """
+        if self._feed is None:
+            from hash_map_feed import ChangeFeed
+
+            self._feed = ChangeFeed(capacity)
+        return self._feed
+
+    def disable_feed(self) -> None:
+        """
+        Stops recording changes and discards the feed.
+        """
+        self._feed = None
+
+    def get_feed(self) -> "ChangeFeed":
+        """
+        Returns the ChangeFeed added by enable_feed(), or None.
+        """
+        return self._feed
+
+    def _expected_keys(self, capacity: int) -> int:
+        """
+        Returns how many keys a table of the given capacity can hold before the load policy grows it.
+        """
+        return int(capacity * self._policy.max_load) + 1
+
+    def _rebuild_filter(self) -> None:
+        """
+        Replaces the Bloom filter with one holding exactly the keys currently in the hashmap.
+        """
+        self._filter.reset(self._expected_keys(self._capacity))
+        for key, _ in self._items():
+            self._filter.add(self._key_hash(key))
+
+    def get_stats(self) -> dict:
+        """
+        Returns the recorded statistics together with the current table gauges as a dictionary,
+        or None if statistics are not enabled.
+        """
+        if self._stats is None:
+            return None
+        stats = self._stats.as_dict()
+        stats.update(size=self._size, capacity=self._capacity, load=self.table_load(),
+                     empty_buckets=self.empty_buckets())
+        return stats
+
+    def _count_chains(self) -> None:
+        """
+        Adds every current bucket to the chain length histogram of the recorded statistics.
+        """
+        for i in range(self._capacity):
+            bucket = self._get_bucket(i)
+            if bucket is not None:
+                self._stats.record_chain_change(0, bucket.length())
+
+    def get_value_column(self) -> "ValueColumn":
+        """
+        Returns the ValueColumn holding the values of a map created with value_type, or None.
+        Its sum(), max(), min() and histogram() aggregate every value without visiting the buckets.
+        """
+        return self._values
+
+    def _insert(self, bucket: LinkedList, key: str, value: object) -> None:
+        """
+        Adds a key that is not yet in bucket, updating the size, bucket count and statistics, and re-seeds
+        the hash function if the chain has grown past the collision limit.
+        """
+        length = bucket.length()
+        bucket.insert(key, value if self._values is None else self._values.append(value))
+        self._size += 1
+        if length == 0:
+            self._nonempty += 1
+        if self._stats is not None:
+            self._stats.record_chain_change(length, length + 1)
+        if self._filter is not None:
+            self._filter.add(self._key_hash(key))
+        if self._collision_limit is not None and length >= self._collision_limit:
+            self._reseed()
+
+    def _find_node_for_write(self, key: str, operation: str) -> tuple:
+        """
+        Grows the table if needed, then returns (bucket, node) for key, where node is None if the key is not in
+        the hashmap and bucket is where it belongs.
+        """
+        # Check the load factor and resize if necessary
+        new_capacity = self._policy.grow_capacity(self._size, self._capacity)
+        if new_capacity is not None:
+            self._resize(new_capacity)
+
+        bucket = self._get_bucket_for_write(self.get_index(key))
+        node = bucket.contains(key)
+        if self._stats is not None:
+            self._stats.record(operation, bucket.length(), node is not None)
+        return bucket, node
+
+    def _removed(self, length: int) -> None:
+        """
+        Updates the size, bucket count and statistics after a key was removed from a chain of the given length,
+        and shrinks the table if needed.
+        """
+        self._size -= 1
+        if length == 1:
+            self._nonempty -= 1
+        if self._stats is not None:
+            self._stats.record_chain_change(length, length - 1)
+        if self._filter is not None:
+            self._filter.removed += 1
+            if self._filter.needs_rebuild():
+                self._rebuild_filter()
+
+        # Check the load factor and shrink if necessary
+        new_capacity = self._policy.shrink_capacity(self._size, self._capacity, self._min_capacity)
+        if new_capacity is not None:
+            self._resize(new_capacity)
+
+    def add_hook(self, hook: HashMapHook) -> None:
+        """
+        Registers a hook to be called before and after every put, get, remove and resize_table.
+        Resizes triggered by put and remove are reported nested inside that operation.
+        """
+        hooks = (self._resize_hooks or ()) + (hook,)
+        self._hooks = self._resize_hooks = hooks
+
+    def remove_hook(self, hook: HashMapHook) -> None:
+        """
+        Unregisters a hook added with add_hook().
+        """
+        hooks = tuple(h for h in self._resize_hooks or () if h is not hook)
+        self._hooks = self._resize_hooks = hooks or None
+
+    def _run_hooked(self, operation: str, key: str, method: callable, *args) -> object:
+        """
+        Calls method with the operation hooks suspended, so it runs its unhooked path, between the hook callbacks.
+        """
+        hooks, self._hooks = self._hooks, None
+        try:
+            return call_with_hooks(self, hooks, operation, key, method, *args)
+        finally:
+            self._hooks = hooks
+
+    def _run_resize_hooked(self, new_capacity: int, processes: int = None) -> None:
+        """
+        Calls _resize between the hook callbacks, with all hooks suspended while the elements are rehashed.
+        """
+        hooks, operation_hooks = self._resize_hooks, self._hooks
+        self._resize_hooks = self._hooks = None
+        try:
+            call_with_hooks(self, hooks, 'resize_table', new_capacity, self._resize, new_capacity, processes)
+        finally:
+            self._resize_hooks, self._hooks = hooks, operation_hooks
+
+    def _reseed(self) -> None:
+        """
+        Switches to a SeededHash with a fresh seed and rehashes every element at the current capacity.
+        Re-seeding again requires the size to double first, so keys that collide under every seed can't
+        trigger a rehash on each put.
+        """
+        if self._size < self._next_reseed_size:
+            return
+        self._next_reseed_size = 2 * self._size
+        self._hash_function = SeededHash()
+        if self._stats is not None:
+            self._stats.reseeds += 1
+        self._resize(self._capacity)
+
+    def _lookup(self, key: str, missing: object) -> object:
+        """
+        Returns the value of key, or missing if the key is not in the hashmap.
+        """
+        node = self._find_node(key, 'get')
+        if node is None:
+            return missing
+        if self._values is not None:
+            return self._values.get(node.value)
+        return node.value
+
+    def _items(self):
+        """
+        Yields every (key, value) pair in bucket order.
+        """
+        for i in range(self._capacity):
+            bucket = self._get_bucket(i)
+            if bucket is None:
+                continue
+            for node in bucket:
+                if self._values is None:
+                    yield node.key, node.value
+                else:
+                    yield node.key, self._values.get(node.value)
+
+    def _empty_like(self) -> "HashMap":
+        """
+        Returns an empty hashmap with the same capacity, hash function and settings as this one.
+        """
+        return HashMap(self._capacity, self._hash_function, self._mask is not None, self._policy,
+                       self._collision_limit, None if self._values is None else self._values.value_type)
+
+    def _copy(self) -> "HashMap":
+        """
+        Returns a copy of this hashmap built bucket by bucket, without rehashing any key.
+        """
+        copy = self._empty_like()
+        for i in range(self._capacity):
+            bucket = self._get_bucket(i)
+            if bucket is None or bucket.length() == 0:
+                continue
+            copied = copy._get_bucket_for_write(i)
+            for node in bucket:
+                copied.insert(node.key, node.value)
+        copy._size = self._size
+        copy._nonempty = self._nonempty
+        copy._next_reseed_size = self._next_reseed_size
+        if self._values is not None:
+            copy._values = self._values.copy()
+        return copy
+
+    def export_columns(self) -> dict:
+        """
+        Returns the hashmap as flat columns: a list of keys, their values and an array('q') of the bucket
+        index of each key, together with the settings from_columns() needs to rebuild the same table.
+        Typed values are exported as an array of the value type.
+        """
+        from array import array
+
+        from hash_map_serialize import fingerprint, uses_python_hash
+
+        keys, values, indexes = [], [], array('q')
+        for i in range(self._capacity):
+            bucket = self._get_bucket(i)
+            if bucket is None:
+                continue
+            for node in bucket:
+                keys.append(node.key)
+                values.append(node.value)
+                indexes.append(i)
+        value_type = None
+        if self._values is not None:
+            value_type = self._values.value_type
+            values = array(self._values.typecode, [self._values.get(slot) for slot in values])
+        return {'keys': keys, 'values': values, 'indexes': indexes, 'capacity': self._capacity,
+                'function': self._hash_function, 'power_of_two': self._mask is not None,
+                'policy': self._policy, 'collision_limit': self._collision_limit, 'value_type': value_type,
+                'min_capacity': self._min_capacity, 'next_reseed_size': self._next_reseed_size,
+                'fingerprint': fingerprint(self._hash_function, uses_python_hash(keys))}
+
+    @classmethod
+    def from_columns(cls, columns: dict) -> "HashMap":
+        """
+        Builds a hashmap from columns shaped like those of export_columns() in one pass, linking every key
+        straight into its bucket without calling put() and without resizing. Only 'keys' and 'values' are
+        required; without 'indexes' each key is hashed once, into a table sized up front for all of them.
+        """
+        from hash_map_columns import ValueColumn
+        from hash_map_serialize import GCPaused, bulk_capacity, column_view, same_hashes
+
+        keys, values, indexes = columns['keys'], columns['values'], columns.get('indexes')
+        function = columns.get('function', hash_function_1)
+        expected = columns.get('fingerprint')
+        if indexes is not None and expected is not None and not same_hashes(function, expected):
+            # the keys hash differently in this process, so they are hashed again
+            indexes = None
+        policy = columns.get('policy', SC_DEFAULT_POLICY)
+        capacity = columns.get('capacity', 11)
+        if indexes is None:
+            capacity = max(capacity, bulk_capacity(len(keys), policy))
+        hash_map = cls(capacity, function, columns.get('power_of_two', False), policy,
+                       columns.get('collision_limit', SC_COLLISION_LIMIT), columns.get('value_type'))
+        if indexes is not None:
+            # keep the exported capacity even where the constructor would have rounded it
+            hash_map._capacity = capacity
+            if hash_map._mask is not None:
+                hash_map._mask = capacity - 1
+        hash_map._allocate_buckets(hash_map._capacity)
+
+        column = hash_map._values
+        if column is not None:
+            column = ValueColumn.from_values(column.value_type, column_view(values, column.typecode))
+            values = range(len(keys))
+        with GCPaused():
+            if indexes is not None:
+                linked = hash_map._link(keys, values, column_view(indexes, 'q'), None)
+            else:
+                linked = hash_map._link(keys, values, [hash_map.get_index(key) for key in keys],
+                                        hash_map._collision_limit)
+                if linked is None:
+                    # the keys collide under this hash function, so switch to a seeded one as put() would
+                    hash_map._hash_function = SeededHash()
+                    hash_map._next_reseed_size = 2 * len(keys)
+                    linked = hash_map._link(keys, values, [hash_map.get_index(key) for key in keys], None)
+        buckets, replaced = linked
+        if column is not None:
+            for slot in replaced:
+                column.release(slot)
+
+        hash_map._buckets = DynamicArray(buckets)
+        hash_map._values = column
+        hash_map._size = len(keys) - len(replaced)
+        hash_map._nonempty = sum(bucket is not None for bucket in buckets)
+        hash_map._min_capacity = columns.get('min_capacity', hash_map._min_capacity)
+        hash_map._next_reseed_size = columns.get('next_reseed_size', hash_map._next_reseed_size)
+        return hash_map
+
+    def _link(self, keys: list, values, indexes, collision_limit: int) -> tuple:
+        """
+        Links every key into a new list of buckets at its index and returns (buckets, replaced): a repeated
+        key keeps its last value, and replaced holds the ones it overwrote.
+        Returns None as soon as a chain grows past collision_limit.
+        """
+        buckets = [None] * self._capacity
+        replaced = []
+        for key, value, index in zip(keys, values, indexes):
+            bucket = buckets[index]
+            if bucket is None:
+                bucket = buckets[index] = LinkedList()
+            else:
+                node = bucket.contains(key)
+                if node is not None:
+                    replaced.append(node.value)
+                    node.value = value
+                    continue
+                if collision_limit is not None and bucket.length() >= collision_limit:
+                    return None
+            bucket.insert(key, value)
+        return buckets, replaced
+
+    def __reduce_ex__(self, protocol: int) -> tuple:
+        """
+        Pickles the hashmap as the flat columns of export_columns(), which from_columns() rebuilds without
+        hashing any key. Under protocol 5 the index and typed value arrays become pickle buffers, sent
+        out-of-band when the pickler has a buffer_callback. Statistics, hooks, the Bloom filter, snapshots and
+        the change feed are not pickled.
+        """
+        from hash_map_serialize import reduce_columns
+
+        return self.from_columns, (reduce_columns(self.export_columns(), protocol),)
+
+    def _aligned_with(self, other) -> bool:
+        """
+        Returns True if other is a chaining hashmap that puts every key in the same bucket as this one.
+        """
+        return (type(other) is HashMap and other._capacity == self._capacity and other._mask == self._mask
+                and other._hash_function is self._hash_function)
+
+    def _aligned_intersect(self, other: "HashMap") -> "HashMap":
+        """
+        Returns a new hashmap with the keys in both this map and the aligned map other. Only the buckets used
+        by the smaller map are visited, and each chain is only compared with the chain in the same bucket of
+        the larger map, so no key is hashed.
+        """
+        small, large = (self, other) if self._size <= other._size else (other, self)
+        result = self._empty_like()
+        # the result's buckets must keep matching this map's until it is complete
+        result._collision_limit = None
+        for i in range(self._capacity):
+            bucket = small._get_bucket(i)
+            if bucket is None or bucket.length() == 0:
+                continue
+            large_bucket = large._get_bucket(i)
+            if large_bucket is None:
+                continue
+            for node in bucket:
+                match = large_bucket.contains(node.key)
+                if match is not None:
+                    mine = node if small is self else match
+                    value = mine.value if self._values is None else self._values.get(mine.value)
+                    result._insert(result._get_bucket_for_write(i), node.key, value)
+        result._collision_limit = self._collision_limit
+        return result
+
+    def _aligned_difference(self, other: "HashMap") -> "HashMap":
+        """
+        Returns a new hashmap with the keys of this map that are not in the aligned map other. Each chain is
+        only compared with the chain in the same bucket of other, so no key is hashed.
+        """
+        result = self._empty_like()
+        # the result's buckets must keep matching this map's until it is complete
+        result._collision_limit = None
+        for i in range(self._capacity):
+            bucket = self._get_bucket(i)
+            if bucket is None or bucket.length() == 0:
+                continue
+            other_bucket = other._get_bucket(i)
+            for node in bucket:
+                if other_bucket is None or other_bucket.contains(node.key) is None:
+                    value = node.value if self._values is None else self._values.get(node.value)
+                    result._insert(result._get_bucket_for_write(i), node.key, value)
+        result._collision_limit = self._collision_limit
+        return result
+
+    def _aligned_merge(self, other: "HashMap", resolver: callable) -> None:
+        """
+        Merges the aligned map other into this one chain by chain without hashing any key, then grows the
+        table once if it is now overloaded.
+        """
+        collision_limit, self._collision_limit = self._collision_limit, None
+        for i in range(self._capacity):
+            other_bucket = other._get_bucket(i)
+            if other_bucket is None or other_bucket.length() == 0:
+                continue
+            bucket = self._get_bucket_for_write(i)
+            for other_node in other_bucket:
+                value = other_node.value if other._values is None else other._values.get(other_node.value)
+                node = bucket.contains(other_node.key)
+                if node is None:
+                    self._insert(bucket, other_node.key, value)
+                else:
+                    if resolver is not None:
+                        mine = node.value if self._values is None else self._values.get(node.value)
+                        value = resolver(other_node.key, mine, value)
+                    if self._values is None:
+                        node.value = value
+                    else:
+                        self._values.set(node.value, value)
+                if self._feed is not None:
+                    self._feed.record('put', other_node.key, value)
+        self._collision_limit = collision_limit
+
+        capacity = self._capacity
+        new_capacity = self._policy.grow_capacity(self._size, capacity)
+        while new_capacity is not None:
+            capacity = new_capacity
+            new_capacity = self._policy.grow_capacity(self._size, capacity)
+        if capacity != self._capacity:
+            self._resize(capacity)
+
+    def _find_node(self, key: str, operation: str) -> SLNode:
+        """
+        Returns the node holding key, or None if the key is not in the hashmap.
+        With a Bloom filter, keys it rules out are reported missing without looking at their bucket.
+        """
+        if self._filter is None:
+            bucket = self._get_bucket(self.get_index(key))
+        else:
+            key_hash = self._key_hash(key)
+            if not self._filter.might_contain(key_hash):
+                if self._stats is not None:
+                    self._stats.record(operation, 0, False)
+                return None
+            bucket = self._get_bucket(self._hash_index(key_hash))
+        node = None if bucket is None else bucket.contains(key)
+        if self._stats is not None:
+            self._stats.record(operation, 0 if bucket is None else bucket.length(), node is not None)
+        if node is None and self._filter is not None:
+            self._filter.record_false_positive()
+        return node
+
+    def _allocate_buckets(self, capacity: int) -> None:
+        """
+        Creates a bucket array of the given capacity without allocating any LinkedList objects.
+        """
+        self._buckets = DynamicArray([None] * capacity)
+        self._epochs = DynamicArray([self._epoch] * capacity)
+
+    def _get_bucket(self, index: int) -> LinkedList:
+        """
+        Returns the bucket at the given index, or None if it has not been written since the last clear.
+        """
+        if self._epochs[index] != self._epoch:
+            return None
+        return self._buckets[index]
+
+    def _get_bucket_for_write(self, index: int) -> LinkedList:
+        """
+        Returns the bucket at the given index, allocating a new LinkedList if it is unallocated or stale, and
+        the bucket array itself on the first write to the hashmap.
+        Snapshots sharing the bucket get their copy first, since the caller is about to change it.
+        """
+        if self._snapshots is not None:
+            self._preserve(index)
+        bucket = self._get_bucket(index)
+        if bucket is None:
+            if type(self._buckets) is UnallocatedArray:
+                self._allocate_buckets(self._capacity)
+            bucket = LinkedList()
+            self._buckets[index] = bucket
+            self._epochs[index] = self._epoch
+        return bucket
+
+
 def find_mode(da: DynamicArray) -> tuple[DynamicArray, int]:
     """
     Takes an unsorted dynamic array as a parameter and returns a tuple of the most frequently occuring values,
@@ -223,18 +1067,10 @@ def find_mode(da: DynamicArray) -> tuple[DynamicArray, int]:
     max_frequency = 0
     mode_array = DynamicArray()
 
-    # iterates through da and checks if the value has been added to map
+    # counts each value with a single lookup, adding it with a frequency of 1 the first time
     for i in range(da.length()):
         value = da[i]
-        frequency = map.get(value)
-        # if the value is not in map, it adds it with a frequency of 1
-        if frequency is None:
-            map.put(value, 1)
-            frequency = 1
-        # if it's already in map, it increments the frequency
-        else:
-            map.put(value, frequency + 1)
-            frequency += 1
+        frequency = map.increment(value)
 
         # Resets mode_array if a new mode is found and adds the value, updates max_frequency for new mode
         if frequency > max_frequency:
@@ -430,6 +1266,121 @@ if __name__ == "__main__":
     m.clear()
     print(m.get_size(), m.get_capacity())
 
+    print("\npower_of_two example 1")
+    print("----------------------")
+    m = HashMap(20, hash_function_2, power_of_two=True)
+    for i in range(50):
+        m.put('key' + str(i), i * 100)
+    print(m.get_size(), m.get_capacity(), m.get('key7'), m.contains_key('key50'))
+
+    print("\nshrink example 1")
+    print("----------------")
+    m = HashMap(11, hash_function_2)
+    for i in range(1000):
+        m.put(str(i), i)
+    print(m.get_size(), m.get_capacity())
+    for i in range(990):
+        m.remove(str(i))
+    print(m.get_size(), m.get_capacity(), m.get('995'))
+
+    print("\nstats example 1")
+    print("---------------")
+    m = HashMap(11, hash_function_1)
+    m.enable_stats()
+    for i in range(30):
+        m.put('key' + str(i), i)
+    for i in range(0, 60, 2):
+        m.get('key' + str(i))
+    m.remove('key1')
+    print(m.get_stats())
+
+    print("\nclear example 3 - reuse after clear")
+    print("-----------------------------------")
+    m = HashMap(1000003, hash_function_1)
+    m.put('key1', 10)
+    m.clear()
+    print(m.get_size(), m.get('key1'), m.contains_key('key1'))
+    m.put('key2', 20)
+    print(m.get_size(), m.get('key2'), m.get_keys_and_values())
+
+    print("\nread-modify-write example 1")
+    print("---------------------------")
+    m = HashMap(11, hash_function_1)
+    print(m.setdefault('a', []), m.increment('n'), m.increment('n', 5), m.update_with('s', str.upper, 'x'))
+    m.setdefault('a', []).append(1)
+    print(m.get('a'), m.pop('n'), m.pop('n', 'missing'), m.get_size())
+
+    print("\nset operations example 1")
+    print("------------------------")
+    m1 = HashMap(11, hash_function_1)
+    m2 = HashMap(11, hash_function_1)
+    for i in range(6):
+        m1.put('k' + str(i), i)
+    for i in range(3, 9):
+        m2.put('k' + str(i), i * 10)
+    print(m1.intersect(m2).get_keys_and_values())
+    print(m1.difference(m2).get_keys_and_values())
+    print(m1.union(m2).get_size(), m1.union(m2).get('k4'))
+    m1.merge(m2, lambda key, mine, theirs: mine + theirs)
+    print(m1.get_size(), m1.get('k4'), m1.get('k8'))
+
+    print("\nBloom filter example 1")
+    print("----------------------")
+    m = HashMap(11, hash_function_1)
+    bloom = m.enable_filter()
+    for i in range(100):
+        m.put('key' + str(i), i)
+    m.remove('key7')
+    print(m.get('key5'), m.get('key7'), sum(m.contains_key('miss' + str(i)) for i in range(1000)))
+    print(bloom.keys, bloom.removed, bloom.negatives + bloom.false_positives, bloom.size_in_bytes())
+
+    print("\nsnapshot example 1")
+    print("------------------")
+    m = HashMap(11, hash_function_1)
+    for i in range(5):
+        m.put('key' + str(i), i)
+    view = m.snapshot()
+    m.put('key0', 100)
+    m.remove('key1')
+    m.put('key9', 9)
+    print(view.get_size(), view.get('key0'), view.get('key1'), view.contains_key('key9'), view.is_detached())
+    for i in range(20):
+        m.put('new' + str(i), i)
+    print(m.get_size(), view.get_size(), sorted(view), view.is_detached())
+
+    print("\ntyped values example 1")
+    print("----------------------")
+    m = HashMap(11, hash_function_1, value_type='i8')
+    for word in "the cat and the hat and the bat".split():
+        m.increment(word)
+    m.put('cat', 7)
+    m.remove('bat')
+    column = m.get_value_column()
+    print(m.get('the'), m.get('cat'), m.get_size(), column.sum(), column.max(), column.histogram(bins=3))
+
+    print("\npickle example 1")
+    print("----------------")
+    import pickle
+    m = HashMap(11, hash_function_1, value_type='f8')
+    for i in range(20):
+        m.put('key' + str(i), i / 4)
+    m.remove('key3')
+    buffers = []
+    data = pickle.dumps(m, protocol=5, buffer_callback=buffers.append)
+    copy = pickle.loads(data, buffers=buffers)
+    print(len(buffers), copy.get_size(), copy.get_capacity(), copy.get('key10'), copy.contains_key('key3'))
+    bulk = HashMap.from_columns({'keys': ['a', 'b', 'a'], 'values': [1.0, 2.0, 3.0], 'value_type': 'f8'})
+    print(bulk.get_size(), bulk.get('a'), bulk.get_value_column().sum())
+
+    print("\nparallel resize example 1")
+    print("-------------------------")
+    from hash_map_rehash import PARALLEL_MIN_SIZE
+
+    keys = ['key' + str(i) for i in range(PARALLEL_MIN_SIZE)]
+    m = HashMap.from_columns({'keys': keys, 'values': list(range(len(keys))), 'function': hash_function_2})
+    m.resize_table(2 * m.get_capacity(), processes=2)
+    print(m.get_size(), m.get_capacity(), m.get('key12345'), m.contains_key('key' + str(PARALLEL_MIN_SIZE)))
+
     print("\nPDF - find_mode example 1")
     print("-----------------------------")
     da = DynamicArray(["apple", "apple", "grape", "melon", "peach"])
@@ -0,0 +1,166 @@
+# Description: Columnar serialization shared by both HashMaps. export_columns() flattens a map into a list of
+#              keys, a list or typed array of values and an array of the bucket each key is stored in;
+#              from_columns() rebuilds the table from them in one pass, without hashing a key, calling put() or
+#              resizing. Pickling a map sends these columns, with the arrays as out-of-band buffers under
+#              pickle protocol 5.
+
+import gc
+from array import array
+
+from hash_map_policy import LoadPolicy
+
+
+# Columns holding arrays, which are sent as pickle buffers
+BUFFER_COLUMNS = ('values', 'indexes', 'tombstones')
+
+# Keys hashed to tell whether a hash function gives the same results in another process
+FINGERPRINT_KEYS = ('', 'fingerprint', 'HashMap')
+
+# Keys that hash_key() hashes with Python's hash() of their str parts, which is randomized per process
+PYTHON_HASH_KEYS = (frozenset({'fingerprint'}), ('fingerprint', frozenset({'fingerprint'})))
+
+# Key types whose hash_key() hash is the same in every process as long as the hash function's is
+_PORTABLE_TYPES = (str, int, bool, float, bytes, bytearray, memoryview)
+
+
+def uses_python_hash(keys) -> bool:
+    """
+    Returns True if any of keys, or any part of a tuple among them, is hashed by hash_key() with Python's
+    hash() of an object that may hash differently in another process.
+    """
+    for key in keys:
+        if type(key) in _PORTABLE_TYPES:
+            continue
+        if isinstance(key, tuple):
+            if uses_python_hash(key):
+                return True
+        elif not isinstance(key, _PORTABLE_TYPES):
+            return True
+    return False
+
+
+def fingerprint(function: callable, python_hash: bool = False) -> tuple:
+    """
+    Returns the hashes of FINGERPRINT_KEYS under function, followed with python_hash by the hash_key() hashes
+    of PYTHON_HASH_KEYS. Hash functions built on Python's hash() of str, such as SeededHash, and keys that
+    hash_key() hashes with hash(), such as frozensets of str, hash differently in every process unless
+    PYTHONHASHSEED is set, and exported bucket indexes are only valid where the fingerprint matches. Keys
+    hashed by identity can't be looked up in another process at all.
+    """
+    hashes = tuple(function(key) for key in FINGERPRINT_KEYS)
+    if python_hash:
+        from hash_map_keys import hash_key
+
+        hashes += tuple(hash_key(key, function) for key in PYTHON_HASH_KEYS)
+    return hashes
+
+
+def same_hashes(function: callable, expected: tuple) -> bool:
+    """
+    Returns True if function, and the keys a fingerprint() expected was taken for, hash in this process as
+    they did where expected was taken.
+    """
+    return fingerprint(function, len(expected) > len(FINGERPRINT_KEYS)) == expected
+
+
+def column_view(data, typecode: str):
+    """
+    Returns data as a sequence of typecode items without copying it. data may be an array, a bytes-like
+    object or a pickle buffer holding such items; lists are returned unchanged.
+    """
+    if isinstance(data, list):
+        return data
+    return memoryview(data).cast('B').cast(typecode)
+
+
+def reduce_columns(columns: dict, protocol: int) -> dict:
+    """
+    Returns columns with their arrays wrapped in pickle.PickleBuffer under protocol 5 or later, so that a
+    pickler with a buffer_callback can send them out-of-band instead of copying them into the stream.
+    """
+    if protocol < 5:
+        return columns
+    import pickle
+
+    columns = dict(columns)
+    for name in BUFFER_COLUMNS:
+        if isinstance(columns.get(name), array):
+            columns[name] = pickle.PickleBuffer(columns[name])
+    return columns
+
+
+def bulk_capacity(size: int, policy: LoadPolicy) -> int:
+    """
+    Returns the smallest capacity that holds size keys under policy without growing on the next put.
+    """
+    return max(1, int(size / policy.max_load) + 1)
+
+
+class GCPaused:
+    """
+    Context manager that pauses the cyclic garbage collector. Bulk imports allocate an object per key, which
+    would otherwise trigger a collection over the growing table every few hundred keys; the nodes and
+    entries they create never form cycles.
+    """
+
+    def __enter__(self) -> "GCPaused":
+        """Disables the collector, remembering whether it was enabled."""
+        self._enabled = gc.isenabled()
+        gc.disable()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Re-enables the collector if it was enabled before."""
+        if self._enabled:
+            gc.enable()
+
+
+def loads(data: bytes, buffers=None):
+    """
+    Unpickles a map pickled with protocol 5, reading out-of-band buffers without copying them.
+    """
+    import pickle
+
+    return pickle.loads(data, buffers=buffers)
+
+
+def dumps(hash_map) -> tuple:
+    """
+    Pickles a map with protocol 5 and returns (data, buffers), where buffers are the out-of-band column
+    buffers to pass to loads() alongside data.
+    """
+    import pickle
+
+    buffers = []
+    data = pickle.dumps(hash_map, protocol=5, buffer_callback=buffers.append)
+    return data, buffers
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+    import os
+    import pickle
+    import subprocess
+    import sys
+
+    from a6_include import hash_function_1
+    from hash_map_oa import HashMap as OAHashMap
+    from hash_map_sc import HashMap as SCHashMap
+
+    print("\nfingerprint example 1 - keys hashed with Python's hash() in another process")
+    print("---------------------------------------------------------------------------")
+    check = ("import sys, hash_map_serialize; m = hash_map_serialize.loads(sys.stdin.buffer.read()); "
+             "print(m.get(frozenset({'k7'})), m.get(('t', frozenset({'x7'}))), m.get('s7'))")
+    for map_class in (SCHashMap, OAHashMap):
+        m = map_class(11, hash_function_1)
+        for i in range(200):
+            m.put(frozenset({'k' + str(i)}), i)
+            m.put(('t', frozenset({'x' + str(i)})), -i)
+            m.put('s' + str(i), i)
+        data = pickle.dumps(m)
+        for seed in ('1', '2'):
+            result = subprocess.run([sys.executable, "-c", check], input=data, capture_output=True,
+                                    env=dict(os.environ, PYTHONHASHSEED=seed),
+                                    cwd=os.path.dirname(os.path.abspath(__file__)))
+            print(map_class.__module__, seed, result.stdout.decode().strip())
@@ -0,0 +1,146 @@
+# Description: Set algebra between HashMaps of either kind. intersect, union and difference iterate the smaller
+#              map and probe the larger one, so their cost grows with the smaller size. Given processes, the
+#              probes run in chunks in a process pool, and each worker receives one copy of the probed map.
+#              Maps that share capacity and hash function take the aligned paths in their own classes instead.
+
+from itertools import islice
+
+
+# Number of (key, value) pairs sent to a pool worker at a time
+CHUNK_SIZE = 10000
+
+_MISSING = object()
+
+# Map probed by the current pool worker, set once by _init_worker
+_target = None
+
+
+def keep_mine(key, mine, theirs):
+    """Resolver that keeps the value already in the map being merged into."""
+    return mine
+
+
+def take_theirs(key, mine, theirs):
+    """Resolver that replaces the value with the one from the map being merged in."""
+    return theirs
+
+
+def _init_worker(target) -> None:
+    """Stores the map a pool worker probes."""
+    global _target
+    _target = target
+
+
+def _probe_chunk(items: list) -> list:
+    """
+    Returns (key, value, found, target_value) for each (key, value) in items, probing the worker's map.
+    """
+    probed = []
+    for key, value in items:
+        target_value = _target._lookup(key, _MISSING)
+        if target_value is _MISSING:
+            probed.append((key, value, False, None))
+        else:
+            probed.append((key, value, True, target_value))
+    return probed
+
+
+def _chunks(items, chunk_size: int):
+    """Yields lists of up to chunk_size items."""
+    items = iter(items)
+    chunk = list(islice(items, chunk_size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(items, chunk_size))
+
+
+def probe(items, target, processes: int = None, chunk_size: int = CHUNK_SIZE):
+    """
+    Yields (key, value, found, target_value) for each (key, value) in items, where found tells whether key is
+    in target and target_value is its value there, or None.
+    With processes, the probes run in a pool of that many worker processes, so target and the keys must be
+    picklable; results still come back in the order of items.
+    """
+    if processes is None:
+        for key, value in items:
+            target_value = target._lookup(key, _MISSING)
+            if target_value is _MISSING:
+                yield key, value, False, None
+            else:
+                yield key, value, True, target_value
+        return
+
+    # the pool machinery is imported on first use, to keep importing the maps fast
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(target,)) as pool:
+        for probed in pool.map(_probe_chunk, _chunks(items, chunk_size)):
+            yield from probed
+
+
+def intersect_maps(hash_map, other, processes: int = None):
+    """
+    Returns a new map configured like hash_map with the keys in both maps and their values from hash_map.
+    """
+    result = hash_map._empty_like()
+    if hash_map.get_size() <= other.get_size():
+        for key, value, found, _ in probe(hash_map._items(), other, processes):
+            if found:
+                result.put(key, value)
+    else:
+        for key, _, found, value in probe(other._items(), hash_map, processes):
+            if found:
+                result.put(key, value)
+    return result
+
+
+def difference_maps(hash_map, other, processes: int = None):
+    """
+    Returns a new map configured like hash_map with the keys of hash_map that are not in other.
+    """
+    if hash_map.get_size() <= other.get_size():
+        result = hash_map._empty_like()
+        for key, value, found, _ in probe(hash_map._items(), other, processes):
+            if not found:
+                result.put(key, value)
+        return result
+
+    # other is smaller: copy hash_map and remove the keys of other from the copy
+    result = hash_map._copy()
+    for key, _ in other._items():
+        result.remove(key)
+    return result
+
+
+def merge_maps(hash_map, other, resolver: callable = None, processes: int = None) -> None:
+    """
+    Adds every key of other to hash_map. Keys in both maps get resolver(key, mine, theirs), or other's value
+    if resolver is None. Every key of other has to be visited, so this iterates other whatever its size.
+    """
+    if resolver is None:
+        for key, value in other._items():
+            hash_map.put(key, value)
+    elif processes is None:
+        for key, value in other._items():
+            hash_map.update_with(key, lambda mine: value if mine is _MISSING else resolver(key, mine, value),
+                                 _MISSING)
+    else:
+        # workers probe a copy of hash_map taken before the merge; other's keys are distinct, so the
+        # puts below never change the answer for a later key
+        for key, value, found, mine in probe(other._items(), hash_map, processes):
+            hash_map.put(key, resolver(key, mine, value) if found else value)
+
+
+def union_maps(hash_map, other, processes: int = None):
+    """
+    Returns a new map with the keys of both maps, preferring hash_map's values. The larger map is copied
+    bucket by bucket and the smaller one is merged into the copy, which is configured like the larger map
+    when both are the same kind of map.
+    """
+    if type(other) is type(hash_map) and other.get_size() > hash_map.get_size():
+        result = other._copy()
+        result.merge(hash_map, None, processes)
+    else:
+        result = hash_map._copy()
+        result.merge(other, keep_mine, processes)
+    return result
@@ -0,0 +1,164 @@
+# Description: Point-in-time read-only views of either HashMap. snapshot() runs in O(1): a view shares the map's
+#              bucket array, and the map copies a segment of SEGMENT_SIZE buckets into every live view just
+#              before it first changes that segment. Views read untouched segments straight from the map, so
+#              neither writers nor readers ever wait for each other.
+
+from a6_include import DynamicArray
+from hash_map_keys import hash_key
+
+
+# Buckets per copy-on-write segment
+SEGMENT_BITS = 6
+SEGMENT_SIZE = 1 << SEGMENT_BITS
+
+_MISSING = object()
+
+
+class HashMapSnapshot:
+    """
+    Read-only view of a HashMap as it was when snapshot() was called
+    Views are tracked by the map through weak references; dropping the last reference to a view stops the
+    map from copying segments for it.
+    """
+
+    def __init__(self, hash_map, open_addressing: bool) -> None:
+        """
+        Initialize a view sharing the bucket array of hash_map. Only the map itself should call this.
+        """
+        self._buckets = hash_map._buckets
+        self._epochs = hash_map._epochs
+        self._epoch = hash_map._epoch
+        self._capacity = hash_map._capacity
+        self._mask = hash_map._mask
+        self._hash_function = hash_map._hash_function
+        self._size = hash_map._size
+        self._values = hash_map._values
+        self._read_slot = hash_map._read_slot
+        self._open_addressing = open_addressing
+        self._segments = {}
+        self._detached = False
+
+    def get_size(self) -> int:
+        """Return the number of keys the map held when the view was taken."""
+        return self._size
+
+    def get_capacity(self) -> int:
+        """Return the capacity the map had when the view was taken."""
+        return self._capacity
+
+    def is_detached(self) -> bool:
+        """
+        Returns True once the map has resized. A detached view reads the old bucket array, which the map no
+        longer writes to, so it costs writers nothing.
+        """
+        return self._detached
+
+    def get(self, key: str) -> object:
+        """
+        Returns the value key had when the view was taken, or None if it was not in the map.
+        """
+        value = self._lookup(key)
+        return None if value is _MISSING else value
+
+    def contains_key(self, key: str) -> bool:
+        """Returns True if key was in the map when the view was taken."""
+        return self._lookup(key) is not _MISSING
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns an array of the key-value pair tuples the map held when the view was taken.
+        """
+        pairs = DynamicArray()
+        for pair in self:
+            pairs.append(pair)
+        return pairs
+
+    def __iter__(self):
+        """
+        Yields the (key, value) pairs of the view in bucket order, one segment at a time.
+        """
+        for segment in range((self._capacity + SEGMENT_SIZE - 1) >> SEGMENT_BITS):
+            for slot in self._segment(segment):
+                if self._open_addressing:
+                    if slot is not None and slot[2] is False:
+                        yield slot[0], slot[1]
+                else:
+                    yield from slot
+
+    def _segment(self, segment: int) -> list:
+        """
+        Returns the slots of a segment as they were when the view was taken.
+        """
+        slots = self._segments.get(segment)
+        if slots is not None:
+            return slots
+        slots = self._read_segment(segment)
+        # a writer copies a segment before changing it, so if it copied this one while it was being read,
+        # that copy is the consistent one
+        return self._segments.get(segment, slots)
+
+    def _read_segment(self, segment: int) -> list:
+        """
+        Reads the slots of a segment from the shared bucket array.
+        """
+        start = segment << SEGMENT_BITS
+        return [self._read_slot(self._buckets, self._epochs, self._epoch, self._values, index)
+                for index in range(start, min(start + SEGMENT_SIZE, self._capacity))]
+
+    def _preserve(self, index: int) -> None:
+        """
+        Copies the segment holding index out of the shared bucket array unless it was copied already.
+        The map calls this right before it changes that bucket.
+        """
+        segment = index >> SEGMENT_BITS
+        if not self._detached and segment not in self._segments:
+            self._segments[segment] = self._read_segment(segment)
+
+    def _detach(self, values, frozen_values) -> None:
+        """
+        Stops sharing with the map, which is about to replace its bucket array. If the view reads the map's
+        current ValueColumn values, it switches to the copy frozen_values, since the map keeps writing to it.
+        """
+        if self._values is values:
+            self._values = frozen_values
+        self._detached = True
+
+    def _slot(self, index: int):
+        """
+        Returns a single slot as it was when the view was taken, without reading the rest of its segment.
+        """
+        slots = self._segments.get(index >> SEGMENT_BITS)
+        if slots is not None:
+            return slots[index & (SEGMENT_SIZE - 1)]
+        slot = self._read_slot(self._buckets, self._epochs, self._epoch, self._values, index)
+        slots = self._segments.get(index >> SEGMENT_BITS)
+        return slot if slots is None else slots[index & (SEGMENT_SIZE - 1)]
+
+    def _lookup(self, key: str) -> object:
+        """
+        Returns the value key had when the view was taken, or _MISSING.
+        """
+        if type(key) is str:
+            key_hash = self._hash_function(key)
+        else:
+            key_hash = hash_key(key, self._hash_function)
+        index_initial = key_hash & self._mask if self._mask is not None else key_hash % self._capacity
+
+        if not self._open_addressing:
+            for slot_key, value in self._slot(index_initial):
+                if slot_key == key:
+                    return value
+            return _MISSING
+
+        # open addressing: follow the same probe sequence as the map
+        for j in range(self._capacity):
+            if self._mask is not None:
+                index = (index_initial + (j * j + j) // 2) & self._mask
+            else:
+                index = (index_initial + j ** 2) % self._capacity
+            slot = self._slot(index)
+            if slot is None:
+                return _MISSING
+            if slot[0] == key:
+                return _MISSING if slot[2] else slot[1]
+        return _MISSING
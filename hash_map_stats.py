@@ -0,0 +1,86 @@
+# Description: Opt-in operation statistics for both HashMaps. A HashMap only records into a HashMapStats object
+#              after enable_stats() is called; until then each operation pays a single None check.
+
+import time
+
+
+class HashMapStats:
+    """
+    Incrementally maintained operation statistics for a hash map
+
+    probe_lengths   per operation histogram of how many buckets (OA) or chain nodes (SC) each call looked at
+    hits, misses    per operation count of calls that did or did not find their key
+    chain_lengths   SC only, number of buckets holding a chain of each length
+    resizes         number of resizes, with their total and longest duration in seconds
+    reseeds         number of times a collision attack was detected and the map switched to a new seeded hash
+    """
+
+    def __init__(self) -> None:
+        """Initialize empty statistics."""
+        self.probe_lengths = {}
+        self.hits = {}
+        self.misses = {}
+        self.chain_lengths = {}
+        self.resizes = 0
+        self.resize_seconds = 0.0
+        self.max_resize_seconds = 0.0
+        self.reseeds = 0
+
+    def record(self, operation: str, probes: int, found: bool) -> None:
+        """
+        Records one call of operation that looked at probes buckets or nodes and did or did not find its key.
+        """
+        histogram = self.probe_lengths.get(operation)
+        if histogram is None:
+            histogram = self.probe_lengths[operation] = {}
+        histogram[probes] = histogram.get(probes, 0) + 1
+
+        counts = self.hits if found else self.misses
+        counts[operation] = counts.get(operation, 0) + 1
+
+    def record_chain_change(self, old_length: int, new_length: int) -> None:
+        """
+        Moves one bucket from the old_length to the new_length chain histogram entry.
+        Empty buckets are not tracked.
+        """
+        if old_length:
+            remaining = self.chain_lengths[old_length] - 1
+            if remaining:
+                self.chain_lengths[old_length] = remaining
+            else:
+                del self.chain_lengths[old_length]
+        if new_length:
+            self.chain_lengths[new_length] = self.chain_lengths.get(new_length, 0) + 1
+
+    def start_resize(self) -> float:
+        """Returns a timestamp to pass to end_resize()."""
+        return time.perf_counter()
+
+    def end_resize(self, started: float) -> None:
+        """Records a resize that began at the started timestamp."""
+        elapsed = time.perf_counter() - started
+        self.resizes += 1
+        self.resize_seconds += elapsed
+        if elapsed > self.max_resize_seconds:
+            self.max_resize_seconds = elapsed
+
+    def longest_chain(self) -> int:
+        """Returns the length of the longest tracked chain, or 0 if none are tracked."""
+        return max(self.chain_lengths, default=0)
+
+    def as_dict(self) -> dict:
+        """
+        Returns the statistics as a dictionary of plain Python values.
+        """
+        return {
+            "probe_lengths": {operation: dict(sorted(histogram.items()))
+                              for operation, histogram in self.probe_lengths.items()},
+            "hits": dict(self.hits),
+            "misses": dict(self.misses),
+            "chain_lengths": dict(sorted(self.chain_lengths.items())),
+            "longest_chain": self.longest_chain(),
+            "resizes": self.resizes,
+            "resize_seconds": self.resize_seconds,
+            "max_resize_seconds": self.max_resize_seconds,
+            "reseeds": self.reseeds,
+        }